@@ -22,6 +22,7 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 from issue.models import Issue, Comment
+from issue import dependencies
 from rest_framework import generics, serializers, viewsets, mixins, reverse
 from rest_framework.response import Response
 from project.models import Project
@@ -99,6 +100,36 @@ class IssueSerializer(serializers.ModelSerializer):
         exclude = ('id', 'nextCommentId', 'nextAttachmentId', 'nextTimelogId')
         read_only_fields = ('project', )
 
+    def validate_dependsOn(self, value):
+        if self.instance is not None and dependencies.creates_cycle(self.instance, value):
+            raise serializers.ValidationError("An issue can't depend on an issue that depends on it.")
+        return value
+
+
+# input of the batch endpoint of the issues of a project (see issue.bulk)
+class IssueBatchSerializer(serializers.Serializer):
+    # the fields each action needs besides the issues
+    action_fields = {
+        'archive': (),
+        'unarchive': (),
+        'move': ('kanbancol', ),
+        'sprint': ('sprint', ),
+        'assign': ('assignee', ),
+    }
+
+    issues = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    action = serializers.ChoiceField(choices=list(action_fields))
+    kanbancol = LimitedColsFieldProject(required=False)
+    sprint = LimitedSprintFieldProject(required=False, allow_null=True)
+    assignee = LimitedUserFieldProject(many=True, required=False)
+    replace = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        for field in self.action_fields[data['action']]:
+            if field not in data:
+                raise serializers.ValidationError({field: "This field is required for the action."})
+        return data
+
 
 class TimelogSerializer(serializers.ModelSerializer):
     issue = IssueLimitedField(required=False)
@@ -170,7 +201,7 @@ class ProjectSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Project
-        exclude = ('id', 'nextTicketId', 'nextSprintId', 'activity')
+        exclude = ('id', 'nextTicketId', 'nextSprintId', 'deletion_requested', 'deletion_requested_by')
         read_only_fields = ('creator',)
 
 
@@ -197,5 +228,5 @@ class ProjectUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Project
-        exclude = ('id', 'nextTicketId', 'nextSprintId', 'activity')
+        exclude = ('id', 'nextTicketId', 'nextSprintId', 'deletion_requested', 'deletion_requested_by')
         read_only_fields = ('creator', 'name_short')
@@ -33,6 +33,7 @@ from timelog.forms import DurationWidget
 from user_management.models import CustomUser
 from django.contrib.auth import get_user_model
 from django.db.models import Q
+from django.utils import timezone
 
 import base64
 import json
@@ -474,6 +475,35 @@ class ApiTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json()['count'], 0)
 
+    def test_get_project_timelog_stats(self):
+        new_user = get_user_model().objects.create_user('user4', 'newuser', 'c')
+        self.project.developer.add(new_user)
+        Timelog(time=datetime.timedelta(minutes=30), user=new_user, issue=self.issue_new).save()
+        url = reverse('api:project_timelogs-stats', kwargs=self.project_name_kwargs)
+
+        # user1 sees the logged time of everyone since they are manager
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(list(data['per_day'].values()), [2.5*60*60])
+        self.assertEqual(data['per_user'], {'user1': 2*60*60, 'user4': 30*60})
+        self.assertEqual(data['per_issue'], {'asdf-1': 2*60*60, 'asdf-2': 30*60})
+
+        # developers only see their own logged time
+        self.use_user(new_user)
+        data = self.client.get(url).json()
+        self.assertEqual(data['per_user'], {'user4': 30*60})
+        self.assertEqual(data['per_issue'], {'asdf-2': 30*60})
+
+        # the window ends today
+        data = self.client.get(url, {'days': 7}).json()
+        self.assertEqual(data['last_day'], str(timezone.localdate()))
+        self.assertEqual(data['first_day'], str(timezone.localdate() - datetime.timedelta(days=6)))
+
+        for days in ['0', '367', 'a']:
+            response = self.client.get(url, {'days': days})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     # TODO TESTCASE test model data
     def test_get_project_issue_detail(self):
         response = self.client.get(reverse('api:project_issues-detail', kwargs=self.issue_number_kwargs))
@@ -507,6 +537,35 @@ class ApiTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json()['title'], 'this is a issue')
 
+    def test_post_project_issues_batch(self):
+        url = reverse('api:project_issues-batch', kwargs=self.project_name_kwargs)
+        numbers = [self.issue.number, self.issue_new.number]
+        response = self.client.post(url, {'issues': numbers, 'action': 'archive'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'action': 'archive', 'changed': 2})
+        self.assertEqual(Issue.objects.filter(project=self.project, archived=True).count(), 2)
+
+        response = self.client.post(url, {'issues': numbers, 'action': 'assign', 'assignee': ['user2']},
+                                    format='json')
+        self.assertEqual(response.json()['changed'], 2)
+        self.assertEqual(list(Issue.objects.filter(assignee=self.user2).order_by('number')),
+                         [self.issue, self.issue_new])
+
+        column = self.project.kanbancol.last()
+        response = self.client.post(url, {'issues': numbers, 'action': 'move', 'kanbancol': column.name},
+                                    format='json')
+        self.assertEqual(response.json()['changed'], 2)
+        self.assertEqual(Issue.objects.filter(kanbancol=column).count(), 2)
+
+        # the action needs its field and only members can be assigned
+        response = self.client.post(url, {'issues': numbers, 'action': 'move'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {'issues': numbers, 'action': 'assign', 'assignee': ['nobody']},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {'issues': [], 'action': 'archive'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     # TODO TESTCASE test model data
     def test_delete_project_issue_detail(self):
         response = self.client.delete(reverse('api:project_issues-detail', kwargs=self.issue_number_kwargs))
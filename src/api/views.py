@@ -22,15 +22,21 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import generics, serializers, viewsets, mixins, reverse, permissions
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from issue import bulk, dependencies
 from project.models import Project
+from timelog import analytics
 from timelog.models import Timelog
 from timelog.forms import TimelogCreateForm2
 from .permissions import *
 from .serializer import *
 from django.contrib.auth import get_user_model
 from django.http import Http404
+import datetime
+import pytz
 import re
 
 
@@ -137,6 +143,45 @@ class ProjectIssuesViewSet(viewsets.ModelViewSet):
         proj = Project.objects.filter(name_short=project).first()
         serializer.save(creator=self.request.user, project=proj)
 
+    # apply one action to many issues at once
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request, project=None):
+        serializer = IssueBatchSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        proj = Project.objects.get(name_short=project)
+        issues = proj.issue.filter(number__in=data['issues'])
+        if data['action'] == 'archive':
+            count = bulk.archive(proj, issues, request.user)
+        elif data['action'] == 'unarchive':
+            count = bulk.unarchive(proj, issues, request.user)
+        elif data['action'] == 'move':
+            count = bulk.move(proj, issues, data['kanbancol'], request.user)
+        elif data['action'] == 'sprint':
+            count = bulk.set_sprint(proj, issues, data['sprint'], request.user)
+        else:
+            count = bulk.assign(proj, issues, data['assignee'], request.user, replace=data['replace'])
+        return Response({'action': data['action'], 'changed': count})
+
+    # the transitive dependencies of the issue
+    @action(detail=True, methods=['get'])
+    def dependencies(self, request, project=None, number=None):
+        issue = self.get_object()
+        return Response({
+            'number': issue.number,
+            'blocked': dependencies.is_blocked(issue),
+            'depends_on': [dependency.get_ticket_identifier() for dependency in
+                           dependencies.get_dependencies(issue).select_related('project').order_by('pk')],
+            'blocks': [dependent.get_ticket_identifier() for dependent in
+                       dependencies.get_dependents(issue).select_related('project').order_by('pk')],
+        })
+
+    # the blocked issues and the critical path of the project
+    @action(detail=False, methods=['get'], url_path='dependencies')
+    def dependency_graph(self, request, project=None):
+        return Response(dependencies.get_graph(Project.objects.get(name_short=project)))
+
 
 class ProjectSprintsViewSet(viewsets.ModelViewSet):
     permission_classes = (UserIsMemberInProject,)
@@ -167,10 +212,41 @@ class ProjectTimelogsViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
         queryset = Timelog.objects.all()
         proj = self.kwargs.get('project', '')
         project = Project.objects.get(name_short=proj)
-        if project.activity_only_for_managers and self.request.user not in project.manager.all():
+        if project.activity_only_for_managers and not project.is_manager(self.request.user):
             return queryset.filter(issue__project__name_short=proj, user=self.request.user)
         return queryset.filter(issue__project__name_short=proj)
 
+    # the logged time per day, user and issue of the last days (30 by default) in seconds
+    @action(detail=False, methods=['get'])
+    def stats(self, request, project=None):
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 0
+        if days < 1 or days > 366:
+            raise serializers.ValidationError({'days': 'Must be a number of days between 1 and 366.'})
+
+        project = Project.objects.get(name_short=project)
+        user = None
+        if project.activity_only_for_managers and not project.is_manager(request.user):
+            user = request.user
+
+        # the timezone middleware doesn't know the users of token authentication
+        with timezone.override(pytz.timezone(request.user.timezone or 'UTC')):
+            last_day = timezone.localdate()
+            first_day = last_day - datetime.timedelta(days=days - 1)
+            per_day = analytics.get_time_per_day(project, first_day, last_day, user)
+            per_user = analytics.get_time_per_user(project, first_day, last_day, user)
+            per_issue = analytics.get_time_per_issue(project, first_day, last_day, user)
+        return Response({
+            'first_day': str(first_day),
+            'last_day': str(last_day),
+            'per_day': {str(day): time.total_seconds() for day, time in sorted(per_day.items())},
+            'per_user': {username: time.total_seconds() for username, time in per_user.items()},
+            'per_issue': {project.name_short+'-'+str(number): time.total_seconds()
+                          for number, time in sorted(per_issue.items())},
+        })
+
 
 class ProjectIssuesCommentsViewSet(viewsets.ModelViewSet):
     lookup_field = 'seqnum'
@@ -31,3 +31,4 @@ class CommonConfig(AppConfig):
         # do some patches on the django code at runtime
         # see this module for more information
         import lib.monkey_patches  # noqa
+        import common.signals  # noqa
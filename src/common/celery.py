@@ -44,6 +44,12 @@ def import_commits():
         Frontend.import_new_commits(repo)
 
 
+@app.task
+def resume_project_deletions():
+    from project import teardown
+    teardown.resume_deletions()
+
+
 @app.task(bind=True)
 def debug_task(self):
     print("Request: {0!r}".format(self.request))
@@ -52,3 +58,4 @@ def debug_task(self):
 @app.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
     sender.add_periodic_task(900.0, import_commits.s(), name='import git commits')
+    sender.add_periodic_task(900.0, resume_project_deletions.s(), name='resume project deletions')
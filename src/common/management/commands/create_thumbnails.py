@@ -0,0 +1,49 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from common import tasks
+from issue.models import Attachment
+
+# Thumbnails are only created for the images uploaded after they were introduced. This queues the creation of the
+# missing ones for all attachments and avatars; files that already have their thumbnails are skipped by the task.
+
+
+class Command(BaseCommand):
+    help = 'Queue the creation of the missing thumbnails of the attachments and avatars'
+
+    def handle(self, *args, **options):
+        names = Attachment.objects.exclude(file='').values_list('file', flat=True).distinct()
+        for name in names:
+            tasks.create_thumbnails.delay(name)
+
+        default_avatar = get_user_model()._meta.get_field('avatar').get_default()
+        usernames = get_user_model().objects.exclude(avatar='').exclude(avatar=default_avatar) \
+                                            .values_list('username', flat=True)
+        for username in usernames:
+            tasks.create_avatar_thumbnails.delay(username)
+
+        self.stdout.write('Queued the thumbnails of ' + str(len(names)) + ' attachment(s) and ' +
+                          str(len(usernames)) + ' avatar(s).')
@@ -0,0 +1,111 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from collections import OrderedDict
+import hashlib
+import threading
+
+from django.core.cache import cache
+
+from lib import cache_version
+
+# Cache for rendered markdown (see common.templatetags.markdownify).
+#
+# The HTML of a text is stored under the hash of the text. Texts rendered for a project also depend on the members
+# of the project (user links) and on its issues (issue links with their titles), so their key contains the short
+# name of the project and a version counter that is increased by the handlers in common.signals whenever the
+# members or the issue titles and numbers of the project change. Usernames can't be changed, so other changes of
+# users don't matter.
+#
+# Every process keeps the most recently used entries in a bounded in-memory LRU cache, in front of the shared django
+# cache. Texts are rendered on save already, so they are usually cached before they are viewed the first time.
+
+MARKDOWN_KEY = 'markdown_'
+VERSION_KEY = 'markdown_version_'
+
+MARKDOWN_CACHE_TIMEOUT = 60*60*24*7
+# the number of rendered texts every process keeps in memory
+LOCAL_CACHE_SIZE = 1000
+
+
+class LRUCache():
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            # evict the least recently used entries
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LRUCache(LOCAL_CACHE_SIZE)
+
+
+# returns None if the cache doesn't keep the version (e.g. the dummy cache)
+def get_version(project):
+    return cache_version.get_version(VERSION_KEY + str(project.pk))
+
+
+def bump_version(project):
+    cache_version.bump_version(VERSION_KEY + str(project.pk))
+
+
+# returns None if the rendered text can't be cached
+def get_key(text, project=None):
+    key = MARKDOWN_KEY + hashlib.md5(text.encode('utf-8')).hexdigest()
+    if project is None:
+        return key
+    version = get_version(project)
+    if version is None:
+        return None
+    return key + '_' + project.name_short + '_' + str(version)
+
+
+def get(key):
+    html = local_cache.get(key)
+    if html is None:
+        html = cache.get(key)
+        if html is not None:
+            local_cache.set(key, html)
+    return html
+
+
+def set(key, html):
+    local_cache.set(key, html)
+    cache.set(key, html, MARKDOWN_CACHE_TIMEOUT)
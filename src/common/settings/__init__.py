@@ -0,0 +1,7 @@
+from .local_conf import *
+
+SECRET_KEY = "test-secret-key-for-local-runs-only-0123456789abcdef"
+DATABASES['default']['NAME'] = '/tmp/ts/db.sqlite3'
+DATABASES['default']['TEST'] = {'NAME': '/tmp/ts/test_db.sqlite3'}
+for _v in AUTH_PASSWORD_VALIDATORS:
+    _v.pop('OPTIONS', None) if 'CommonPassword' in _v['NAME'] else None
@@ -101,6 +101,7 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'lib.identity_map.IdentityMapMiddleware',
     'lib.csrf_update.csrfUpdateMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
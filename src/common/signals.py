@@ -0,0 +1,73 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from common import markdown_cache
+from common.templatetags.markdownify import cache_markdown
+from issue.models import Issue, Comment
+from project.models import Project
+
+
+# the rendered texts of a project contain the titles of the referenced issues and the links to the members
+def invalidate_issue_markdown(sender, instance, **kwargs):
+    if kwargs.get('created') is False and not instance.has_changed('title', 'number'):
+        return
+    markdown_cache.bump_version(instance.project)
+
+
+def invalidate_member_markdown(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        if isinstance(instance, Project):
+            markdown_cache.bump_version(instance)
+        else:
+            # the projects of a user changed
+            for project in Project.objects.filter(pk__in=kwargs.get('pk_set') or []):
+                markdown_cache.bump_version(project)
+
+
+# render the texts on save, so they don't need to be rendered on the next view
+def render_issue_description(sender, instance, created, **kwargs):
+    if instance.description and (created or instance.has_changed('description')):
+        cache_markdown(instance.description, instance.project)
+
+
+def render_comment(sender, instance, **kwargs):
+    cache_markdown(instance.text, instance.issue.project)
+
+
+def render_project_description(sender, instance, **kwargs):
+    if instance.description:
+        cache_markdown(instance.description, instance)
+
+
+# the version has to be increased before the description gets rendered
+post_save.connect(invalidate_issue_markdown, sender=Issue, dispatch_uid="invalidate_issue_markdown")
+post_delete.connect(invalidate_issue_markdown, sender=Issue, dispatch_uid="invalidate_issue_markdown_delete")
+m2m_changed.connect(invalidate_member_markdown, sender=Project.developer.through,
+                    dispatch_uid="invalidate_member_markdown_developer")
+m2m_changed.connect(invalidate_member_markdown, sender=Project.manager.through,
+                    dispatch_uid="invalidate_member_markdown_manager")
+post_save.connect(render_issue_description, sender=Issue, dispatch_uid="render_issue_description_markdown")
+post_save.connect(render_comment, sender=Comment, dispatch_uid="render_comment_markdown")
+post_save.connect(render_project_description, sender=Project, dispatch_uid="render_project_description_markdown")
@@ -32,6 +32,7 @@ from django.template.loader import render_to_string
 from django.utils.translation import ugettext_lazy as _
 from common.settings import HOST
 from django.core.mail import EmailMessage
+from image_strip import thumbnails
 
 import json
 
@@ -113,3 +114,30 @@ def send_discussion_mail(notification_pk):
                         to=[noti.user.email])
     mail.send(True)
     return 0
+
+
+@shared_task
+def create_thumbnails(name):
+    return thumbnails.create_thumbnails(name)
+
+
+@shared_task
+def create_avatar_thumbnails(username):
+    from issue.signals import invalidate_issue_templates
+    from project.models import Project
+
+    user = get_user_model().objects.get(username=username)
+    created = thumbnails.create_thumbnails(user.avatar.name)
+    if created:
+        # the cached issue cards show the avatars of the assignees
+        for project in Project.objects.filter(issue__assignee=user).distinct():
+            numbers = project.issue.filter(assignee=user).values_list('number', flat=True)
+            invalidate_issue_templates(project, numbers)
+    return created
+
+
+@shared_task
+def delete_project(project_pk):
+    # project.teardown imports this module
+    from project import teardown
+    teardown.delete_issues_and_project(project_pk)
@@ -22,15 +22,18 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 from django import template
+import re
 import bleach
 import markdown
 import mdx_urlize
 from markdown.inlinepatterns import Pattern
+from markdown.preprocessors import Preprocessor
 from markdown.extensions import Extension
 from project.models import Project
 from django.urls.base import reverse
 from issue.models import Issue
 from builtins import staticmethod
+from common import markdown_cache
 register = template.Library()
 
 
@@ -46,9 +49,32 @@ mdx_urlize.URLIZE_RE = r"(%s)" % '|'.join([
 @register.filter
 def markdownify(text, project=None):
     """
-    Convert a markdown text to HTML.
+    Convert a markdown text to HTML. The result is cached, see common.markdown_cache.
     """
-    if project and isinstance(project, Project):
+    if not isinstance(project, Project):
+        project = None
+
+    key = markdown_cache.get_key(text, project)
+    if key is not None:
+        html = markdown_cache.get(key)
+        if html is not None:
+            return html
+
+    html = render_markdown(text, project)
+    if key is not None:
+        markdown_cache.set(key, html)
+    return html
+
+
+# render a text into the cache before it gets viewed, unless it's cached already or can't be cached
+def cache_markdown(text, project=None):
+    key = markdown_cache.get_key(text, project)
+    if key is not None and markdown_cache.get(key) is None:
+        markdown_cache.set(key, render_markdown(text, project))
+
+
+def render_markdown(text, project=None):
+    if project:
         # if the project was specified as parameter, some custom extensions could be loaded
         extra_extensions = [IssueExtension(project),
                             UserExtension(project)]
@@ -90,36 +116,60 @@ class IssueExtension(Extension):
     """
     Resolve and link <project.name_short>-<number> to the right issue.
     """
+    class IssueReferencePreprocessor(Preprocessor):
+        """
+        Collect all issue references of the text and resolve them with a single query,
+        so the inline pattern doesn't need one query per reference.
+        """
+        def __init__(self, extension, md=None):
+            self.extension = extension
+            Preprocessor.__init__(self, md)
+
+        def run(self, lines):
+            pattern = re.compile(self.extension.create_issue_pattern(self.extension.project))
+            numbers = {int(m.group(1).split('-')[1]) for line in lines for m in pattern.finditer(line)}
+            self.extension.titles = {}
+            if numbers:
+                self.extension.titles = dict(Issue.objects.filter(project=self.extension.project, number__in=numbers)
+                                             .values_list('number', 'title'))
+            return lines
+
     class IssuePattern(Pattern):
-        def __init__(self, pattern, project, md=None):
-            self.project = project
+        def __init__(self, pattern, extension, md=None):
+            self.extension = extension
+            self.project = extension.project
             Pattern.__init__(self, pattern, md=md)
 
         def handleMatch(self, m):
             issue_short_name = m.group(2)
 
             number = int(issue_short_name.split('-')[1])
-            if number > 0 and \
-                    self.project.nextTicketId <= number:
+            # references to issues that don't exist stay plain text
+            if number not in self.extension.titles:
                 return issue_short_name
             else:
-                issue_object = Issue.objects.get(project=self.project, number=number)
                 el = markdown.util.etree.Element("a")
                 el.set('href', reverse('issue:detail',
                                        kwargs={'project': self.project.name_short, 'sqn_i': number}))
-                el.set("title", markdown.util.AtomicString(issue_object.title))
+                el.set("title", markdown.util.AtomicString(self.extension.titles[number]))
                 el.text = markdown.util.AtomicString(issue_short_name)
 
                 return el
 
     def __init__(self, project, **kwargs):
         self.project = project
+        # the titles of the referenced issues by their number, filled by the preprocessor
+        self.titles = {}
         Extension.__init__(self, **kwargs)
 
     def extendMarkdown(self, md):
         issue_re_pattern = self.create_issue_pattern(self.project)
 
-        md.inlinePatterns.register(IssueExtension.IssuePattern(issue_re_pattern, self.project, md),
+        # after the fenced code blocks are stashed away, so references in code don't get resolved
+        md.preprocessors.register(IssueExtension.IssueReferencePreprocessor(self, md),
+                                  "issuereferences",
+                                  5)
+        md.inlinePatterns.register(IssueExtension.IssuePattern(issue_re_pattern, self, md),
                                    "issuepattern",
                                    100)
 
@@ -0,0 +1,78 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import io
+import shutil
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from image_strip.thumbnails import THUMBNAIL_SIZES, get_thumbnail_name, delete_thumbnails
+from issue.models import Issue, Attachment
+from project.models import Project
+
+test_dir = 'thumbnail_command_test'
+
+
+class CreateThumbnailsCommandTest(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+        self.issue = Issue(title='first issue', project=self.project)
+        self.issue.save()
+
+    def tearDown(self):
+        shutil.rmtree(default_storage.path(test_dir), ignore_errors=True)
+
+    def image(self):
+        img_bytes = io.BytesIO()
+        Image.new('RGB', (300, 300), 'red').save(img_bytes, format='PNG')
+        return img_bytes.getvalue()
+
+    def assertThumbnails(self, name, exist):
+        for size in THUMBNAIL_SIZES:
+            self.assertEqual(default_storage.exists(get_thumbnail_name(name, size)), exist)
+
+    def test_backfill(self):
+        attachment = Attachment(file=ContentFile(self.image(), name='photo.png'), creator=self.user, issue=self.issue)
+        attachment.save()
+        self.user.avatar = default_storage.save(test_dir + '/avatar.png', ContentFile(self.image()))
+        self.user.save()
+        # files uploaded before there were thumbnails
+        delete_thumbnails(attachment.file.name)
+        self.assertThumbnails(attachment.file.name, False)
+        self.assertThumbnails(self.user.avatar.name, False)
+
+        out = io.StringIO()
+        call_command('create_thumbnails', stdout=out)
+        self.assertIn('1 attachment(s) and 1 avatar(s)', out.getvalue())
+        self.assertThumbnails(attachment.file.name, True)
+        self.assertThumbnails(self.user.avatar.name, True)
+
+        attachment.delete()
+        self.assertThumbnails(attachment.file.name, False)
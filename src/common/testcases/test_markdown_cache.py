@@ -0,0 +1,115 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from common import markdown_cache
+from common.templatetags.markdownify import markdownify
+from project.models import Project
+from issue.models import Issue, Comment
+
+
+class LRUCacheTest(TestCase):
+    def test_eviction(self):
+        lru = markdown_cache.LRUCache(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        # 'a' was used more recently than 'b'
+        self.assertEqual(lru.get('a'), 1)
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
+        self.assertEqual(lru.get('c'), 3)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MarkdownCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        cls.user2 = get_user_model().objects.create_user('b', 'b@b.com', 'b1234567')
+
+    def setUp(self):
+        cache.clear()
+        markdown_cache.local_cache.clear()
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+        self.project.manager.add(self.user)
+        self.issue = Issue(title='first issue', project=self.project, creator=self.user)
+        self.issue.save()
+
+    def test_rendered_once(self):
+        text = 'see PRJ-1 and @a'
+        html = markdownify(text, self.project)
+        self.assertIn('title="first issue"', html)
+        with self.assertNumQueries(0):
+            self.assertEqual(markdownify(text, self.project), html)
+
+        # the shared cache is used by the other processes
+        markdown_cache.local_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(markdownify(text, self.project), html)
+
+        # texts without project don't depend on anything
+        markdownify('*text*')
+        self.assertEqual(markdownify('*text*'), '<p><em>text</em></p>')
+
+    def test_invalidation(self):
+        text = 'see PRJ-1 and @b'
+        self.assertNotIn('@b</a>', markdownify(text, self.project))
+
+        # a new member gets linked
+        self.project.developer.add(self.user2)
+        self.assertIn('@b</a>', markdownify(text, self.project))
+
+        # a changed title is shown
+        self.issue.title = 'renamed issue'
+        self.issue.save()
+        self.assertIn('title="renamed issue"', markdownify(text, self.project))
+
+        # but other changes of issues don't invalidate anything
+        version = markdown_cache.get_version(self.project)
+        self.issue.priority = 4
+        self.issue.save()
+        self.assertEqual(markdown_cache.get_version(self.project), version)
+
+    def test_rendered_on_save(self):
+        comment = Comment(text='comment on PRJ-1', creator=self.user, issue=self.issue)
+        comment.save()
+        self.issue.description = 'description of PRJ-1'
+        self.issue.save()
+        self.project.description = '**description**'
+        self.project.save()
+
+        with self.assertNumQueries(0):
+            markdownify(comment.text, self.project)
+            markdownify(self.issue.description, self.project)
+            markdownify(self.project.description, self.project)
+
+    def test_no_cache_without_versions(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            self.assertIsNone(markdown_cache.get_key('PRJ-1', self.project))
+            self.assertIn('title="first issue"', markdownify('PRJ-1', self.project))
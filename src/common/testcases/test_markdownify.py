@@ -0,0 +1,65 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from common.templatetags.markdownify import render_markdown
+from project.models import Project
+from issue.models import Issue, reserve_numbers_for_tickets
+
+
+class MarkdownifyTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        cls.project = Project(creator=cls.user, name_short='PRJ')
+        cls.project.save()
+        cls.project.manager.add(cls.user)
+        numbers = reserve_numbers_for_tickets(cls.project, 50)
+        Issue.objects.bulk_create(Issue(title='issue ' + str(number), project=cls.project, number=number,
+                                        kanbancol=cls.project.kanbancol.first())
+                                  for number in numbers)
+
+    def test_references_resolved_with_one_query(self):
+        text = '\n\n'.join('PRJ-{} is related'.format(number) for number in range(1, 51))
+        with CaptureQueriesContext(connection) as queries:
+            html = render_markdown(text, self.project)
+        self.assertEqual(len([query for query in queries.captured_queries if 'issue_issue' in query['sql']]), 1)
+        for number in range(1, 51):
+            self.assertIn('title="issue {0}">PRJ-{0}</a>'.format(number), html)
+
+    def test_unknown_references(self):
+        html = render_markdown('PRJ-0, PRJ-1, PRJ-51 and OTH-1', self.project)
+        self.assertEqual(html.count('<a '), 1)
+        self.assertIn('PRJ-0', html)
+        self.assertIn('PRJ-51', html)
+
+    def test_references_in_code(self):
+        with CaptureQueriesContext(connection) as queries:
+            html = render_markdown('```\nPRJ-1\n```', self.project)
+        self.assertNotIn('<a ', html)
+        self.assertEqual(len([query for query in queries.captured_queries if 'issue_issue' in query['sql']]), 0)
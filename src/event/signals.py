@@ -30,8 +30,11 @@ create = Signal(providing_args=basic_args)
 modify = Signal(providing_args=basic_args + ["changed_data"])
 start = Signal(providing_args=basic_args)
 stop = Signal(providing_args=basic_args)
+# sent once for a bulk operation on issues (see issue.bulk); the instance is the project, issues are the numbers
+# of the changed issues and changed_data maps the changed fields to their new values
+bulk_modify = Signal(providing_args=basic_args + ["issues", "changed_data"])
 
-signals = [create, modify, start, stop]
+signals = [create, modify, start, stop, bulk_modify]
 
 
 def connector(sender, **kwargs):
@@ -22,6 +22,7 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 from django.db import models
+from django.db.models import Q
 from django.db.models.signals import post_save
 from lib.custom_model import CustomModel
 from django.dispatch import receiver
@@ -175,6 +176,10 @@ class Commit(SearchableMixin, CustomModel):
     def search_allowed_for_user(self, user):
         return self.user_has_read_permissions(user)
 
+    @classmethod
+    def search_allowed_filter(cls, user):
+        return Q(repository__project__in=user.get_projects())
+
     def get_search_title(self):
         return "(" + self.get_name_short() + ") " + self.get_title()
 
@@ -189,6 +194,9 @@ class Commit(SearchableMixin, CustomModel):
         return self.repository.project.user_has_read_permissions(user)
 
     searchable_fields = ['issue', 'date', 'author', 'name', 'message', 'changes']
+    search_select_related = ['issue__project']
+    search_project_lookup = 'issue__project__name'
+    fulltext_indexed = True
 
 
 @receiver(post_save, sender=Commit)
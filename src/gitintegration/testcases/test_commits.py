@@ -26,7 +26,6 @@ from django.urls import reverse
 import os
 import tempfile
 import shutil
-import json
 
 from git import Repo, Git
 
@@ -150,10 +149,10 @@ class GitFrontendTest(TestCase):
         remote_repo_master = remote_repo.index.commit(self.project.name_short + "-1 commit body")
 
         # import again, self.issue should now have a commit associated, activity shoud have increased
-        activity = len(json.loads(repo.project.activity))
+        activity = repo.project.activity_events.count()
         Frontend.import_new_commits(repo)
         repo.refresh_from_db()
-        self.assertGreater(len(json.loads(repo.project.activity)), activity)
+        self.assertGreater(repo.project.activity_events.count(), activity)
         self.assertEqual(repo.conn_ok, True)
         self.assertEqual(repo.last_commit_processed, remote_repo_master.hexsha)
         self.assertEqual(Commit.objects.count(), 1)
@@ -201,10 +200,10 @@ class GitFrontendTest(TestCase):
         remote_repo.index.add([f])
         remote_repo_master = remote_repo.index.commit(self.project.name_short + "-42 commit body with invalid issue id")
         # activity should not change
-        activity = len(json.loads(repo.project.activity))
+        activity = repo.project.activity_events.count()
         Frontend.import_new_commits(repo)
         repo.refresh_from_db()
-        self.assertEqual(len(json.loads(repo.project.activity)), activity)
+        self.assertEqual(repo.project.activity_events.count(), activity)
         self.assertEqual(repo.conn_ok, True)
         self.assertEqual(repo.last_commit_processed, remote_repo_master.hexsha)
         self.assertEqual(Commit.objects.count(), 1)
@@ -221,10 +220,10 @@ class GitFrontendTest(TestCase):
         tag = remote_repo.create_tag('Test-Tag', ref=remote_repo_master)
 
         # import again, self.issue should now have 2 commits associated
-        activity = len(json.loads(repo.project.activity))
+        activity = repo.project.activity_events.count()
         Frontend.import_new_commits(repo)
         repo.refresh_from_db()
-        self.assertGreater(len(json.loads(repo.project.activity)), activity)
+        self.assertGreater(repo.project.activity_events.count(), activity)
         self.assertEqual(repo.conn_ok, True)
         self.assertEqual(repo.last_commit_processed, remote_repo_master.hexsha)
         self.assertEqual(Commit.objects.count(), 2)
@@ -265,10 +264,10 @@ class GitFrontendTest(TestCase):
 
         # add another tag to an already imported commit
         tag = remote_repo.create_tag('Another_tag', ref=remote_repo_master)
-        activity = len(json.loads(repo.project.activity))
+        activity = repo.project.activity_events.count()
         Frontend.import_new_commits(repo)
         repo.refresh_from_db()
-        self.assertGreater(len(json.loads(repo.project.activity)), activity)
+        self.assertGreater(repo.project.activity_events.count(), activity)
 
         c = self.issue.commits.get(name=remote_repo_master.hexsha)
         self.assertEqual(len(c.get_tags()), 2)
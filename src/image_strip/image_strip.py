@@ -24,8 +24,7 @@ EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 from django.core.exceptions import ValidationError
 # exif stripping
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import io
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from PIL import Image
 # file type verification
 import magic
@@ -34,27 +33,41 @@ from common.settings import (ALLOWED_IMG_EXTENSIONS, MAX_IMG_SIZE_BASE, MAXIMUM_
 
 from django.utils.translation import ugettext_lazy as _
 
+# the number of bytes at the beginning of a file that are used to detect its type
+SNIFF_SIZE = 8192
 
-def create_img(in_memory_img, format_str, suffix_str, content_type):
-    # remove any possible suffixes to avoid possible confusion
-    img_name = in_memory_img.name.partition(".")[0]
-    img = Image.open(in_memory_img)
-    img_io_bytes = io.BytesIO()
-    # img.save(img_io_bytes, format=format_str)
-    # new_img = InMemoryUploadedFile(img_io_bytes, None, img_name+suffix_str, content_type,
-    #                                img_io_bytes.getbuffer().nbytes, None)
-    # store the image always as jpeg
-    # transform the alpha channel to white
+
+# libmagic only needs the header of a file, so there is no need to read the whole upload into memory
+def get_file_type(uploaded_file):
+    uploaded_file.seek(0)
+    file_type = magic.from_buffer(uploaded_file.read(SNIFF_SIZE))
+    uploaded_file.seek(0)
+    return file_type
+
+
+# transform the alpha channel to white
+def remove_alpha(img):
     if img.mode in ('RGBA', 'LA'):
         img_wo_alpha = Image.new(img.mode[:-1], img.size, '#ffffff')
         img_wo_alpha.paste(img, img.split()[-1])
         # TODO should img get closed?
         img = img_wo_alpha
+    return img
+
+
+def create_img(in_memory_img, format_str, suffix_str, content_type):
+    # remove any possible suffixes to avoid possible confusion
+    img_name = in_memory_img.name.partition(".")[0]
+    img = Image.open(in_memory_img)
+    # store the image always as jpeg
+    img = remove_alpha(img)
 
     # TODO I'm not sure yet whether this sanitizes the image too
-    img.convert('RGB').save(img_io_bytes, format="JPEG")
-    new_img = InMemoryUploadedFile(img_io_bytes, None, img_name+".jpg", "image/jpeg",
-                                   img_io_bytes.getbuffer().nbytes, None)
+    # the re-encoded image is written to a temporary file (which is removed when it gets closed), so it doesn't
+    # have to be kept in memory; the storage copies it in chunks afterwards
+    new_img = TemporaryUploadedFile(img_name+".jpg", "image/jpeg", 0, None)
+    img.convert('RGB').save(new_img, format="JPEG")
+    new_img.size = new_img.tell()
     new_img.seek(0)
     img.close()
     in_memory_img.close()
@@ -96,10 +109,9 @@ def return_in_memory_file(in_memory_file, has_to_be_an_image):
     # "Like any data supplied by the user, you shouldn't trust that the uploaded file is actually this type.
     # You’ll still need to validate that the file contains the content that the content-type header claims -
     # “trust but verify.”"    therefore the actual type is checked
-    # Normally chunks() is preferred over read(), since the later one has some DOS-potential because of the
-    # huge memory usage for big files. But this should be fine since there is a file size limitation.
-    img_type = magic.from_buffer(in_memory_file.read(in_memory_file.size))
-    in_memory_file.seek(0)
+    # Only the beginning of the file is read, files that aren't images are stored by the storage in chunks
+    # (big uploads are kept in temporary files by django), so an upload never has to fit into memory.
+    img_type = get_file_type(in_memory_file)
 
     # bmp
     if "PC bitmap" in img_type:
@@ -0,0 +1,88 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import io
+import os
+import tracemalloc
+from PIL import Image
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.test import SimpleTestCase
+
+from image_strip.image_strip import strip_if_file_is_an_img, strip_img_metadata
+
+
+# peak memory allocated by python while processing an upload; the pixel data of images is allocated by pillow
+# itself, so this covers the copies of the file contents
+def traced_peak(function, *args):
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+class StreamingUploadTest(SimpleTestCase):
+    def create_upload(self, name, content_type, data):
+        upload = TemporaryUploadedFile(name, content_type, len(data), None)
+        upload.write(data)
+        upload.seek(0)
+        return upload
+
+    def test_attachment_is_not_read_into_memory(self):
+        size = 10 * 1024**2
+        upload = self.create_upload('data.bin', 'application/octet-stream', os.urandom(size))
+        result, peak = traced_peak(strip_if_file_is_an_img, upload)
+        self.assertIs(result, upload)
+        self.assertEqual(result.tell(), 0)
+        self.assertLess(peak, 256 * 1024)
+        upload.close()
+
+    def test_image_is_reencoded_into_temporary_file(self):
+        # noise doesn't compress, so the jpeg is several MB big
+        img = Image.frombytes('RGB', (1500, 1500), os.urandom(1500 * 1500 * 3))
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format='PNG')
+        upload = self.create_upload('noise.png', 'image/png', img_bytes.getvalue())
+        del img_bytes
+
+        result, peak = traced_peak(strip_img_metadata, upload)
+        self.assertIsInstance(result, TemporaryUploadedFile)
+        self.assertEqual(result.name, 'noise.jpg')
+        self.assertGreater(result.size, 1024**2)
+        self.assertLess(peak, 512 * 1024)
+        self.assertEqual(Image.open(result).format, 'JPEG')
+        result.close()
+
+    def test_image_types_are_detected_from_the_header(self):
+        for format_str in ('PNG', 'JPEG', 'GIF', 'BMP'):
+            img_bytes = io.BytesIO()
+            Image.new('RGB', (800, 600), '#336699').save(img_bytes, format=format_str)
+            result = strip_img_metadata(SimpleUploadedFile('img', img_bytes.getvalue()))
+            self.assertEqual(result.content_type, 'image/jpeg')
+            result.close()
+
+        self.assertRaises(ValidationError, strip_img_metadata, SimpleUploadedFile('text', b'no image'))
@@ -0,0 +1,113 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import io
+import shutil
+from unittest import mock
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, override_settings
+
+from image_strip.thumbnails import THUMBNAIL_SIZES, get_thumbnail_name, get_thumbnail, get_thumbnail_url, \
+    create_thumbnails, delete_thumbnails
+
+test_dir = 'thumbnail_test'
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ThumbnailTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(default_storage.path(test_dir), ignore_errors=True)
+
+    def store_image(self, name, size, mode='RGBA', format='PNG'):
+        img_bytes = io.BytesIO()
+        Image.new(mode, size, 'red').save(img_bytes, format=format)
+        return default_storage.save(test_dir + '/' + name, ContentFile(img_bytes.getvalue()))
+
+    def test_thumbnail_names(self):
+        self.assertEqual(get_thumbnail_name('avatars/user/photo.jpg', 'small'), 'avatars/user/photo.small.jpg')
+        self.assertEqual(get_thumbnail_name('attachments/blobs/ab/abcdef', 'medium'),
+                         'attachments/blobs/ab/abcdef.medium.jpg')
+
+    def test_create_thumbnails(self):
+        name = self.store_image('photo.png', (1000, 500))
+        created = create_thumbnails(name)
+        self.assertEqual(sorted(created), sorted(get_thumbnail_name(name, size) for size in THUMBNAIL_SIZES))
+
+        for size, max_size in THUMBNAIL_SIZES.items():
+            with default_storage.open(get_thumbnail_name(name, size), 'rb') as f:
+                thumbnail = Image.open(f)
+                # the aspect ratio is kept and the alpha channel is removed
+                self.assertEqual(thumbnail.format, 'JPEG')
+                self.assertEqual(thumbnail.mode, 'RGB')
+                self.assertEqual(thumbnail.size, (max_size, max_size // 2))
+
+        # existing thumbnails aren't created again
+        self.assertEqual(create_thumbnails(name), [])
+
+        delete_thumbnails(name)
+        for size in THUMBNAIL_SIZES:
+            self.assertIsNone(get_thumbnail(name, size))
+        self.assertTrue(default_storage.exists(name))
+
+    def test_big_jpeg(self):
+        name = self.store_image('photo.jpg', (4000, 3000), mode='RGB', format='JPEG')
+        create_thumbnails(name)
+        with default_storage.open(get_thumbnail(name, 'small'), 'rb') as f:
+            self.assertEqual(Image.open(f).size, (THUMBNAIL_SIZES['small'], THUMBNAIL_SIZES['small'] * 3 // 4))
+
+    def test_no_image(self):
+        name = default_storage.save(test_dir + '/notes.txt', ContentFile(b'no image'))
+        self.assertEqual(create_thumbnails(name), [])
+        self.assertIsNone(get_thumbnail(name, 'small'))
+        self.assertEqual(create_thumbnails(test_dir + '/missing.png'), [])
+
+    def test_thumbnail_url_falls_back_to_original(self):
+        name = self.store_image('photo.png', (100, 100))
+        avatar = get_user_model()(username='a', avatar=name).avatar
+        self.assertEqual(get_thumbnail_url(avatar, 'small'), default_storage.url(name))
+        create_thumbnails(name)
+        self.assertEqual(get_thumbnail_url(avatar, 'small'), default_storage.url(get_thumbnail_name(name, 'small')))
+
+    def test_lookups_are_cached(self):
+        name = self.store_image('photo.png', (100, 100))
+        self.assertIsNone(get_thumbnail(name, 'small'))
+        create_thumbnails(name)
+        with mock.patch.object(default_storage, 'exists') as exists:
+            for i in range(3):
+                self.assertEqual(get_thumbnail(name, 'small'), get_thumbnail_name(name, 'small'))
+            exists.assert_not_called()
+
+        delete_thumbnails(name)
+        self.assertIsNone(get_thumbnail(name, 'small'))
+        with mock.patch.object(default_storage, 'exists') as exists:
+            self.assertIsNone(get_thumbnail(name, 'small'))
+            exists.assert_not_called()
@@ -0,0 +1,126 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from io import BytesIO
+import hashlib
+import os
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from image_strip.image_strip import remove_alpha
+
+# Thumbnails of uploaded images (avatars and image attachments).
+#
+# The thumbnails are created in the background by the celery task common.tasks.create_thumbnails and are stored
+# next to the original as '<name without extension>.<size>.jpg'. Uploaded images are always re-encoded with a name
+# without any further dots (see create_img()) and attachments are stored by their hash, so these names can't clash
+# with uploaded files. Until the thumbnails exist (or if the file isn't an image at all) the original is used.
+# All files are below MEDIA_ROOT, so the thumbnails are accessed through the default storage.
+# Whether a thumbnail exists is cached, so rendering e.g. the avatars on a board doesn't stat a file per avatar.
+# Missing thumbnails are only cached shortly, since processes with a local cache don't see the worker create them.
+# Thumbnails of images uploaded before they were introduced are created by the create_thumbnails management command.
+
+# the maximum width and height of the thumbnails; they are rendered at about half the size at most
+THUMBNAIL_SIZES = {
+    'small': 64,
+    'medium': 200,
+}
+THUMBNAIL_QUALITY = 85
+THUMBNAIL_CACHE_TIMEOUT = 60*60*24*7
+MISSING_THUMBNAIL_CACHE_TIMEOUT = 60*5
+
+
+def get_thumbnail_name(name, size):
+    return os.path.splitext(name)[0] + '.' + size + '.jpg'
+
+
+def get_cache_key(thumbnail_name):
+    return 'thumbnail_exists_'+hashlib.md5(thumbnail_name.encode('utf-8')).hexdigest()
+
+
+# returns the name of the thumbnail, if it has been created already
+def get_thumbnail(name, size):
+    thumbnail_name = get_thumbnail_name(name, size)
+    key = get_cache_key(thumbnail_name)
+    exists = cache.get(key)
+    if exists is None:
+        exists = default_storage.exists(thumbnail_name)
+        cache.set(key, exists, THUMBNAIL_CACHE_TIMEOUT if exists else MISSING_THUMBNAIL_CACHE_TIMEOUT)
+    if exists:
+        return thumbnail_name
+    return None
+
+
+def get_thumbnail_url(field_file, size):
+    thumbnail_name = get_thumbnail(field_file.name, size)
+    if thumbnail_name is None:
+        return field_file.url
+    return default_storage.url(thumbnail_name)
+
+
+def create_thumbnail(img, size):
+    thumbnail = img.copy()
+    thumbnail.thumbnail((THUMBNAIL_SIZES[size], THUMBNAIL_SIZES[size]))
+    if thumbnail.mode == 'P':
+        thumbnail = thumbnail.convert('RGBA')
+    thumbnail = remove_alpha(thumbnail)
+    content = BytesIO()
+    thumbnail.convert('RGB').save(content, format='JPEG', quality=THUMBNAIL_QUALITY)
+    return ContentFile(content.getvalue())
+
+
+# create the missing thumbnails of the file; returns the names of the created thumbnails
+# The content of a file never changes without its name changing (attachments are stored by their hash, replaced
+# avatars are removed together with their thumbnails), so existing thumbnails are up to date.
+def create_thumbnails(name):
+    if not name:
+        return []
+    missing = [size for size in THUMBNAIL_SIZES if not default_storage.exists(get_thumbnail_name(name, size))]
+    if not missing or not default_storage.exists(name):
+        return []
+
+    with default_storage.open(name, 'rb') as original:
+        try:
+            img = Image.open(original)
+            # JPEGs can be decoded at a fraction of their size, which is a lot faster for big photos
+            biggest = max(THUMBNAIL_SIZES[size] for size in missing)
+            img.draft('RGB', (biggest, biggest))
+            img.load()
+        except (OSError, Image.DecompressionBombError):
+            # not an image (or none Pillow can decode), there won't be a thumbnail for it
+            return []
+
+        created = [default_storage.save(get_thumbnail_name(name, size), create_thumbnail(img, size))
+                   for size in missing]
+        img.close()
+    cache.set_many({get_cache_key(thumbnail_name): True for thumbnail_name in created}, THUMBNAIL_CACHE_TIMEOUT)
+    return created
+
+
+def delete_thumbnails(name):
+    for size in THUMBNAIL_SIZES:
+        default_storage.delete(get_thumbnail_name(name, size))
+    cache.delete_many([get_cache_key(get_thumbnail_name(name, size)) for size in THUMBNAIL_SIZES])
@@ -331,11 +331,11 @@ class OnSignalTest(CallbackTestBase):
         self.assertCalled(
             channel="channel",
             attachments=[{
-                'fallback': "username created issue proj-4 sometitle.",
+                'fallback': "username created issue proj-3 sometitle.",
                 'pretext': 'New Issue:',
                 'text': "",
-                'title': "proj-4 sometitle",
-                'title_link': "http://localhost:8000" + self.issue.get_absolute_url().replace("1", "4"),
+                'title': "proj-3 sometitle",
+                'title_link': "http://localhost:8000" + self.issue.get_absolute_url().replace("1", "3"),
                 'author_name': "username",
                 'author_link': "http://localhost:8000" + self.user.get_absolute_url(),
                 'author_icon': "http://localhost:8000" + self.user.avatar.url,
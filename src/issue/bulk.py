@@ -0,0 +1,150 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from actstream.models import followers
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from event import signals
+from issue.models import Issue
+from issue.signals import invalidate_issue_templates, invalidate_dependents
+from landing_page.actstream_util import follow_issues, unfollow_issues
+from project import completion
+from search import resultcache
+
+# Bulk operations on the issues of a project.
+#
+# Instead of changing and saving the issues one by one, which runs the whole save signal chain for every issue,
+# every operation is done with set-based UPDATEs. The side effects of Issue.save() (cached issue cards, cached search
+# results and completions, dependency graphs, activity stream follows, project activity) are handled once for the
+# whole set and a single bulk_modify event is sent.
+#
+# The issues can be given as queryset or as iterable of issues; issues of other projects are ignored.
+# Every operation returns the number of issues it changed.
+
+
+def get_queryset(project, issues):
+    if isinstance(issues, QuerySet):
+        return issues.filter(project=project)
+    return Issue.objects.filter(project=project, pk__in=[issue.pk for issue in issues])
+
+
+# the (pk, number) pairs of the issues in the queryset
+def get_rows(queryset):
+    return list(queryset.order_by('number').values_list('pk', 'number'))
+
+
+def finish(project, rows, user, changed_data, delete_backlog=True):
+    numbers = [number for pk, number in rows]
+    invalidate_issue_templates(project, numbers, delete_backlog=delete_backlog)
+    invalidate_dependents([project.pk], [pk for pk, number in rows])
+    resultcache.bump_version(Issue.get_search_name())
+    project.increase_activity(timezone.now())
+    signals.bulk_modify.send(sender=Issue, instance=project, user=user, issues=numbers, changed_data=changed_data)
+
+
+def archive(project, issues, user=None, archived=True):
+    with transaction.atomic():
+        rows = get_rows(get_queryset(project, issues).filter(archived=not archived))
+        if not rows:
+            return 0
+        pks = [pk for pk, number in rows]
+        Issue.objects.filter(pk__in=pks).update(archived=archived)
+
+        # archived issues aren't followed by the project followers
+        users = list(followers(project))
+        if archived:
+            unfollow_issues(users, pks)
+        else:
+            follow_issues(users, pks)
+
+    completion.bump_version('issues', project)
+    finish(project, rows, user, {'archived': str(archived)})
+    return len(rows)
+
+
+def unarchive(project, issues, user=None):
+    return archive(project, issues, user, archived=False)
+
+
+def move(project, issues, kanbancol, user=None):
+    if kanbancol.project_id != project.pk:
+        raise ValueError("The column doesn't belong to the project")
+
+    with transaction.atomic():
+        rows = get_rows(get_queryset(project, issues).exclude(kanbancol=kanbancol))
+        if not rows:
+            return 0
+        Issue.objects.filter(pk__in=[pk for pk, number in rows]).update(kanbancol=kanbancol)
+
+    # a column change only affects the sprintboard cards (see issue.signals.invalidate_cache)
+    finish(project, rows, user, {'kanbancol': str(kanbancol)}, delete_backlog=False)
+    return len(rows)
+
+
+def set_sprint(project, issues, sprint, user=None):
+    if sprint is not None and sprint.project_id != project.pk:
+        raise ValueError("The sprint doesn't belong to the project")
+
+    with transaction.atomic():
+        if sprint is None:
+            rows = get_rows(get_queryset(project, issues).filter(sprint__isnull=False))
+        else:
+            rows = get_rows(get_queryset(project, issues).exclude(sprint=sprint))
+        if not rows:
+            return 0
+        Issue.objects.filter(pk__in=[pk for pk, number in rows]).update(sprint=sprint)
+
+    finish(project, rows, user, {'sprint': str(sprint)})
+    return len(rows)
+
+
+# adds the users to the assignees of the issues; with replace=True they become the only assignees
+def assign(project, issues, users, user=None, replace=False):
+    users = list(users)
+    user_pks = {u.pk for u in users}
+    if project.get_members().filter(pk__in=user_pks).count() != len(user_pks):
+        raise ValueError("Only members of the project can be assigned")
+
+    through = Issue.assignee.through
+    with transaction.atomic():
+        rows = get_rows(get_queryset(project, issues))
+        pks = [pk for pk, number in rows]
+        existing = set(through.objects.filter(issue_id__in=pks).values_list('issue_id', 'customuser_id'))
+        removed = set()
+        if replace:
+            removed = {pair for pair in existing if pair[1] not in user_pks}
+            through.objects.filter(issue_id__in=pks).exclude(customuser_id__in=user_pks).delete()
+        added = {(pk, user_pk) for pk in pks for user_pk in user_pks} - existing
+        through.objects.bulk_create(through(issue_id=pk, customuser_id=user_pk) for pk, user_pk in added)
+
+        changed = {pk for pk, user_pk in added | removed}
+        rows = [row for row in rows if row[0] in changed]
+        if not rows:
+            return 0
+
+    resultcache.bump_version(get_user_model().get_search_name())
+    finish(project, rows, user, {'assignee': ', '.join(sorted(u.username for u in users))})
+    return len(rows)
@@ -0,0 +1,72 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+
+# Keyset pagination of the comments of an issue.
+#
+# The comments are ordered by (when, seqnum), oldest or newest first. A page continues after the last comment of
+# the previous page, which is identified by a cursor '<when in microseconds since the epoch>-<seqnum>'. In contrast
+# to OFFSET pagination the database doesn't have to skip all previous comments (the index on (issue, when, seqnum)
+# is used for every page) and comments that are added in the meantime don't shift the pages.
+
+COMMENTS_PER_PAGE = 50
+
+ORDERINGS = {
+    'oldest': ('when', 'seqnum'),
+    'newest': ('-when', '-seqnum'),
+}
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def get_cursor(comment):
+    delta = comment.when - EPOCH
+    microseconds = (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+    return str(microseconds) + '-' + str(comment.seqnum)
+
+
+# raises ValueError for invalid cursors
+def parse_cursor(cursor):
+    microseconds, seqnum = cursor.rsplit('-', 1)
+    return EPOCH + datetime.timedelta(microseconds=int(microseconds)), int(seqnum)
+
+
+# returns the comments of the page and the cursor of the next page (None if it is the last page)
+def get_page(issue, order='oldest', cursor=None, size=COMMENTS_PER_PAGE):
+    comments = issue.comments.select_related('creator', 'attachment').order_by(*ORDERINGS[order])
+    if cursor:
+        when, seqnum = parse_cursor(cursor)
+        if order == 'newest':
+            comments = comments.filter(Q(when__lt=when) | Q(when=when, seqnum__lt=seqnum))
+        else:
+            comments = comments.filter(Q(when__gt=when) | Q(when=when, seqnum__gt=seqnum))
+
+    # one more comment tells whether there is a next page
+    comments = list(comments[:size + 1])
+    if len(comments) > size:
+        return comments[:size], get_cursor(comments[size - 1])
+    return comments, None
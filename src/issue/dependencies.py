@@ -0,0 +1,181 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+from issue.models import Issue
+
+# Dependency graph of the issues (Issue.dependsOn, an issue depends on the issues that block it).
+#
+# The transitive closures are computed by the database with recursive queries (WITH RECURSIVE, supported by
+# PostgreSQL and SQLite), so walking the graph doesn't need a query per hop. UNION removes duplicate rows, so the
+# queries terminate even if the stored graph contains a cycle; new cycles are rejected by the issue form and the API.
+#
+# An issue is blocked while one of the issues it depends on is unfinished (neither in a 'Done' column nor archived).
+# The blocked issues and the critical path of a project are cached per project. The signal handlers in issue.signals
+# and issue.bulk invalidate them (and the cached issue cards showing the blocked badge) whenever dependencies, the
+# column or the archived state of issues change.
+
+DEPENDS_ON = ('from_issue_id', 'to_issue_id')
+BLOCKS = ('to_issue_id', 'from_issue_id')
+
+CLOSURE_QUERY = """
+WITH RECURSIVE closure(id) AS (
+    SELECT {next} FROM {edges} WHERE {start} IN ({pks})
+    UNION
+    SELECT e.{next} FROM {edges} e JOIN closure c ON e.{start} = c.id
+)
+SELECT id FROM closure
+"""
+
+CACHE_TIMEOUT = 60*60*24
+
+
+def get_finished_q(prefix=''):
+    return Q(**{prefix + 'kanbancol__type': 'Done'}) | Q(**{prefix + 'archived': True})
+
+
+# pks of all issues reachable from the given ones; direction is DEPENDS_ON or BLOCKS
+def get_closure(pks, direction=DEPENDS_ON):
+    pks = [int(pk) for pk in pks]
+    if not pks:
+        return set()
+    start, next = direction
+    query = CLOSURE_QUERY.format(edges=connection.ops.quote_name(Issue.dependsOn.through._meta.db_table),
+                                 start=start, next=next, pks=', '.join(['%s'] * len(pks)))
+    with connection.cursor() as cursor:
+        cursor.execute(query, pks)
+        return {row[0] for row in cursor.fetchall()}
+
+
+# all issues the issue depends on, directly or transitively
+def get_dependencies(issue):
+    return Issue.objects.filter(pk__in=get_closure([issue.pk], DEPENDS_ON))
+
+
+# all issues that depend on the issue, directly or transitively
+def get_dependents(issue):
+    return Issue.objects.filter(pk__in=get_closure([issue.pk], BLOCKS))
+
+
+# whether the issue would (transitively) depend on itself if it depended on the given issues
+def creates_cycle(issue, depends_on):
+    if issue.pk is None:
+        # nothing can depend on a new issue yet
+        return False
+    pks = [dependency.pk for dependency in depends_on]
+    return issue.pk in pks or issue.pk in get_closure(pks, DEPENDS_ON)
+
+
+def get_cache_key(project):
+    return 'issue_dependencies_' + project.name_short
+
+
+def compute_blocked(project):
+    edges = Issue.dependsOn.through.objects.filter(from_issue__project=project)
+    return sorted(set(edges.exclude(get_finished_q('to_issue__'))
+                           .values_list('from_issue__number', flat=True)))
+
+
+# the chain of unfinished issues of the project with the most story points (and the most issues on a tie),
+# starting with the issue that has to be done first
+# Every chain is a path in the graph, so the longest one is found with a single pass over all edges
+# (memoized depth-first search) instead of enumerating all paths, which grows exponentially with the graph.
+def compute_critical_path(project):
+    unfinished = project.issue.exclude(get_finished_q())
+    weights = {number: (storypoints, 1) for number, storypoints in unfinished.values_list('number', 'storypoints')}
+    edges = Issue.dependsOn.through.objects.filter(from_issue__in=unfinished, to_issue__in=unfinished)
+    depends_on = {}
+    for issue, dependency in edges.values_list('from_issue__number', 'to_issue__number'):
+        depends_on.setdefault(issue, []).append(dependency)
+
+    # number -> (weight of the longest chain ending with the issue, previous issue of that chain)
+    longest = {}
+    for number in sorted(weights):
+        if number in longest:
+            continue
+        # iterative depth-first search, the graph may be deep; issues on the stack break stored cycles
+        stack = [number]
+        on_stack = {number}
+        while stack:
+            current = stack[-1]
+            pending = [dependency for dependency in depends_on.get(current, [])
+                       if dependency not in longest and dependency not in on_stack]
+            if pending:
+                stack.append(pending[0])
+                on_stack.add(pending[0])
+                continue
+            best, previous = (0, 0), None
+            for dependency in depends_on.get(current, []):
+                if dependency in longest and longest[dependency][0] > best:
+                    best, previous = longest[dependency][0], dependency
+            longest[current] = ((best[0] + weights[current][0], best[1] + weights[current][1]), previous)
+            stack.pop()
+            on_stack.discard(current)
+
+    if not longest:
+        return []
+    path = []
+    current = max(sorted(longest), key=lambda number: longest[number][0])
+    while current is not None:
+        path.append(current)
+        current = longest[current][1]
+    return path[::-1]
+
+
+# {'blocked': numbers of the blocked issues, 'critical_path': numbers of the issues on the critical path}
+def get_graph(project):
+    key = get_cache_key(project)
+    graph = cache.get(key)
+    if graph is None:
+        graph = {
+            'blocked': compute_blocked(project),
+            'critical_path': compute_critical_path(project),
+        }
+        cache.set(key, graph, CACHE_TIMEOUT)
+    return graph
+
+
+def get_blocked(project):
+    return set(get_graph(project)['blocked'])
+
+
+def get_critical_path(project):
+    return get_graph(project)['critical_path']
+
+
+def is_blocked(issue):
+    return Issue.dependsOn.through.objects.filter(from_issue=issue).exclude(get_finished_q('to_issue__')).exists()
+
+
+# whether an issue of the sprint depends on an unfinished issue that isn't part of the sprint
+def is_sprint_blocked(sprint):
+    pks = list(sprint.issue.values_list('pk', flat=True))
+    return Issue.objects.filter(pk__in=get_closure(pks, DEPENDS_ON)) \
+                        .exclude(pk__in=pks).exclude(get_finished_q()).exists()
+
+
+def invalidate(projects):
+    cache.delete_many([get_cache_key(project) for project in projects])
@@ -21,11 +21,12 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
-from django.forms import ModelForm, CharField
+from django.forms import ModelForm, CharField, ValidationError
 from django.urls import reverse_lazy
 from django.forms.widgets import NumberInput
 
 from .models import Issue, Comment, Attachment
+from . import dependencies
 from django.utils.translation import ugettext as _nl
 
 from image_strip.image_strip import strip_if_file_is_an_img
@@ -68,6 +69,13 @@ class LimitKanbanForm(ModelForm):
 
     description = CharField(widget=CustomPagedownWidget(), required=False)
 
+    def clean_dependsOn(self):
+        depends_on = self.cleaned_data['dependsOn']
+        if dependencies.creates_cycle(self.instance, depends_on):
+            raise ValidationError(_nl("An issue can't depend on an issue that depends on it."),
+                                  code='dependency_cycle')
+        return depends_on
+
     class Meta:
         model = Issue
         fields = ['title', 'kanbancol', 'due_date', 'type', 'assignee',
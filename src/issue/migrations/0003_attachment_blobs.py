@@ -0,0 +1,140 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:58
+
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.db import migrations, models, transaction
+from os.path import basename
+import hashlib
+import issue.models
+import issue.storage
+import os
+import tempfile
+
+
+# The names of the blobs and thumbnails as they were when this migration was written. They are copied from
+# issue.storage and image_strip.thumbnails, so changes of these modules can't change what the migration does.
+BLOB_DIR = 'attachments/blobs'
+THUMBNAIL_SIZES = ['small', 'medium']
+
+
+def get_blob_name(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    digest = digest.hexdigest()
+    return BLOB_DIR + '/' + digest[:2] + '/' + digest
+
+
+def write_blob(storage, name, content):
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in content.chunks():
+                tmp.write(chunk)
+        if storage.file_permissions_mode is not None:
+            os.chmod(tmp_path, storage.file_permissions_mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def delete_thumbnails(storage, name):
+    thumbnail_names = [os.path.splitext(name)[0] + '.' + size + '.jpg' for size in THUMBNAIL_SIZES]
+    for thumbnail_name in thumbnail_names:
+        storage.delete(thumbnail_name)
+    cache.delete_many(['thumbnail_exists_'+hashlib.md5(thumbnail_name.encode('utf-8')).hexdigest()
+                       for thumbnail_name in thumbnail_names])
+
+
+# The replaced files are only deleted after the migration has been committed; if it fails, the attachments still
+# refer to them. Without a transaction (databases that can't roll back schema changes) they are deleted right away,
+# i.e. after all attachments have been migrated.
+def delete_after_commit(schema_editor, delete):
+    transaction.on_commit(delete, using=schema_editor.connection.alias)
+
+
+# move the files of the existing attachments to the content-addressed storage
+def store_by_content(apps, schema_editor):
+    Attachment = apps.get_model('issue', 'Attachment')
+    AttachmentBlob = apps.get_model('issue', 'AttachmentBlob')
+    storage = FileSystemStorage()
+
+    references = {}
+    replaced = []
+    for attachment in Attachment.objects.exclude(file=''):
+        old_name = attachment.file.name
+        attachment.name = basename(old_name)
+        if storage.exists(old_name):
+            with storage.open(old_name, 'rb') as content:
+                name = get_blob_name(content)
+                if not storage.exists(name):
+                    write_blob(storage, name, content)
+            attachment.file.name = name
+            references[name] = references.get(name, 0) + 1
+        attachment.save(update_fields=['file', 'name'])
+        if attachment.file.name != old_name:
+            replaced.append(old_name)
+
+    AttachmentBlob.objects.bulk_create(AttachmentBlob(name=name, references=count)
+                                       for name, count in references.items())
+
+    def delete_replaced():
+        for name in replaced:
+            storage.delete(name)
+    delete_after_commit(schema_editor, delete_replaced)
+
+
+# move the files back to the per-issue names they had before, one copy per attachment
+def store_by_name(apps, schema_editor):
+    Attachment = apps.get_model('issue', 'Attachment')
+    AttachmentBlob = apps.get_model('issue', 'AttachmentBlob')
+    storage = FileSystemStorage()
+
+    for attachment in Attachment.objects.exclude(file=''):
+        blob_name = attachment.file.name
+        if not storage.exists(blob_name):
+            continue
+        name = 'attachments/' + str(attachment.issue_id) + '/' + (attachment.name or basename(blob_name))
+        with storage.open(blob_name) as content:
+            attachment.file.name = storage.save(name, content)
+        attachment.save(update_fields=['file'])
+
+    blob_names = list(AttachmentBlob.objects.values_list('name', flat=True))
+
+    def delete_blobs():
+        for name in blob_names:
+            storage.delete(name)
+            delete_thumbnails(storage, name)
+    delete_after_commit(schema_editor, delete_blobs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issue', '0002_auto_20170714_0744'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256, unique=True)),
+                ('references', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='name',
+            field=models.CharField(blank=True, editable=False, max_length=256, verbose_name='Name'),
+        ),
+        migrations.AlterField(
+            model_name='attachment',
+            name='file',
+            field=models.FileField(max_length=256, storage=issue.storage.ContentAddressedStorage(), upload_to=issue.models.get_upload_path, verbose_name='File'),
+        ),
+        migrations.RunPython(store_by_content, store_by_name),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issue', '0003_attachment_blobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['issue', 'when', 'seqnum'], name='issue_comment_page_idx'),
+        ),
+    ]
@@ -21,11 +21,10 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
-from django.db import models
-from django.db import transaction
-from django.db.models.signals import pre_save, post_save
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.core.validators import MinValueValidator
-from django.core.exceptions import ObjectDoesNotExist
 from django.dispatch import receiver
 from django.urls import reverse
 from django.utils import timezone
@@ -46,50 +45,58 @@ from search.fieldcheckings import SearchableMixin
 
 from django.utils.translation import ugettext_lazy as _
 from lib.custom_model import CustomModel
+from lib import sequence
+from lib.change_tracking import ChangeTrackingMixin
+from issue.storage import attachment_storage, remove_reference
+from image_strip import thumbnails
 
 
-@transaction.atomic
+# the numbers are allocated by atomic updates of the counters, without saving the project or issue
 def get_number_for_ticket(project):
-    retval = project.nextTicketId
-    project.nextTicketId += 1
-    project.save()
-    return retval
+    return sequence.allocate(project, 'nextTicketId')
+
+
+# reserve a block of consecutive ticket numbers, e.g. for bulk imports; returns the range of the reserved numbers
+# issues that get one of these numbers assigned before they are saved don't allocate another one
+def reserve_numbers_for_tickets(project, count):
+    first = sequence.allocate(project, 'nextTicketId', count)
+    return range(first, first + count)
 
 
-@transaction.atomic
 def get_number_for_comment(issue):
-    retval = issue.nextCommentId
-    issue.nextCommentId += 1
-    issue.save()
-    return retval
+    return sequence.allocate(issue, 'nextCommentId')
 
 
-@transaction.atomic
 def get_number_for_attachment(issue):
-    retval = issue.nextAttachmentId
-    issue.nextAttachmentId += 1
-    issue.save()
-    return retval
+    return sequence.allocate(issue, 'nextAttachmentId')
 
 
-@transaction.atomic
 def get_number_for_timelog(issue):
-    retval = issue.nextTimelogId
-    issue.nextTimelogId += 1
-    issue.save()
-    return retval
+    return sequence.allocate(issue, 'nextTimelogId')
 
 
 def get_upload_path(instance, filename):
     return "attachments/" + str(instance.issue.pk) + "/" + instance.file.name
 
 
+# the number of attachments referring to a stored file (see issue.storage)
+class AttachmentBlob(models.Model):
+    name = models.CharField(max_length=256, unique=True)
+    references = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
 class Attachment(SearchableMixin, CustomModel):
     seqnum = models.IntegerField(_("Attachment number"), editable=False, default=-1)
     file = models.FileField(_("File"),
                             upload_to=get_upload_path,
+                            storage=attachment_storage,
                             max_length=256,
                             )
+    # the files are stored by their content, so the name of the uploaded file is kept here
+    name = models.CharField(_("Name"), max_length=256, editable=False, blank=True)
     when = models.DateTimeField(_("Uploaded at"),
                                 validators=[
                                     date_is_present_or_future
@@ -116,15 +123,29 @@ class Attachment(SearchableMixin, CustomModel):
         verbose_name = _("attachment")
         verbose_name_plural = _("attachments")
 
+    # the storage adds the reference to the blob while the file field is saved, so the reference has to be rolled
+    # back together with the row if the insert fails (a new blob stays on disk and is used by the next upload of it)
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            return super(Attachment, self).save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('issue:detail', kwargs={'project': self.issue.project.name_short, 'sqn_i': self.issue.number})
 
     def __str__(self):
-        return basename(self.file.name)
+        return self.name or basename(self.file.name)
+
+    # the name of the thumbnail, if the attachment is an image and the thumbnail has been created already
+    def get_thumbnail(self, size='medium'):
+        return thumbnails.get_thumbnail(self.file.name, size)
 
     def search_allowed_for_user(self, user):
         return self.issue.project.developer_allowed(user)
 
+    @classmethod
+    def search_allowed_filter(cls, user):
+        return Q(issue__project__in=user.get_projects())
+
     def user_has_write_permissions(self, user):
         # the check for issue read permission is required as well. One might be the creator of a comment
         # but not part of the project anymore
@@ -134,12 +155,27 @@ class Attachment(SearchableMixin, CustomModel):
         return self.issue.user_has_read_permissions(user)
 
     searchable_fields = ['when', 'creator', 'issue']
+    search_select_related = ['issue__project']
+
+
+@receiver(pre_save, sender=Attachment)
+def set_attachment_name(sender, instance, *args, **kwargs):
+    # the file isn't stored yet, so it still has the name it was uploaded with
+    if not instance.name and instance.file and not instance.file._committed:
+        instance.name = basename(instance.file.name)
+
+
+@receiver(post_delete, sender=Attachment)
+def release_attachment_file(sender, instance, *args, **kwargs):
+    if instance.file:
+        remove_reference(instance.file.storage, instance.file.name)
 
 
 @receiver(pre_save, sender=Attachment)
 def set_attachment_number(sender, instance, *args, **kwargs):
     if instance.seqnum == -1:
         instance.seqnum = get_number_for_attachment(instance.issue)
+        instance.issue.project.increase_activity(timezone.now(), instance.issue)
     return
 
 
@@ -181,6 +217,8 @@ class Comment(SearchableMixin, CustomModel):
         ordering = ['when']
         verbose_name = _("comment")
         verbose_name_plural = _("comments")
+        # the comments are paginated by (when, seqnum), see issue.comment_pages
+        indexes = [models.Index(fields=['issue', 'when', 'seqnum'], name='issue_comment_page_idx')]
 
     def save(self, *args, **kwargs):
         if self.id and Comment.objects.get(id=self.id).text != self.text:
@@ -199,6 +237,10 @@ class Comment(SearchableMixin, CustomModel):
     def search_allowed_for_user(self, user):
         return self.issue.project.developer_allowed(user)
 
+    @classmethod
+    def search_allowed_filter(cls, user):
+        return Q(issue__project__in=user.get_projects())
+
     def get_relative_project(self):
         return self.issue.project.name
 
@@ -219,14 +261,17 @@ class Comment(SearchableMixin, CustomModel):
         return self.text
 
     searchable_fields = ['when', 'creator', 'issue', 'text']
+    search_select_related = ['issue__project']
+    search_project_lookup = 'issue__project__name'
+    fulltext_indexed = True
 
 
 @receiver(pre_save, sender=Comment)
 def set_comment_number(sender, instance, *args, **kwargs):
     if instance.seqnum == -1:
         instance.seqnum = get_number_for_comment(instance.issue)
+        instance.issue.project.increase_activity(timezone.now(), instance.issue)
     else:
-        # comment edit, new comment handled in get_number_for_comment via issue.save()
         old = Comment.objects.get(issue=instance.issue, seqnum=instance.seqnum)
         if old.text != instance.text:
             instance.issue.project.increase_activity(timezone.now(), instance.issue)
@@ -251,7 +296,7 @@ class IssueQuerySet(models.QuerySet):
         return self.exclude(kanbancol__type='Done')
 
 
-class Issue(SearchableMixin, CustomModel):
+class Issue(sequence.SequenceFieldsMixin, ChangeTrackingMixin, SearchableMixin, CustomModel):
     title = models.CharField(_("Title"), max_length=100)
     created = models.DateTimeField(auto_now_add=True, editable=False)
     project = models.ForeignKey(Project, models.CASCADE, verbose_name=_("project"), related_name="issue")
@@ -340,6 +385,10 @@ class Issue(SearchableMixin, CustomModel):
 
     searchable_fields = ['project', 'sprint', 'description', 'kanbancol', 'assignee', 'due_date', 'tags',
                          'number', 'priority', 'storypoints', 'title', 'type', 'creator']
+    search_select_related = ['project']
+    search_project_lookup = 'project__name'
+    fulltext_indexed = True
+    sequence_fields = ('nextCommentId', 'nextAttachmentId', 'nextTimelogId')
 
     class Meta:
         ordering = ['number']
@@ -372,6 +421,10 @@ class Issue(SearchableMixin, CustomModel):
     def search_allowed_for_user(self, user):
         return self.project.developer_allowed(user)
 
+    @classmethod
+    def search_allowed_filter(cls, user):
+        return Q(project__in=user.get_projects())
+
     def get_search_title(self):
         return "(" + self.get_ticket_identifier() + ") " + self.title
 
@@ -402,21 +455,25 @@ def set_ticket_number(sender, instance, *args, **kwargs):
 
 @receiver(post_save, sender=Issue)
 def set_project_activity_counter(sender, instance, *args, **kwargs):
+    # saves that didn't change anything are no activity
+    if not kwargs.get('created') and not instance.get_dirty_fields():
+        return
     return instance.project.increase_activity(timezone.now(), instance)
 
 
+# the handlers below get the previous state from the pre-image of the issue (see lib.change_tracking),
+# which is loaded at most once per save
 @receiver(pre_save, sender=Issue)
 def handle_follow_unfollow_on_archive_unarchive(sender, instance, *args, **kwargs):
-    try:
-        old = Issue.objects.get(project=instance.project, number=instance.number)
-    except ObjectDoesNotExist:
+    old = instance.get_pre_image()
+    if old is None or not instance.has_changed('archived'):
         return
 
     # unfollow/follow in archive/unarchive (activity stream)
-    if not old.archived and instance.archived:
+    if not old['archived'] and instance.archived:
         for user in followers(instance.project):
             unfollow_issue(user, instance)
-    if old.archived and not instance.archived:
+    if old['archived'] and not instance.archived:
         for user in followers(instance.project):
             follow_issue(user, instance)
 
@@ -432,9 +489,9 @@ def set_kanbancol(sender, instance, *args, **kwargs):
     This signal handler has to be the last one. Handlers are called in reverse
     order of connection and this handler is vital.
     """
-    if not hasattr(instance, 'kanbancol'):
+    if instance.kanbancol_id is None:
         instance.kanbancol = instance.project.kanbancol.first()
     # This is necessary for model mommy to work properly
-    if instance.kanbancol.project.id != instance.project.id:
+    elif instance.has_changed('kanbancol', 'project') and instance.kanbancol.project_id != instance.project_id:
         instance.kanbancol = instance.project.kanbancol.first()
     return
@@ -21,14 +21,18 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
-from django.db.models.signals import post_save, m2m_changed, post_init, post_delete
+from django.db.models.signals import post_save, m2m_changed, post_init, post_delete, pre_delete
 from django.dispatch import receiver
-from issue.models import Issue, Issue
+from django.db import transaction
+from issue.models import Issue, Issue, Attachment
 from timelog.models import Punch
 from sprint.models import Sprint
+from project.models import Project
 
 from django.core.cache import cache
 from django.core.cache.utils import make_template_fragment_key
+from common.tasks import create_thumbnails
+from issue import dependencies
 
 
 def invalidate_cache(sender, instance, **kwargs):
@@ -81,6 +85,73 @@ def invalidate_cache(sender, instance, **kwargs):
                 cache.delete(key2)
 
 
+# bulk counterpart of invalidate_cache() for the issues with the given numbers (see issue.bulk)
+def invalidate_issue_templates(project, numbers, delete_backlog=True, delete_board=True):
+    keys = []
+    for username in project.get_members().values_list('username', flat=True):
+        for number in numbers:
+            if delete_backlog:
+                keys.append(make_template_fragment_key('backlog_issue_template',
+                                                       [project.name_short, number, username]))
+            if delete_board:
+                keys.append(make_template_fragment_key('sprintboard_issue_template',
+                                                       [project.name_short, number, username]))
+    cache.delete_many(keys)
+
+
+# the cached dependency graphs of the projects are outdated, as are the cached cards (blocked badge) of the
+# depending issues, which are given as (project pk, number) pairs
+def invalidate_dependencies(project_pks, depending):
+    depending = list(depending)
+    projects = Project.objects.in_bulk(set(project_pks) | {project_pk for project_pk, number in depending})
+    dependencies.invalidate(projects.values())
+    numbers = {}
+    for project_pk, number in depending:
+        numbers.setdefault(project_pk, []).append(number)
+    for project_pk, project_numbers in numbers.items():
+        invalidate_issue_templates(projects[project_pk], project_numbers, delete_backlog=False)
+
+
+# the issues with the given pks have been finished, reopened, deleted or their story points changed
+def invalidate_dependents(project_pks, pks):
+    depending = Issue.dependsOn.through.objects.filter(to_issue__in=pks) \
+                                               .values_list('from_issue__project', 'from_issue__number')
+    invalidate_dependencies(project_pks, depending)
+
+
+def invalidate_dependencies_on_change(sender, instance, created=False, **kwargs):
+    if kwargs.get('signal') is post_save and \
+            (created or not instance.has_changed('kanbancol', 'archived', 'storypoints')):
+        return
+    invalidate_dependents([instance.project_id], [instance.pk])
+
+
+def invalidate_dependencies_on_edit(sender, instance, action, reverse, pk_set, **kwargs):
+    related = 'dependent' if reverse else 'dependsOn'
+    if action == 'pre_clear':
+        # the removed issues aren't known anymore after the clear
+        instance._cleared_dependencies = list(getattr(instance, related).values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_dependencies', [])
+    others = Issue.objects.filter(pk__in=pk_set).values_list('project', 'number')
+    # the instance is the depending issue, unless the relation has been changed from the other side
+    if reverse:
+        invalidate_dependencies([instance.project_id], others)
+    else:
+        invalidate_dependencies([project_pk for project_pk, number in others] + [instance.project_id],
+                                [(instance.project_id, instance.number)])
+
+
+# image attachments get thumbnails, which are created in the background once the attachment has been committed
+def create_attachment_thumbnails(sender, instance, created, **kwargs):
+    if created and instance.file:
+        name = instance.file.name
+        transaction.on_commit(lambda: create_thumbnails.delay(name))
+
+
 post_save.connect(invalidate_cache, sender=Issue, dispatch_uid="invalidate_issue_template.cards_post_save")
 m2m_changed.connect(invalidate_cache, sender=Issue.tags.through,
                     dispatch_uid="invalidate_issue_template.cards_tags")
@@ -94,3 +165,11 @@ post_delete.connect(invalidate_cache, sender=Punch,
                     dispatch_uid="invalidate_issue_template.cards_punch_post_delete")
 post_save.connect(invalidate_cache, sender=Sprint,
                   dispatch_uid="invalidate_issue_template.cards_punch_post_sprint")
+post_save.connect(create_attachment_thumbnails, sender=Attachment,
+                  dispatch_uid="create_attachment_thumbnails")
+pre_delete.connect(invalidate_dependencies_on_change, sender=Issue,
+                   dispatch_uid="invalidate_dependencies_pre_delete")
+post_save.connect(invalidate_dependencies_on_change, sender=Issue,
+                  dispatch_uid="invalidate_dependencies_post_save")
+m2m_changed.connect(invalidate_dependencies_on_edit, sender=Issue.dependsOn.through,
+                    dispatch_uid="invalidate_dependencies_m2m")
@@ -0,0 +1,133 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+from image_strip import thumbnails
+
+# Content-addressed storage for attachments.
+#
+# Every file is stored once under the SHA-256 hash of its content, no matter how often it is uploaded. The hash is
+# computed while the upload is streamed, and the file is only written if no blob with that hash exists yet.
+# AttachmentBlob counts the attachments referring to a blob; when the last one is deleted, the blob is removed
+# after the transaction has been committed (together with its thumbnails).
+# The rows of AttachmentBlob are locked while a reference is added or the blob is removed, so a blob can't be
+# removed while it gets uploaded again.
+
+BLOB_DIR = 'attachments/blobs'
+
+
+def get_blob_name(digest):
+    return BLOB_DIR + '/' + digest[:2] + '/' + digest
+
+
+# files opened in text mode return str chunks
+def get_chunks(content):
+    for chunk in content.chunks():
+        yield chunk.encode() if isinstance(chunk, str) else chunk
+
+
+def get_digest(content):
+    digest = hashlib.sha256()
+    for chunk in get_chunks(content):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    # the name generated by upload_to is ignored, the content decides where a file is stored
+    def _save(self, name, content):
+        name = get_blob_name(get_digest(content))
+        add_reference(self, name, content)
+        return name
+
+    def write_blob(self, name, content):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file in the same directory first, so the blob appears atomically
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in get_chunks(content):
+                    tmp.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def get_locked_blob(name):
+    # issue.models uses this module
+    from issue.models import AttachmentBlob
+    return AttachmentBlob.objects.select_for_update().filter(name=name).first()
+
+
+def add_reference(storage, name, content):
+    from issue.models import AttachmentBlob
+    with transaction.atomic():
+        blob = get_locked_blob(name)
+        if blob is None:
+            try:
+                with transaction.atomic():
+                    blob = AttachmentBlob.objects.create(name=name)
+            except IntegrityError:
+                # the blob has been created by a concurrent upload
+                blob = get_locked_blob(name)
+        if not storage.exists(name):
+            storage.write_blob(name, content)
+        AttachmentBlob.objects.filter(pk=blob.pk).update(references=F('references') + 1)
+
+
+def remove_reference(storage, name):
+    from issue.models import AttachmentBlob
+    with transaction.atomic():
+        blob = get_locked_blob(name)
+        if blob is None:
+            return
+        AttachmentBlob.objects.filter(pk=blob.pk).update(references=F('references') - 1)
+        if blob.references <= 1:
+            transaction.on_commit(lambda: reclaim(storage, name))
+
+
+# remove the blob, unless it has been referenced again in the meantime
+def reclaim(storage, name):
+    with transaction.atomic():
+        blob = get_locked_blob(name)
+        if blob is None or blob.references > 0:
+            return
+        blob.delete()
+        storage.delete(name)
+        thumbnails.delete_thumbnails(name)
+
+
+attachment_storage = ContentAddressedStorage()
@@ -30,7 +30,7 @@ from issue.views import AttachmentDownloadView
 from user_management.views import LoginView
 from project.models import Project
 from kanbancol.models import KanbanColumn
-from issue.models import Issue, Attachment
+from issue.models import Issue, Attachment, AttachmentBlob
 from django.contrib.auth import get_user_model
 from django.core.files import File
 
@@ -147,7 +147,8 @@ class AttachmentTest(TestCase):
         self.assertRedirects(response, reverse('issue:detail', kwargs={'project': self.project.name_short,
                                                                        'sqn_i': self.issue.number}))
         self.assertFalse(self.issue.attachments.all().exists())
-        self.assertFalse(os.path.isfile(filePath))
+        # the file is removed after the transaction has been committed (see issue.testcases.test_storage)
+        self.assertEqual(AttachmentBlob.objects.get(name=attachment.file.name).references, 0)
 
         # delete temp file locally
         os.unlink(temp.name)
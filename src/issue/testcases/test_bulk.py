@@ -0,0 +1,146 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from actstream.actions import follow
+from actstream.models import Action, Follow, following
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from issue import bulk
+from issue.models import Issue
+from project.models import Project
+from sprint.models import Sprint
+
+
+class BulkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        cls.user2 = get_user_model().objects.create_user('b', 'b@b.com', 'b1234567')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # NOTE: these elements get modified by some testcases, so they should NOT be created in setUpTestData()
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+        self.project.manager.add(self.user)
+        self.project.developer.add(self.user2)
+        follow(self.user2, self.project, send_action=False, actor_only=False)
+
+    def create_issues(self, count):
+        for i in range(count):
+            Issue(title='issue ' + str(i), project=self.project, creator=self.user).save()
+        return self.project.issue.all()
+
+    def test_archive(self):
+        issues = self.create_issues(3)
+        self.assertEqual(len(following(self.user2, Issue)), 3)
+
+        self.assertEqual(bulk.archive(self.project, issues.filter(number__lt=3), self.user), 2)
+        self.assertEqual(list(issues.filter(archived=True).values_list('number', flat=True)), [1, 2])
+        # archived issues aren't followed any more
+        self.assertEqual(following(self.user2, Issue), [issues.get(number=3)])
+        # already archived issues don't change
+        self.assertEqual(bulk.archive(self.project, issues, self.user), 1)
+
+        self.assertEqual(bulk.unarchive(self.project, issues, self.user), 3)
+        self.assertEqual(issues.filter(archived=True).count(), 0)
+        self.assertEqual(len(following(self.user2, Issue)), 3)
+
+    def test_archive_keeps_flagged_follows(self):
+        issue = self.create_issues(1).get()
+        follow(self.user2, issue, send_action=False, actor_only=False, flag='liking')
+        bulk.archive(self.project, self.project.issue.all(), self.user)
+        # like unfollow(), only the follows without a flag are removed
+        self.assertEqual(list(Follow.objects.following_qs(self.user2, Issue).values_list('flag', flat=True)),
+                         ['liking'])
+
+    def test_query_count_independent_of_issues(self):
+        issues = self.create_issues(12)
+        # without a user, so the activity stream isn't rendered
+        with CaptureQueriesContext(connection) as few:
+            bulk.archive(self.project, issues.filter(number__lte=2))
+        with CaptureQueriesContext(connection) as many:
+            bulk.archive(self.project, issues.filter(number__gt=2))
+        self.assertEqual(len(few), len(many))
+
+    def test_one_action_per_operation(self):
+        issues = self.create_issues(5)
+        Action.objects.all().delete()
+        bulk.move(self.project, issues, self.project.kanbancol.last(), self.user)
+        self.assertEqual(Action.objects.count(), 1)
+        self.assertEqual(Action.objects.first().verb, 'changed 5 issues of')
+
+        # no action without a user
+        bulk.move(self.project, issues, self.project.kanbancol.first())
+        self.assertEqual(Action.objects.count(), 1)
+
+    def test_move_and_set_sprint(self):
+        issues = self.create_issues(3)
+        column = self.project.kanbancol.last()
+        self.assertEqual(bulk.move(self.project, issues.filter(number=1), column, self.user), 1)
+        self.assertEqual(issues.get(number=1).kanbancol, column)
+        self.assertEqual(bulk.move(self.project, issues, column, self.user), 2)
+
+        sprint = Sprint(project=self.project)
+        sprint.save()
+        self.assertEqual(bulk.set_sprint(self.project, issues, sprint, self.user), 3)
+        self.assertEqual(sprint.issue.count(), 3)
+        self.assertEqual(bulk.set_sprint(self.project, issues.filter(number=2), None, self.user), 1)
+        self.assertEqual(sprint.issue.count(), 2)
+
+        # columns and sprints of other projects are refused
+        other = Project(creator=self.user, name_short='OTH')
+        other.save()
+        self.assertRaises(ValueError, bulk.move, self.project, issues, other.kanbancol.first())
+        other_sprint = Sprint(project=other)
+        other_sprint.save()
+        self.assertRaises(ValueError, bulk.set_sprint, self.project, issues, other_sprint)
+        # and issues of other projects are ignored
+        Issue(title='other', project=other).save()
+        self.assertEqual(bulk.archive(self.project, Issue.objects.all()), 3)
+        self.assertFalse(other.issue.first().archived)
+
+    def test_assign(self):
+        issues = self.create_issues(3)
+        issues.get(number=1).assignee.add(self.user)
+        self.assertEqual(bulk.assign(self.project, issues, [self.user], self.user), 2)
+        self.assertEqual(Issue.objects.filter(assignee=self.user).count(), 3)
+        self.assertEqual(bulk.assign(self.project, issues.filter(number__lt=3), [self.user2], self.user,
+                                     replace=True), 2)
+        self.assertEqual(list(Issue.objects.filter(assignee=self.user).values_list('number', flat=True)), [3])
+        self.assertEqual(Issue.objects.filter(assignee=self.user2).count(), 2)
+
+        outsider = get_user_model().objects.create_user('c', 'c@c.com', 'c1234567')
+        self.assertRaises(ValueError, bulk.assign, self.project, issues, [outsider])
+
+    def test_archive_multiple_view(self):
+        issues = self.create_issues(3)
+        column = self.project.kanbancol.first()
+        self.client.post(reverse('issue:archivecol', kwargs={'project': self.project.name_short}),
+                         {'pos_c': column.position})
+        self.assertEqual(issues.filter(archived=True).count(), 3)
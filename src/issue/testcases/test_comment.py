@@ -263,7 +263,7 @@ class CommentTest(TestCase):
         self.assertContains(response, values['text'])
         for com in self.issue.comments.all():
             if com.attachment:
-                self.assertEqual(path.basename(com.attachment.file.name), path.basename(temp.name))
+                self.assertEqual(str(com.attachment), path.basename(temp.name))
                 # deletion takes place below
 
         # add only a file
@@ -299,9 +299,9 @@ class CommentTest(TestCase):
         # delete the uploaded file locally
         os.unlink(temp.name)
 
-        # delete the uploaded files from the server
-        for att in self.issue.attachments.all():
-            os.unlink(MEDIA_ROOT + '/' + att.file.name)
+        # delete the uploaded files from the server; both uploads have the same content, so they share their file
+        for name in set(self.issue.attachments.values_list('file', flat=True)):
+            os.unlink(MEDIA_ROOT + '/' + name)
 
         # add time log
         values['action'] = "timelog"
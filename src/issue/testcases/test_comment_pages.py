@@ -0,0 +1,119 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import datetime
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from issue import comment_pages
+from issue.models import Issue, Comment
+from project.models import Project
+
+
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        cls.user2 = get_user_model().objects.create_user('b', 'b@b.com', 'b1234567')
+        cls.project = Project(creator=cls.user, name_short='PRJ')
+        cls.project.save()
+        cls.project.developer.add(cls.user)
+        cls.issue = Issue(title='long discussion', project=cls.project)
+        cls.issue.save()
+        # pairs of comments are created at the same time, so the seqnum decides their order
+        start = timezone.now() - datetime.timedelta(days=1)
+        for i in range(120):
+            Comment(text='comment ' + str(i), creator=cls.user, issue=cls.issue,
+                    when=start + datetime.timedelta(minutes=i // 2)).save()
+        cls.oldest = list(cls.issue.comments.order_by('when', 'seqnum').values_list('seqnum', flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_all_pages(self, order, size):
+        seqnums = []
+        cursor = None
+        while True:
+            comments, cursor = comment_pages.get_page(self.issue, order, cursor, size)
+            seqnums.extend(comment.seqnum for comment in comments)
+            if cursor is None:
+                return seqnums
+
+    def test_pages(self):
+        self.assertEqual(self.get_all_pages('oldest', 50), self.oldest)
+        self.assertEqual(self.get_all_pages('newest', 50), self.oldest[::-1])
+        # page boundaries in the middle of comments with the same timestamp
+        self.assertEqual(self.get_all_pages('oldest', 7), self.oldest)
+        self.assertEqual(self.get_all_pages('newest', 7), self.oldest[::-1])
+        self.assertEqual(self.get_all_pages('oldest', 120), self.oldest)
+
+    def test_cursor(self):
+        comment = self.issue.comments.first()
+        self.assertEqual(comment_pages.parse_cursor(comment_pages.get_cursor(comment)), (comment.when, comment.seqnum))
+        with self.assertRaises(ValueError):
+            comment_pages.parse_cursor('invalid')
+
+    def test_page_queries(self):
+        comments, cursor = comment_pages.get_page(self.issue, 'oldest')
+        # the creators and attachments are fetched together with the comments, no matter how far the page is
+        with self.assertNumQueries(1):
+            comments, cursor = comment_pages.get_page(self.issue, 'oldest', cursor)
+            [(comment.creator.username, comment.attachment) for comment in comments]
+
+    def test_detail_view(self):
+        response = self.client.get(reverse('issue:detail', kwargs={'project': 'PRJ', 'sqn_i': 1}))
+        self.assertEqual(len(response.context['comments']), comment_pages.COMMENTS_PER_PAGE)
+        self.assertContains(response, 'id="comment-more"')
+        self.assertContains(response, 'id="issue_detail_comment_edit_50"')
+        self.assertNotContains(response, 'id="comment{}"'.format(self.oldest[50]))
+
+    def test_comments_view(self):
+        url = reverse('issue:comments', kwargs={'project': 'PRJ', 'sqn_i': 1})
+        response = self.client.get(reverse('issue:detail', kwargs={'project': 'PRJ', 'sqn_i': 1}),
+                                   {'order_by': 'newest'})
+        cursor = response.context['comments_next']
+
+        seqnums = [comment.seqnum for comment in response.context['comments']]
+        offset = len(seqnums)
+        while cursor:
+            response = self.client.get(url, {'order_by': 'newest', 'after': cursor, 'offset': offset})
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content.decode())
+            seqnums.extend(comment.seqnum for comment in response.context['comments'])
+            # the element ids continue the numbering of the previous pages
+            self.assertIn('id="issue_detail_comment_edit_{}"'.format(offset + 1), data['html'])
+            cursor, offset = data['next'], data['offset']
+        self.assertEqual(seqnums, self.oldest[::-1])
+
+        response = self.client.get(url, {'after': 'invalid'})
+        self.assertEqual(response.status_code, 400)
+
+        # the comments are only visible to the members of the project
+        self.client.force_login(self.user2)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
@@ -22,6 +22,8 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
@@ -474,6 +476,38 @@ class CreateEditDetailTest(TestCase):
 
         self.assertContains(response, 'Issue was not in selected sprint, not performing any action')
 
+    def test_change_tracking(self):
+        issue = Issue(title="tracked", project=self.project)
+        issue.save()
+        self.assertEqual(issue.get_dirty_fields(), set())
+
+        issue = Issue.objects.get(pk=issue.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(issue.get_pre_image()['title'], "tracked")
+            issue.title = "changed"
+            issue.kanbancol = self.column
+            self.assertEqual(issue.get_dirty_fields(), {'title', 'kanbancol'})
+            self.assertTrue(issue.has_changed('kanbancol', 'archived'))
+            self.assertEqual(issue.get_pre_image_instance().title, "tracked")
+
+        # the stored row is not loaded again, neither by the save nor by its handlers
+        with CaptureQueriesContext(connection) as queries:
+            issue.save(update_fields=['kanbancol'])
+        self.assertFalse([query for query in queries.captured_queries
+                          if query['sql'].startswith('SELECT') and 'FROM "issue_issue"' in query['sql']])
+        # the title is not part of this save, so the full-text document isn't updated
+        self.assertFalse([query for query in queries.captured_queries if 'search_fulltextdocument' in query['sql']
+                          and "'Issue'" in query['sql']])
+        self.assertEqual(issue.get_dirty_fields(), {'title'})
+        issue.save()
+        self.assertEqual(issue.get_dirty_fields(), set())
+        self.assertEqual(Issue.objects.get(pk=issue.pk).kanbancol, self.column)
+
+        # objects that weren't loaded completely get their pre-image with one query
+        issue = Issue.objects.only('title').get(pk=issue.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(issue.get_dirty_fields(), set())
+
     def test_add_and_remove_to_kanbancol(self):
         # TODO TESTCASE
         pass
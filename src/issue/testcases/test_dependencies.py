@@ -0,0 +1,174 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from issue import bulk, dependencies
+from issue.models import Issue
+from project.models import Project
+from sprint.models import Sprint
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DependenciesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        # NOTE: these elements get modified by some testcases, so they should NOT be created in setUpTestData()
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+        self.project.developer.add(self.user)
+        self.done = self.project.kanbancol.get(type='Done')
+        # 1 <- 2 <- 3 <- 4 and 1 <- 5, i.e. issue 2 depends on issue 1 and so on
+        self.issues = {}
+        for number, storypoints in zip(range(1, 7), [1, 1, 1, 1, 5, 0]):
+            issue = Issue(title='issue ' + str(number), project=self.project, storypoints=storypoints)
+            issue.save()
+            self.issues[number] = issue
+        for number, dependency in [(2, 1), (3, 2), (4, 3), (5, 1)]:
+            self.issues[number].dependsOn.add(self.issues[dependency])
+
+    def numbers(self, issues):
+        return sorted(issue.number for issue in issues)
+
+    def test_closure(self):
+        self.assertEqual(self.numbers(dependencies.get_dependencies(self.issues[4])), [1, 2, 3])
+        self.assertEqual(self.numbers(dependencies.get_dependents(self.issues[1])), [2, 3, 4, 5])
+        self.assertEqual(self.numbers(dependencies.get_dependents(self.issues[3])), [4])
+        self.assertEqual(self.numbers(dependencies.get_dependencies(self.issues[6])), [])
+
+    def test_cycles(self):
+        self.assertTrue(dependencies.creates_cycle(self.issues[1], [self.issues[4]]))
+        self.assertTrue(dependencies.creates_cycle(self.issues[1], [self.issues[1]]))
+        self.assertFalse(dependencies.creates_cycle(self.issues[4], [self.issues[5], self.issues[6]]))
+        self.assertFalse(dependencies.creates_cycle(Issue(project=self.project), [self.issues[4]]))
+
+        # the queries terminate for cycles that have been stored before
+        Issue.dependsOn.through.objects.create(from_issue=self.issues[1], to_issue=self.issues[4])
+        self.assertEqual(self.numbers(dependencies.get_dependencies(self.issues[1])), [1, 2, 3, 4])
+        dependencies.compute_critical_path(self.project)
+
+    def test_cycles_are_rejected(self):
+        values = {
+            'title': 'issue 1',
+            'kanbancol': self.issues[1].kanbancol.pk,
+            'type': 'Bug',
+            'priority': 2,
+            'storypoints': 1,
+            'dependsOn': (self.issues[4].pk,),
+        }
+        response = self.client.post(reverse('issue:edit', kwargs={'project': 'PRJ', 'sqn_i': 1}), values)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('dependsOn', response.context['form'].errors)
+        self.assertEqual(self.issues[1].dependsOn.count(), 0)
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.patch(reverse('api:project_issues-detail', kwargs={'project': 'PRJ', 'number': 1}),
+                                {'dependsOn': [4]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'dependsOn': ["An issue can't depend on an issue that depends on it."]})
+        response = client.patch(reverse('api:project_issues-detail', kwargs={'project': 'PRJ', 'number': 1}),
+                                {'dependsOn': [6]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_blocked_and_critical_path(self):
+        self.assertEqual(dependencies.get_blocked(self.project), {2, 3, 4, 5})
+        # issue 5 has more story points than the chain 2-3-4
+        self.assertEqual(dependencies.get_critical_path(self.project), [1, 5])
+        self.assertFalse(dependencies.is_blocked(self.issues[1]))
+        self.assertTrue(dependencies.is_blocked(self.issues[2]))
+
+        # the cached graph is invalidated when an issue is finished
+        self.issues[1].kanbancol = self.done
+        self.issues[1].save()
+        self.assertEqual(dependencies.get_blocked(self.project), {3, 4})
+        self.assertEqual(dependencies.get_critical_path(self.project), [5])
+
+        # ... when dependencies change, from either side
+        self.issues[3].dependent.clear()
+        self.assertEqual(dependencies.get_blocked(self.project), {3})
+        self.assertEqual(dependencies.get_critical_path(self.project), [5])
+        self.issues[4].dependsOn.add(self.issues[5])
+        self.assertEqual(dependencies.get_blocked(self.project), {3, 4})
+        self.assertEqual(dependencies.get_critical_path(self.project), [5, 4])
+
+        # ... when the story points change
+        self.issues[2].storypoints = 10
+        self.issues[2].save()
+        self.assertEqual(dependencies.get_critical_path(self.project), [2, 3])
+
+        # ... and when issues are changed in bulk or deleted
+        bulk.archive(self.project, [self.issues[5]], self.user)
+        self.assertEqual(dependencies.get_blocked(self.project), {3})
+        bulk.unarchive(self.project, [self.issues[5]], self.user)
+        self.assertEqual(dependencies.get_blocked(self.project), {3, 4})
+        self.issues[5].delete()
+        self.assertEqual(dependencies.get_blocked(self.project), {3})
+
+    def test_sprint_blocked(self):
+        sprint = Sprint(project=self.project)
+        sprint.save()
+        Issue.objects.filter(number__in=[2, 3]).update(sprint=sprint)
+        self.assertTrue(dependencies.is_sprint_blocked(sprint))
+        Issue.objects.filter(number=1).update(sprint=sprint)
+        self.assertFalse(dependencies.is_sprint_blocked(sprint))
+
+    def test_sprintboard_badge(self):
+        url = reverse('sprint:sprintboard', kwargs={'project': 'PRJ'})
+        title = 'Blocked by an unfinished issue it depends on'
+        response = self.client.get(url)
+        self.assertEqual(response.context['blocked_issues'], {2, 3, 4, 5})
+        self.assertContains(response, title, count=4)
+
+        # the cached cards of the depending issues are updated
+        self.issues[1].kanbancol = self.done
+        self.issues[1].save()
+        self.assertContains(self.client.get(url), title, count=2)
+        self.issues[4].dependsOn.remove(self.issues[3])
+        self.assertContains(self.client.get(url), title, count=1)
+
+    def test_api(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get(reverse('api:project_issues-dependencies', kwargs={'project': 'PRJ', 'number': 2}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'number': 2, 'blocked': True, 'depends_on': ['PRJ-1'],
+                                           'blocks': ['PRJ-3', 'PRJ-4']})
+
+        response = client.get(reverse('api:project_issues-dependency-graph', kwargs={'project': 'PRJ'}))
+        self.assertEqual(response.json(), {'blocked': [2, 3, 4, 5], 'critical_path': [1, 5]})
+
+        client.force_authenticate(user=get_user_model().objects.create_user('b', 'b@b.com', 'b1234567'))
+        response = client.get(reverse('api:project_issues-dependencies', kwargs={'project': 'PRJ', 'number': 2}))
+        self.assertNotEqual(response.status_code, status.HTTP_200_OK)
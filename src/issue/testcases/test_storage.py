@@ -0,0 +1,154 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import hashlib
+import io
+import os
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from issue.models import Issue, Attachment, AttachmentBlob
+from issue.storage import get_blob_name
+from project.models import Project
+
+
+class ContentAddressedStorageTest(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        self.client.force_login(self.user)
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+        self.project.developer.add(self.user)
+        self.issue = Issue(title='first issue', project=self.project)
+        self.issue.save()
+        self.issue2 = Issue(title='second issue', project=self.project)
+        self.issue2.save()
+
+    def attach(self, issue, name, content):
+        attachment = Attachment(file=ContentFile(content, name=name), creator=self.user, issue=issue)
+        attachment.save()
+        return attachment
+
+    def test_deduplication_and_reclaim(self):
+        first = self.attach(self.issue, 'screenshot.png', b'same content')
+        second = self.attach(self.issue2, 'copy.png', b'same content')
+        other = self.attach(self.issue2, 'log.txt', b'other content')
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertNotEqual(first.file.name, other.file.name)
+        self.assertEqual((str(first), str(second)), ('screenshot.png', 'copy.png'))
+        self.assertEqual(AttachmentBlob.objects.get(name=first.file.name).references, 2)
+        path = first.file.path
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'same content')
+
+        # the blob is kept until the last attachment is deleted
+        first.delete()
+        self.assertTrue(os.path.isfile(path))
+        second.delete()
+        self.assertFalse(os.path.isfile(path))
+        self.assertFalse(AttachmentBlob.objects.filter(name=second.file.name).exists())
+
+        # and can be uploaded again
+        third = self.attach(self.issue, 'again.png', b'same content')
+        self.assertTrue(os.path.isfile(third.file.path))
+        self.assertEqual(AttachmentBlob.objects.get(name=third.file.name).references, 1)
+
+        # deleting an issue releases its attachments as well
+        self.issue.delete()
+        self.issue2.delete()
+        self.assertFalse(os.path.isfile(third.file.path))
+        self.assertFalse(os.path.isfile(other.file.path))
+        self.assertEqual(AttachmentBlob.objects.count(), 0)
+
+    def test_reference_rolled_back(self):
+        first = self.attach(self.issue, 'screenshot.png', b'same content')
+
+        # the insert fails after the file has been stored
+        with self.assertRaises(IntegrityError):
+            Attachment(file=ContentFile(b'same content', name='copy.png'), creator=None, issue=self.issue).save()
+        self.assertEqual(AttachmentBlob.objects.get(name=first.file.name).references, 1)
+
+        # the whole transaction is rolled back
+        with self.assertRaises(ValueError), transaction.atomic():
+            self.attach(self.issue2, 'copy.png', b'same content')
+            self.attach(self.issue2, 'new.png', b'new content')
+            raise ValueError
+        self.assertEqual(AttachmentBlob.objects.get(name=first.file.name).references, 1)
+        self.assertEqual(AttachmentBlob.objects.count(), 1)
+        # the new blob is kept on disk for the next upload of it
+        new_blob = get_blob_name(hashlib.sha256(b'new content').hexdigest())
+        self.assertTrue(default_storage.exists(new_blob))
+        default_storage.delete(new_blob)
+
+        first.delete()
+        self.assertFalse(os.path.isfile(first.file.path))
+        self.assertEqual(AttachmentBlob.objects.count(), 0)
+
+    def test_download_with_uploaded_name(self):
+        attachment = self.attach(self.issue, 'report.txt', b'report')
+        response = self.client.get(reverse('issue:download_attachment',
+                                           kwargs={'project': 'PRJ', 'sqn_i': 1, 'sqn_a': attachment.seqnum}))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("filename*=UTF-8''report.txt", response['Content-Disposition'])
+        response.close()
+        attachment.delete()
+
+    def test_thumbnails(self):
+        img_bytes = io.BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(img_bytes, format='PNG')
+        image = self.attach(self.issue, 'screenshot.png', img_bytes.getvalue())
+        text = self.attach(self.issue, 'notes.txt', b'no image')
+        kwargs = {'project': 'PRJ', 'sqn_i': 1}
+
+        # the thumbnails have been created after the attachment has been committed
+        thumbnail = image.get_thumbnail()
+        self.assertIsNotNone(thumbnail)
+        self.assertIsNone(text.get_thumbnail())
+
+        response = self.client.get(reverse('issue:detail', kwargs=kwargs))
+        self.assertContains(response, reverse('issue:attachment_thumbnail', kwargs=dict(kwargs, sqn_a=image.seqnum)))
+        self.assertNotContains(response, reverse('issue:attachment_thumbnail',
+                                                 kwargs=dict(kwargs, sqn_a=text.seqnum)))
+        response = self.client.get(reverse('issue:attachment_thumbnail', kwargs=dict(kwargs, sqn_a=image.seqnum)))
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        response = self.client.get(reverse('issue:attachment_thumbnail', kwargs=dict(kwargs, sqn_a=text.seqnum)))
+        self.assertEqual(response.status_code, 404)
+
+        # other users can't see the thumbnails
+        self.client.force_login(get_user_model().objects.create_user('b', 'b@b.com', 'b1234567'))
+        response = self.client.get(reverse('issue:attachment_thumbnail', kwargs=dict(kwargs, sqn_a=image.seqnum)))
+        self.assertEqual(response.status_code, 404)
+
+        # the thumbnails are removed together with the blob
+        thumbnail_path = default_storage.path(thumbnail)
+        image.delete()
+        text.delete()
+        self.assertFalse(os.path.isfile(thumbnail_path))
@@ -53,9 +53,12 @@ urlpatterns = [
             url(r'^$', views.IssueDetailView.as_view(), name='detail'),
             url(r'^edit/?$', views.IssueEditView.as_view(), name='edit'),
             url(r'^delete/?$', views.IssueDeleteView.as_view(), name='delete'),
+            url(r'^comments/?$', views.IssueCommentsView.as_view(), name='comments'),
             url(r'^comment/(?P<pk_c>[0-9]+)/?$', views.IssueEditCommentView.as_view(), name='edit_comment'),
             url(r'^comment/(?P<pk_c>[0-9]+)/delete/?$', views.IssueDeleteCommentView.as_view(), name='delete_comment'),
             url(r'^attach/(?P<sqn_a>[0-9]+)/?$', views.AttachmentDownloadView.as_view(), name='download_attachment'),
+            url(r'^attach/(?P<sqn_a>[0-9]+)/thumbnail/?$', views.AttachmentThumbnailView.as_view(),
+                name='attachment_thumbnail'),
             url(r'^attach/(?P<sqn_a>[0-9]+)/delete/?$', views.AttachmentDeleteView.as_view(), name='delete_attachment'),
             url(r'^log/?$', tl_views.TimelogCreateView.as_view(), name='log'),
             url(r'^punch/?$', tl_views.PunchView.as_view(), name='punch'),
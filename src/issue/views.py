@@ -27,20 +27,22 @@ from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.views.generic.base import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, Http404
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.shortcuts import redirect, get_object_or_404
 from django.core.paginator import Paginator
 from django.core.paginator import EmptyPage
 from django.core.paginator import PageNotAnInteger
 from django.db.models import Q
-import os
 
-from lib.custom_model import get_r_object_or_404, get_w_object_or_404
+from lib.custom_model import get_r_object_or_404, get_w_object_or_404, get_cached_object_or_404
 from lib.show_more_mixin import ShowMoreMixin
 from sendfile import sendfile
+from django.core.files.storage import default_storage
 from .forms import LimitKanbanForm, CommentForm, AttachmentForm
 from .models import Issue, Comment, Attachment
+from . import bulk, comment_pages
 from kanbancol.models import KanbanColumn
 from project.models import Project
 from sprint.models import Sprint
@@ -52,6 +54,7 @@ from django.utils.translation import ugettext as _, ugettext_lazy as _l
 from lib.multiform import MultiFormsView
 from timelog.forms import TimelogCreateForm
 from django.utils import timezone
+import json
 
 
 def process_order_by(request, issues):
@@ -179,28 +182,29 @@ class AddIssueToKanbancolView(LoginRequiredMixin, UserPassesTestMixin, View):
         return reverse('sprint:sprintboard', kwargs={'project': self.kwargs.get('project')})
 
     def post(self, request, *args, **kwargs):
-        issue = (
+        # fetch at most two objects to find out whether there is exactly one, without counting them separately
+        issue = list(
                 Issue.objects.filter(project__name_short=self.kwargs.get('project'),
-                                     number=self.request.POST.get('sqn_i'))
+                                     number=self.request.POST.get('sqn_i'))[:2]
                 )
 
-        kanbancol = KanbanColumn.objects.filter(project__name_short=self.kwargs.get('project'),
-                                                position=self.request.POST.get('sqn_k')
-                                                )
+        kanbancol = list(KanbanColumn.objects.filter(project__name_short=self.kwargs.get('project'),
+                                                     position=self.request.POST.get('sqn_k')
+                                                     )[:2])
 
-        if issue.count() != 1 or kanbancol.count() != 1:
+        if len(issue) != 1 or len(kanbancol) != 1:
             messages.add_message(request,
                                  messages.ERROR,
                                  _('Given issue or kanbancol does not exist'),
                                  )
         else:
-            issue = issue.first()
+            issue = issue[0]
             signals.modify.send(sender=Issue,
                                 instance=issue,
-                                changed_data={'kanbancol': str(kanbancol.first())},
+                                changed_data={'kanbancol': str(kanbancol[0])},
                                 user=self.request.user,
                                 )
-            issue.kanbancol = kanbancol.first()
+            issue.kanbancol = kanbancol[0]
             issue.save(update_fields=['kanbancol'])
 
         success_url = self.get_success_url()
@@ -285,9 +289,7 @@ class ArchiveMultipleIssueView(LoginRequiredMixin, UserPassesTestMixin, View):
                                  messages.ERROR,
                                  str(count) + _(' issues moved to archive'),
                                  )
-        for issue in issues:
-            issue.archived = True
-            issue.save()
+        bulk.archive(proj, issues, self.request.user)
 
         success_url = self.get_success_url()
         return HttpResponseRedirect(success_url)
@@ -323,10 +325,10 @@ class IssueDetailView(LoginRequiredMixin, UserPassesTestMixin, MultiFormsView):
         return get_r_object_or_404(self.request.user, Project, name_short=self.kwargs.get('project'))
 
     def get_breadcrumb(self, *args, **kwargs):
-        # self has no request and so no user -> we use get_object_or_404
-        issue = get_object_or_404(Issue,
-                                  project__name_short=kwargs.get('project'), number=kwargs.get('sqn_i')
-                                  )
+        # self has no request and so no user -> we use get_cached_object_or_404
+        issue = get_cached_object_or_404(Issue,
+                                         project__name_short=kwargs.get('project'), number=kwargs.get('sqn_i')
+                                         )
         return issue.get_ticket_identifier()
 
     def get_context_data(self, *args, **kwargs):
@@ -342,12 +344,12 @@ class IssueDetailView(LoginRequiredMixin, UserPassesTestMixin, MultiFormsView):
         if requestSetting == "newest" or\
                 (requestSetting is None and userSetting == "newest"):
             # order the comments by the newest
-            context['comments'] = issue.comments.order_by('-when').all()
             context['comment_order'] = "newest"
         else:
             # order the comments by the oldest (default in the database)
-            context['comments'] = issue.comments.all()
             context['comment_order'] = "oldest"
+        # only the first page of comments is rendered, the others are loaded by IssueCommentsView
+        context['comments'], context['comments_next'] = comment_pages.get_page(issue, context['comment_order'])
 
         # save the setting to the user model
         if userSetting != context['comment_order']:
@@ -413,6 +415,29 @@ class IssueDetailView(LoginRequiredMixin, UserPassesTestMixin, MultiFormsView):
         return form
 
 
+# the next page of comments of the issue detail view
+class IssueCommentsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    def get(self, request, *args, **kwargs):
+        issue = get_r_object_or_404(self.request.user, Issue, project__name_short=self.kwargs.get('project'),
+                                    number=self.kwargs.get('sqn_i'))
+        order = 'newest' if request.GET.get('order_by') == 'newest' else 'oldest'
+        try:
+            # the number of comments that are shown already
+            offset = int(request.GET.get('offset', 0))
+            comments, next_cursor = comment_pages.get_page(issue, order, request.GET.get('after'))
+        except ValueError:
+            return HttpResponseBadRequest()
+
+        html = render_to_string('issue/comment_list.html',
+                                {'comments': comments, 'issue': issue, 'offset': offset},
+                                request=request)
+        return HttpResponse(json.dumps({'html': html, 'next': next_cursor, 'offset': offset + len(comments)}),
+                            content_type='application/json')
+
+    def test_func(self):
+        return get_r_object_or_404(self.request.user, Project, name_short=self.kwargs.get('project'))
+
+
 class IssueCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     model = Issue
     template_name = 'issue/issue_create_view.html'
@@ -489,7 +514,8 @@ class IssueEditView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
 
     def form_valid(self, form):
         if form.has_changed():
-            old = Issue.objects.get(pk=self.object.pk)
+            # the form already applied the changes to self.object, the previous values are in its pre-image
+            old = self.object.get_pre_image_instance()
             changed_data = signals.fields_to_changed_data(old, form.changed_data)
             ret = super(IssueEditView, self).form_valid(form)
             signals.modify.send(sender=self.model,
@@ -578,7 +604,7 @@ class AttachmentDownloadView(LoginRequiredMixin, UserPassesTestMixin, View):
         # TODO BUG For some reason this is reported as a leak of resources: there is an unclosed file,
         #          which has been opened with mode='rb' and closefd=True
         #          So I assume the development-backend doesn't close the file properly
-        return sendfile(request, attachment.file.path, attachment=True)
+        return sendfile(request, attachment.file.path, attachment=True, attachment_filename=str(attachment))
 
     def test_func(self):
         return get_r_object_or_404(self.request.user, Project, name_short=self.kwargs.get('project'))
@@ -589,6 +615,19 @@ class AttachmentDownloadView(LoginRequiredMixin, UserPassesTestMixin, View):
                                       seqnum=self.kwargs.get('sqn_a'))
 
 
+# the thumbnails are served like the attachments themselves, they must not be readable without permissions
+class AttachmentThumbnailView(AttachmentDownloadView):
+    def get(self, request, *args, **kwargs):
+        attachment = get_r_object_or_404(self.request.user, Attachment,
+                                         issue__project__name_short=self.kwargs.get('project'),
+                                         issue__number=self.kwargs.get('sqn_i'),
+                                         seqnum=self.kwargs.get('sqn_a'))
+        thumbnail = attachment.get_thumbnail()
+        if thumbnail is None:
+            raise Http404
+        return sendfile(request, default_storage.path(thumbnail))
+
+
 class AttachmentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     model = Attachment
     breadcrumb = _l("")
@@ -601,17 +640,6 @@ class AttachmentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
                                    seqnum=self.kwargs.get('sqn_a')
                                    )
 
-    def delete(self, request, *args, **kwargs):
-        # get the file path to delete it later
-        filePath = self.get_object().file.path
-
-        # delete the object from the database
-        response = DeleteView.delete(self, request, *args, **kwargs)
-        # delete the file from disk
-        os.unlink(filePath)
-
-        return response
-
     def get_success_url(self):
         # go back to the issue detail view
         return reverse('issue:detail',
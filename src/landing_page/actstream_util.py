@@ -22,6 +22,8 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 from actstream.actions import follow, unfollow
+from actstream.models import Follow
+from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
 from common.tasks import update_activity_stream_for_user
 
@@ -57,3 +59,20 @@ def follow_issue(user, issue):
 def unfollow_issue(user, issue):
     # unfollow an issue
     unfollow(user, issue)
+
+
+# bulk versions of follow_issue() and unfollow_issue() for many users and issues (given by their pks) at once
+def follow_issues(users, issue_pks):
+    # issue.models imports this module, so the content type is looked up by its natural key
+    content_type = ContentType.objects.get_by_natural_key('issue', 'issue')
+    object_ids = [str(pk) for pk in issue_pks]
+    existing = set(Follow.objects.filter(user__in=users, content_type=content_type, object_id__in=object_ids, flag='')
+                   .values_list('user_id', 'object_id'))
+    Follow.objects.bulk_create(Follow(user=user, content_type=content_type, object_id=object_id, actor_only=False)
+                               for user in users for object_id in object_ids
+                               if (user.pk, object_id) not in existing)
+
+
+def unfollow_issues(users, issue_pks):
+    Follow.objects.filter(user__in=users, content_type=ContentType.objects.get_by_natural_key('issue', 'issue'),
+                          object_id__in=[str(pk) for pk in issue_pks], flag='').delete()
@@ -69,6 +69,8 @@ class ActStreamHandler():
         # special case for the sprint signals
         signals.start.connect(SprintHandler.instance.handle, sender=SprintHandler.sender)
         signals.stop.connect(SprintHandler.instance.handle, sender=SprintHandler.sender)
+        # and for bulk operations on issues
+        signals.bulk_modify.connect(BulkIssueHandler.instance.handle, sender=BulkIssueHandler.sender)
 
 
 class IssueHandler(Handler):
@@ -111,3 +113,20 @@ class SprintHandler(metaclass=Singleton):
             action.send(kwargs['user'], verb=self.startVerb, action_object=kwargs['instance'], target=target)
         if signal == signals.stop:
             action.send(kwargs['user'], verb=self.stopVerb, action_object=kwargs['instance'], target=target)
+
+
+class BulkIssueHandler(metaclass=Singleton):
+    sender = Issue
+    modifyVerb = "changed {} issues of"
+
+    def handle(self, sender, signal, **kwargs):
+        # only add things to the activity stream if there's a user
+        if kwargs.get("user", None) is None:
+            return
+
+        # one action for the whole operation instead of one per issue
+        target = kwargs['instance']
+        for user in followers(target):
+            update_activity_stream_for_user.delay(user.username)
+        update_activity_stream_for_user.delay(kwargs['user'].username, actor=True)
+        action.send(kwargs['user'], verb=self.modifyVerb.format(len(kwargs['issues'])), target=target)
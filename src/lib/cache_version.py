@@ -0,0 +1,62 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import time
+
+from django.core.cache import cache
+
+# Version counters for cache entries that stay valid until the data they depend on changes.
+# The key of such an entry contains the current version (or the entry remembers it), and whatever changes the data
+# increases the version, which makes all entries built on the old one unreachable until they expire.
+
+# the versions must live longer than any entry that depends on them
+VERSION_TIMEOUT = None
+
+
+# versions that got lost (e.g. evicted or after a restart) must not restart at a value an old entry still has
+def version_seed():
+    return int(time.time() * 1000000)
+
+
+# returns None if the cache doesn't keep the version (e.g. the dummy cache)
+def get_version(key):
+    return get_versions([key]).get(key)
+
+
+# {key: version} of the keys
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        # add() doesn't overwrite a version that was set by a concurrent change in the meantime
+        for key in missing:
+            cache.add(key, version_seed(), VERSION_TIMEOUT)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, version_seed(), VERSION_TIMEOUT)
@@ -0,0 +1,90 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.db.models import DEFERRED
+
+# Change tracking for models whose save pipeline has several signal handlers that depend on the previous state.
+#
+# The values of an object are remembered when it gets loaded from the database (the pre-image), so the handlers can
+# ask for the previous values and the changed fields without querying the stored row again. Objects that weren't
+# loaded completely fetch their pre-image once per save. After a save the saved values become the new pre-image.
+
+
+class ChangeTrackingMixin():
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(ChangeTrackingMixin, cls).from_db(db, field_names, values)
+        instance._pre_image = {name: value for name, value in zip(field_names, values) if value is not DEFERRED}
+        return instance
+
+    # {attname: value} of the stored row, None for objects that are not stored yet
+    def get_pre_image(self):
+        if self._state.adding or self.pk is None:
+            return None
+
+        attnames = [field.attname for field in self._meta.concrete_fields]
+        pre_image = getattr(self, '_pre_image', None)
+        if pre_image is None or any(attname not in pre_image for attname in attnames):
+            pre_image = self.__class__._base_manager.using(self._state.db).filter(pk=self.pk).values(*attnames).first()
+            self._pre_image = pre_image
+        return pre_image
+
+    # names of the fields whose values differ from the stored ones, all fields for objects that are not stored yet
+    def get_dirty_fields(self):
+        pre_image = self.get_pre_image()
+        if pre_image is None:
+            return {field.name for field in self._meta.concrete_fields}
+        # deferred fields haven't been touched, so they can't have changed
+        deferred = self.get_deferred_fields()
+        dirty = {field.name for field in self._meta.concrete_fields
+                 if field.attname not in deferred and getattr(self, field.attname) != pre_image[field.attname]}
+        # while a save with update_fields is in progress, only those fields get stored
+        update_fields = getattr(self, '_update_fields', None)
+        if update_fields is not None:
+            dirty &= {self._meta.get_field(name).name for name in update_fields}
+        return dirty
+
+    def has_changed(self, *names):
+        return not self.get_dirty_fields().isdisjoint(names)
+
+    # an unsaved copy of the stored object, e.g. to describe the previous values of changed fields
+    def get_pre_image_instance(self):
+        pre_image = self.get_pre_image()
+        if pre_image is None:
+            return None
+        return self.__class__(**pre_image)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        self._update_fields = update_fields
+        try:
+            super(ChangeTrackingMixin, self).save(*args, **kwargs)
+        finally:
+            self._update_fields = None
+
+        # the saved values are the new pre-image
+        pre_image = getattr(self, '_pre_image', None) or {}
+        for field in self._meta.concrete_fields:
+            if update_fields is None or field.name in update_fields or field.attname in update_fields:
+                pre_image[field.attname] = getattr(self, field.attname)
+        self._pre_image = pre_image
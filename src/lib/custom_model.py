@@ -28,14 +28,24 @@ from django.shortcuts import get_object_or_404
 from django.http import Http404
 from django.utils.translation import ugettext as _
 
+from lib import identity_map
+
+
+# Like django.shortcuts.get_object_or_404, but while a request is handled each lookup is done only once
+# (see lib.identity_map). Use this instead of the django.shortcuts version where no user is available.
+def get_cached_object_or_404(klass, *args, **kwargs):
+    return identity_map.get_object(klass, args, kwargs, lambda: get_object_or_404(klass, *args, **kwargs))
+
 
 # It is very important to use this version to avoid extra checks on read-access.
 # Therefore they need to imported from this file instead of the django.shortcuts version
 # If a klass doesn't inherit from CustomModel there is no such function to check the permissions,
 # which results in an error message.
+# Both the lookup and the permission check are done only once per request.
 def get_r_object_or_404(user, klass, *args, **kwargs):
-    result = get_object_or_404(klass, *args, **kwargs)
-    if not isinstance(result, CustomModel) or not result.user_has_read_permissions(user):
+    result = get_cached_object_or_404(klass, *args, **kwargs)
+    if not isinstance(result, CustomModel) or \
+            not identity_map.has_permissions(result, user, 'r', lambda: result.user_has_read_permissions(user)):
         raise Http404(_("Either the request object does not exist or you don't have the necessary " +
                         "permissions to access it."))
     return result
@@ -52,8 +62,9 @@ def has_r_object_or_zero(user, klass, *args, **kwargs):
 
 
 def get_w_object_or_404(user, klass, *args, **kwargs):
-    result = get_object_or_404(klass, *args, **kwargs)
-    if not isinstance(result, CustomModel) or not result.user_has_write_permissions(user):
+    result = get_cached_object_or_404(klass, *args, **kwargs)
+    if not isinstance(result, CustomModel) or \
+            not identity_map.has_permissions(result, user, 'w', lambda: result.user_has_write_permissions(user)):
         raise Http404(_("Either the request object does not exist or you don't have the necessary " +
                         "permissions to access it."))
     return result
@@ -0,0 +1,155 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import copy
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Model
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+# Request-scoped identity map for the permission-checked object lookups of lib.custom_model.
+#
+# While a request is handled (see IdentityMapMiddleware), every object fetched by a (model, lookup) pair and every
+# permission check of a (object, user) pair is remembered, so views that look up the same objects in get(),
+# test_func(), get_object(), get_context_data() and the breadcrumbs only hit the database once.
+# Every lookup gets a copy of the remembered object, so changes to it (e.g. the values a ModelForm writes into its
+# instance while validating, even if the form is invalid) don't show up in the other lookups of the request.
+# Any write through the ORM (save, delete, many-to-many change) empties the map, since it may change both the
+# objects and the memberships the permissions depend on.
+#
+# In debug mode the middleware also reports the number of queries of the request in the X-Query-Count header.
+
+_local = threading.local()
+
+
+class IdentityMap():
+    def __init__(self):
+        self.objects = {}
+        self.permissions = {}
+
+    def clear(self):
+        self.objects.clear()
+        self.permissions.clear()
+
+
+def get_identity_map():
+    return getattr(_local, 'identity_map', None)
+
+
+def activate():
+    _local.identity_map = IdentityMap()
+
+
+def deactivate():
+    _local.identity_map = None
+
+
+# the key of a lookup, None if it can't be remembered (e.g. querysets or Q objects as arguments)
+def get_object_key(klass, args, kwargs):
+    if args or not isinstance(klass, type):
+        return None
+    try:
+        key = (klass, frozenset(kwargs.items()))
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def get_object(klass, args, kwargs, fetch):
+    identity_map = get_identity_map()
+    key = get_object_key(klass, args, kwargs) if identity_map is not None else None
+    if key is None:
+        return fetch()
+    if key not in identity_map.objects:
+        identity_map.objects[key] = fetch()
+    return copy_object(identity_map.objects[key])
+
+
+# the cached related objects are shared, but the state of the copy is its own
+def copy_object(obj):
+    result = copy.copy(obj)
+    if isinstance(obj, Model):
+        result._state = copy.copy(obj._state)
+        result._state.fields_cache = dict(obj._state.fields_cache)
+    # the pre-image of lib.change_tracking is updated in place when the object is saved
+    if getattr(obj, '_pre_image', None) is not None:
+        result._pre_image = dict(obj._pre_image)
+    return result
+
+
+# mode is 'r' or 'w'
+def has_permissions(obj, user, mode, check):
+    identity_map = get_identity_map()
+    if identity_map is None or obj.pk is None:
+        return check()
+    key = (obj.__class__, obj.pk, getattr(user, 'pk', None), mode)
+    if key not in identity_map.permissions:
+        identity_map.permissions[key] = check()
+    return identity_map.permissions[key]
+
+
+def clear(sender, **kwargs):
+    identity_map = get_identity_map()
+    if identity_map is not None:
+        identity_map.clear()
+
+
+post_save.connect(clear, dispatch_uid="identity_map_clear_post_save")
+post_delete.connect(clear, dispatch_uid="identity_map_clear_post_delete")
+m2m_changed.connect(clear, dispatch_uid="identity_map_clear_m2m_changed")
+
+
+class QueryCounter():
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class IdentityMapMiddleware():
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        activate()
+        try:
+            if not settings.DEBUG:
+                return self.get_response(request)
+
+            counter = QueryCounter()
+            for connection in connections.all():
+                connection.execute_wrappers.append(counter)
+            try:
+                response = self.get_response(request)
+            finally:
+                for connection in connections.all():
+                    connection.execute_wrappers.remove(counter)
+            response['X-Query-Count'] = counter.count
+            return response
+        finally:
+            deactivate()
@@ -0,0 +1,70 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.db import connection, transaction
+from django.db.models import F
+
+# Atomic allocation of sequence numbers stored in a counter field (e.g. Project.nextTicketId).
+#
+# The counter is increased by a single UPDATE in the database, so concurrent allocations can't get the same number
+# and no model save (including all its signal handlers) is needed. The row stays locked only until the surrounding
+# transaction ends.
+
+
+# Reserve count consecutive numbers from the counter field of the given object and return the first one.
+# The in-memory object gets updated as well.
+def allocate(instance, field, count=1):
+    model = instance.__class__
+    if connection.vendor == 'postgresql':
+        # a single statement that returns the new value
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE {table} SET {column} = {column} + %s WHERE {pk} = %s RETURNING {column}'.format(
+                           table=connection.ops.quote_name(model._meta.db_table),
+                           column=connection.ops.quote_name(model._meta.get_field(field).column),
+                           pk=connection.ops.quote_name(model._meta.pk.column)),
+                           [count, instance.pk])
+            next_value = cursor.fetchone()[0]
+    else:
+        with transaction.atomic():
+            # the update locks the row (or the whole database for SQLite) until the transaction ends,
+            # so the value read afterwards is the one written by this update
+            model.objects.filter(pk=instance.pk).update(**{field: F(field) + count})
+            next_value = model.objects.filter(pk=instance.pk).values_list(field, flat=True).get()
+
+    setattr(instance, field, next_value)
+    return next_value - count
+
+
+# Models with counter fields list them in sequence_fields. Ordinary saves of stored objects leave the counters out,
+# so a stale in-memory object (e.g. the one of an edit form) can't set a counter back and hand out numbers again.
+class SequenceFieldsMixin():
+    sequence_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None and \
+                not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.sequence_fields and
+                                       field.attname not in deferred]
+        super(SequenceFieldsMixin, self).save(*args, **kwargs)
@@ -0,0 +1,135 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import Http404
+from django.urls import reverse
+
+from lib import identity_map
+from lib.custom_model import get_r_object_or_404, get_w_object_or_404, get_cached_object_or_404
+from project.models import Project
+from issue.models import Issue
+
+
+class IdentityMapTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        cls.user2 = get_user_model().objects.create_user('b', 'b@b.com', 'b1234567')
+
+    def setUp(self):
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+        self.project.manager.add(self.user)
+        Issue(title='issue', project=self.project, creator=self.user).save()
+        identity_map.activate()
+
+    def tearDown(self):
+        identity_map.deactivate()
+
+    def test_lookups_and_permissions_once(self):
+        issue = get_r_object_or_404(self.user, Issue, project__name_short='PRJ', number=1)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_r_object_or_404(self.user, Issue, project__name_short='PRJ', number=1), issue)
+            self.assertEqual(get_cached_object_or_404(Issue, project__name_short='PRJ', number=1), issue)
+        # the write permissions are checked separately
+        get_w_object_or_404(self.user, Issue, project__name_short='PRJ', number=1)
+        with self.assertNumQueries(0):
+            get_w_object_or_404(self.user, Issue, project__name_short='PRJ', number=1)
+
+        # and so are the permissions of other users
+        self.assertRaises(Http404, get_r_object_or_404, self.user2, Issue, project__name_short='PRJ', number=1)
+        with self.assertNumQueries(0):
+            self.assertRaises(Http404, get_r_object_or_404, self.user2, Issue, project__name_short='PRJ', number=1)
+
+    def test_lookups_get_copies(self):
+        issue = get_r_object_or_404(self.user, Issue, project__name_short='PRJ', number=1)
+        # e.g. the values of an invalid form
+        issue.title = 'not saved'
+        with self.assertNumQueries(0):
+            other = get_cached_object_or_404(Issue, project__name_short='PRJ', number=1)
+        self.assertIsNot(other, issue)
+        self.assertEqual(other.title, 'issue')
+
+        # saving a copy doesn't change the pre-image of the other copies
+        issue.save()
+        self.assertEqual(other.get_pre_image()['title'], 'issue')
+        self.assertEqual(other.get_dirty_fields(), set())
+
+    def test_missing_objects_are_not_remembered(self):
+        self.assertRaises(Http404, get_r_object_or_404, self.user, Issue, project__name_short='PRJ', number=2)
+        Issue(title='second issue', project=self.project).save()
+        self.assertEqual(get_r_object_or_404(self.user, Issue, project__name_short='PRJ', number=2).number, 2)
+
+    def test_writes_clear_the_map(self):
+        self.assertRaises(Http404, get_r_object_or_404, self.user2, Project, name_short='PRJ')
+        # a changed membership is visible right away
+        self.project.developer.add(self.user2)
+        self.assertEqual(get_r_object_or_404(self.user2, Project, name_short='PRJ'), self.project)
+
+        Project.objects.filter(pk=self.project.pk).update(name='changed')
+        self.user2.save()
+        self.assertEqual(get_r_object_or_404(self.user, Project, name_short='PRJ').name, 'changed')
+
+    def test_inactive_outside_of_requests(self):
+        identity_map.deactivate()
+        get_r_object_or_404(self.user, Project, name_short='PRJ')
+        with self.assertNumQueries(1):
+            get_cached_object_or_404(Project, name_short='PRJ')
+
+
+class IdentityMapMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+        self.project.manager.add(self.user)
+        Issue(title='issue', project=self.project, creator=self.user).save()
+
+    def test_issue_detail_fetches_once(self):
+        url = reverse('issue:detail', kwargs={'project': 'PRJ', 'sqn_i': 1})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        issue_lookups = [query for query in queries.captured_queries
+                         if query['sql'].startswith('SELECT "issue_issue"."id"') and
+                         '"issue_issue"."number" = 1' in query['sql']]
+        self.assertEqual(len(issue_lookups), 1)
+        self.assertIsNone(identity_map.get_identity_map())
+
+    def test_query_count_in_debug_mode(self):
+        url = reverse('issue:detail', kwargs={'project': 'PRJ', 'sqn_i': 1})
+        self.assertNotIn('X-Query-Count', self.client.get(url))
+        with override_settings(DEBUG=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        self.assertEqual(int(response['X-Query-Count']), len(queries))
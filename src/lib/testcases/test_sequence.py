@@ -0,0 +1,109 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+
+from lib import sequence
+from project.models import Project
+from issue.models import Issue, Comment, reserve_numbers_for_tickets
+
+
+class SequenceTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'b', 'c')
+
+    def setUp(self):
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+
+    def test_allocate(self):
+        self.assertEqual(sequence.allocate(self.project, 'nextTicketId'), 1)
+        self.assertEqual(self.project.nextTicketId, 2)
+
+        # a stale copy of the project doesn't hand out the same number again
+        stale = Project.objects.get(pk=self.project.pk)
+        self.assertEqual(sequence.allocate(self.project, 'nextTicketId', 5), 2)
+        self.assertEqual(sequence.allocate(stale, 'nextTicketId'), 7)
+        self.assertEqual(stale.nextTicketId, 8)
+        self.assertEqual(Project.objects.get(pk=self.project.pk).nextTicketId, 8)
+
+    def test_stale_save_keeps_counters(self):
+        # e.g. the project held by the edit form while issues and sprints are created
+        stale = Project.objects.get(pk=self.project.pk)
+        self.assertEqual(sequence.allocate(self.project, 'nextTicketId', 3), 1)
+        self.assertEqual(sequence.allocate(self.project, 'nextSprintId'), 1)
+
+        stale.description = 'edited'
+        stale.save()
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertEqual(project.description, 'edited')
+        self.assertEqual(project.nextTicketId, 4)
+        self.assertEqual(project.nextSprintId, 2)
+        self.assertEqual(sequence.allocate(self.project, 'nextTicketId'), 4)
+
+        # the same for the counters of issues
+        issue = Issue(title='issue', project=self.project, kanbancol=self.project.kanbancol.first())
+        issue.save()
+        stale_issue = Issue.objects.get(pk=issue.pk)
+        Comment(creator=self.user, issue=issue, text='comment').save()
+        stale_issue.title = 'edited'
+        stale_issue.save()
+        issue = Issue.objects.get(pk=issue.pk)
+        self.assertEqual(issue.title, 'edited')
+        self.assertEqual(issue.nextCommentId, 2)
+
+    def test_no_save_signals(self):
+        saved = []
+
+        def receiver(sender, instance, **kwargs):
+            saved.append(instance)
+        post_save.connect(receiver, sender=Project, dispatch_uid='test_sequence_project_saved')
+        try:
+            issue = Issue(title='issue', project=self.project, kanbancol=self.project.kanbancol.first())
+            issue.save()
+            Comment(creator=self.user, issue=issue, text='comment').save()
+        finally:
+            post_save.disconnect(sender=Project, dispatch_uid='test_sequence_project_saved')
+
+        self.assertEqual(issue.number, 1)
+        self.assertEqual(Issue.objects.get(pk=issue.pk).nextCommentId, 2)
+        # the project isn't saved, not even to count the activity of the issue and the comment
+        self.assertEqual(saved, [])
+
+    def test_reserve_block(self):
+        numbers = reserve_numbers_for_tickets(self.project, 3)
+        self.assertEqual(list(numbers), [1, 2, 3])
+
+        # issues created meanwhile get the numbers after the block
+        issue = Issue(title='other', project=self.project, kanbancol=self.project.kanbancol.first())
+        issue.save()
+        self.assertEqual(issue.number, 4)
+
+        for number in numbers:
+            Issue(title='imported', number=number, project=self.project,
+                  kanbancol=self.project.kanbancol.first()).save()
+        self.assertEqual(sorted(self.project.issue.values_list('number', flat=True)), [1, 2, 3, 4])
@@ -31,6 +31,7 @@ import olea.lexer
 from django.db.models import Q
 
 from issue.models import Issue
+from issue import dependencies
 from tag.models import Tag
 from kanbancol.models import KanbanColumn
 from timelog.models import Timelog
@@ -253,6 +254,8 @@ def p_dependsxpr(p):
                                      project=project)
     if len(resultset) != 1:
         raise Exception(u"Given depends issue does not uniquely exist")
+    if type(issue_to_change) is Issue and dependencies.creates_cycle(issue_to_change, resultset):
+        raise Exception(u"Given depends issue depends on the issue itself")
 
     attrs_to_set.append(['dependsOn', resultset.first()])
     issue_changed = True
@@ -0,0 +1,46 @@
+
+# parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'DEPENDS DESCR ISSUE PRIO STATUS STORYPOINTS TAG TIMELOG TITLE TYPE USERxpr : refissue cchgxpr\n           | newissue cchgxpr\n           | newissuerefissue : ISSUEnewissue : TITLEcchgxpr : chgxpr\n               | cchgxpr chgxprchgxpr : TAGchgxpr : DESCRchgxpr : STATUSchgxpr : USERchgxpr : PRIOchgxpr : STORYPOINTSchgxpr : TYPEchgxpr : DEPENDSchgxpr : TIMELOG'
+    
+_lr_action_items = {'ISSUE':([0,],[4,]),'TITLE':([0,],[5,]),'$end':([1,3,5,6,7,8,9,10,11,12,13,14,15,16,17,18,],[0,-3,-5,-1,-6,-8,-9,-10,-11,-12,-13,-14,-15,-16,-2,-7,]),'TAG':([2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,],[8,8,-4,-5,8,-6,-8,-9,-10,-11,-12,-13,-14,-15,-16,8,-7,]),'DESCR':([2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,],[9,9,-4,-5,9,-6,-8,-9,-10,-11,-12,-13,-14,-15,-16,9,-7,]),'STATUS':([2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,],[10,10,-4,-5,10,-6,-8,-9,-10,-11,-12,-13,-14,-15,-16,10,-7,]),'USER':([2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,],[11,11,-4,-5,11,-6,-8,-9,-10,-11,-12,-13,-14,-15,-16,11,-7,]),'PRIO':([2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,],[12,12,-4,-5,12,-6,-8,-9,-10,-11,-12,-13,-14,-15,-16,12,-7,]),'STORYPOINTS':([2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,],[13,13,-4,-5,13,-6,-8,-9,-10,-11,-12,-13,-14,-15,-16,13,-7,]),'TYPE':([2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,],[14,14,-4,-5,14,-6,-8,-9,-10,-11,-12,-13,-14,-15,-16,14,-7,]),'DEPENDS':([2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,],[15,15,-4,-5,15,-6,-8,-9,-10,-11,-12,-13,-14,-15,-16,15,-7,]),'TIMELOG':([2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,],[16,16,-4,-5,16,-6,-8,-9,-10,-11,-12,-13,-14,-15,-16,16,-7,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'xpr':([0,],[1,]),'refissue':([0,],[2,]),'newissue':([0,],[3,]),'cchgxpr':([2,3,],[6,17,]),'chgxpr':([2,3,6,17,],[7,7,18,18,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> xpr","S'",1,None,None,None),
+  ('xpr -> refissue cchgxpr','xpr',2,'p_finalxpr','parser.py',61),
+  ('xpr -> newissue cchgxpr','xpr',2,'p_finalxpr','parser.py',62),
+  ('xpr -> newissue','xpr',1,'p_finalxpr','parser.py',63),
+  ('refissue -> ISSUE','refissue',1,'p_refissue','parser.py',70),
+  ('newissue -> TITLE','newissue',1,'p_newissue','parser.py',87),
+  ('cchgxpr -> chgxpr','cchgxpr',1,'p_chgxpr','parser.py',100),
+  ('cchgxpr -> cchgxpr chgxpr','cchgxpr',2,'p_chgxpr','parser.py',101),
+  ('chgxpr -> TAG','chgxpr',1,'p_tagxpr','parser.py',108),
+  ('chgxpr -> DESCR','chgxpr',1,'p_descrxpr','parser.py',132),
+  ('chgxpr -> STATUS','chgxpr',1,'p_statusxpr','parser.py',144),
+  ('chgxpr -> USER','chgxpr',1,'p_userxpr','parser.py',166),
+  ('chgxpr -> PRIO','chgxpr',1,'p_prioxpr','parser.py',200),
+  ('chgxpr -> STORYPOINTS','chgxpr',1,'p_storyptsxpr','parser.py',213),
+  ('chgxpr -> TYPE','chgxpr',1,'p_typexpr','parser.py',226),
+  ('chgxpr -> DEPENDS','chgxpr',1,'p_dependsxpr','parser.py',239),
+  ('chgxpr -> TIMELOG','chgxpr',1,'p_timelogxpr','parser.py',267),
+]
@@ -22,7 +22,13 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProjectConfig(AppConfig):
     name = 'project'
+
+    def ready(self):
+        import project.signals
+        post_migrate.connect(project.signals.create_trigram_index, sender=self,
+                             dispatch_uid="create_trigram_index")
@@ -22,15 +22,16 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 from django.contrib.auth import get_user_model
-from django.db.models import Q
 from django.http import Http404
 
 from issue.models import Issue
 from lib.custom_model import get_r_object_or_404
 from tag.models import Tag
 from project.models import Project
+from project import completion
 import bleach
 from common.views import AutoCompleteView
+from image_strip.thumbnails import get_thumbnail_url
 from kanbancol.models import KanbanColumn
 from django.utils.translation import ugettext_lazy as _
 
@@ -40,27 +41,22 @@ class UserAutocompleteView(AutoCompleteView):
         if not self.request.user.is_authenticated:
             return get_user_model().objects.none()
 
-        if not self.kwargs or not self.kwargs.get('project'):
-            qs = get_user_model().objects.all()
-        else:
+        proj = None
+        if self.kwargs and self.kwargs.get('project'):
             project = self.kwargs.get('project')
             try:
                 proj = get_r_object_or_404(self.request.user, Project, name_short=project)
             except Http404:
                 return get_user_model().objects.none()
 
-            qs = proj.get_members()
-
-        if self.q:
-            qs = qs.filter(username__startswith=self.q)
-        return qs
+        return completion.ordered_by_pks(get_user_model().objects.all(), completion.complete_users(proj, self.q))
 
     def get_result_label_clean(self, result):
         return result.username
 
     def get_result_label_html(self, result):
-        return '<img src="{}" width="25"><span style="padding-left: .5em">{}</span></img>'.format(result.avatar.url,
-                                                                                                  result.username)
+        return '<img src="{}" width="25"><span style="padding-left: .5em">{}</span></img>'.format(
+            get_thumbnail_url(result.avatar, 'small'), result.username)
 
 
 class IssueAutocompleteView(AutoCompleteView):
@@ -74,19 +70,15 @@ class IssueAutocompleteView(AutoCompleteView):
         except Http404:
             return Issue.objects.none()
 
-        # get all issues of the project
-        # first list the not-archived ones
-        qs = proj.issue.all().order_by("archived")
-
+        exclude = None
         if self.kwargs.get('issue') is not None:
             # this happens in the issue edit view
             # the issue should not refer to itself, so exclude it
-            issue = self.kwargs.get('issue')
-            qs = qs.exclude(project__name_short=project, number=issue)
+            exclude = proj.issue.filter(number=self.kwargs.get('issue')).values_list('pk', flat=True).first()
 
-        if self.q:
-            qs = qs.filter(Q(title__icontains=self.q) | Q(number__icontains=self.q))
-        return qs
+        # ranked completions of the project, the not-archived ones first
+        return completion.ordered_by_pks(proj.issue.select_related('project', 'kanbancol'),
+                                         completion.complete_issues(proj, self.q, exclude=exclude))
 
     def get_result_label_clean(self, result):
         return "{} {}".format(bleach.clean(result.get_ticket_identifier()), bleach.clean(result.title))
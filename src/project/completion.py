@@ -0,0 +1,233 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import hashlib
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.utils import DatabaseError
+
+from issue.models import Issue
+from lib import cache_version
+
+# Ranked completions for the issue and user autocomplete widgets.
+#
+# A backend returns the pks of the best matching objects, at most AUTOCOMPLETE_LIMIT of them. The matches are ranked
+# by how they match the query: the issue number, the start of the text, the start of a word and anywhere in the text.
+# Not archived issues always come first.
+#
+# The matching and ranking is done by the database, which only returns the completions. PostgreSQL databases with
+# the pg_trgm extension use trigram indexes and rank by trigram similarity as well, which also finds misspelled
+# queries with at least three characters.
+#
+# The completions are cached per (project, query, limit). The cached entries are invalidated by the signal handlers in
+# project.signals, which increase the version of the issues of a project, the members of a project
+# and of the users in general.
+
+AUTOCOMPLETE_LIMIT = 20
+AUTOCOMPLETE_CACHE_TIMEOUT = 60*60*24
+# minimum similarity for trigram matches, the default threshold of pg_trgm
+SIMILARITY_THRESHOLD = 0.3
+
+# ranks of the different kinds of matches, lower is better
+EXACT, PREFIX, WORD_PREFIX, CONTAINS, SIMILAR = range(5)
+
+
+class CompletionBackend():
+    """
+    Ranks with a CASE expression in the database. Without trigram indexes, words are recognized by the spaces
+    in front of them.
+    """
+    # whether misspelled queries are found as well
+    finds_similar = False
+
+    # return the pks of the best matching issues of the project
+    def complete_issues(self, project, q, limit):
+        queryset = project.issue.all()
+        if not q:
+            return list(queryset.order_by('archived', '-number').values_list('pk', flat=True)[:limit])
+
+        queryset = self.annotate_similarity(queryset, 'title', q)
+        condition = Q(title__icontains=q)
+        cases = []
+        if q.isdigit():
+            condition |= Q(number__icontains=q)
+            cases.append(When(number=int(q), then=Value(EXACT)))
+        if self.finds_similar and len(q) >= 3:
+            condition |= Q(similarity__gte=SIMILARITY_THRESHOLD)
+        cases += [
+            When(title__istartswith=q, then=Value(PREFIX)),
+            When(self.word_prefix('title', q), then=Value(WORD_PREFIX)),
+            When(Q(title__icontains=q) | Q(number__icontains=q), then=Value(CONTAINS)),
+        ]
+        queryset = queryset.filter(condition).annotate(
+            rank=Case(*cases, default=Value(SIMILAR), output_field=IntegerField())
+        ).order_by('archived', 'rank', '-similarity', '-number')
+        return list(queryset.values_list('pk', flat=True)[:limit])
+
+    # return the pks of the best matching users out of the given queryset; users are only completed by the start
+    # of their name
+    def complete_users(self, project, users, q, limit):
+        if not q:
+            return list(users.order_by('username').values_list('pk', flat=True)[:limit])
+
+        condition = Q(username__istartswith=q)
+        if self.finds_similar and len(q) >= 3:
+            condition |= Q(similarity__gte=SIMILARITY_THRESHOLD)
+        users = self.annotate_similarity(users, 'username', q).filter(condition).annotate(
+            rank=Case(When(username__iexact=q, then=Value(EXACT)),
+                      When(username__istartswith=q, then=Value(PREFIX)),
+                      default=Value(SIMILAR), output_field=IntegerField())
+        ).order_by('rank', '-similarity', 'username')
+        return list(users.values_list('pk', flat=True)[:limit])
+
+    def annotate_similarity(self, queryset, field, q):
+        return queryset.annotate(similarity=Value(0, output_field=IntegerField()))
+
+    def word_prefix(self, field, q):
+        return Q(**{field + '__icontains': ' ' + q})
+
+
+class PostgreSQLTrigramBackend(CompletionBackend):
+    """
+    The GIN trigram indexes speed up the similarity as well as the 'contains' lookups.
+    """
+    finds_similar = True
+    indexes = {
+        'issue_issue_title_trgm': (Issue._meta.db_table, 'title'),
+        'customuser_username_trgm': (get_user_model()._meta.db_table, 'username'),
+    }
+
+    def create(self, cursor):
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for index, (table, column) in self.indexes.items():
+            cursor.execute("CREATE INDEX IF NOT EXISTS {} ON {} USING GIN ({} gin_trgm_ops)".format(
+                           index, table, column))
+
+    def exists(self, cursor):
+        cursor.execute("SELECT count(*) FROM pg_indexes WHERE indexname IN %s", [tuple(self.indexes.keys())])
+        return cursor.fetchone()[0] == len(self.indexes)
+
+    def annotate_similarity(self, queryset, field, q):
+        from django.contrib.postgres.search import TrigramSimilarity
+        return queryset.annotate(similarity=TrigramSimilarity(field, q))
+
+    def word_prefix(self, field, q):
+        return Q(**{field + '__iregex': r'\m' + re.escape(q)})
+
+
+default_backend = CompletionBackend()
+trigram_backend = None
+if connection.vendor == 'postgresql':
+    trigram_backend = PostgreSQLTrigramBackend()
+
+# whether the trigram indexes are known to exist; checked on first use
+_ready = None
+
+
+def get_backend():
+    global _ready
+    if trigram_backend is None:
+        return default_backend
+    if _ready is None:
+        try:
+            with connection.cursor() as cursor:
+                _ready = trigram_backend.exists(cursor)
+        except DatabaseError:
+            _ready = False
+    return trigram_backend if _ready else default_backend
+
+
+# create the trigram indexes if the database supports them
+def create_index():
+    global _ready
+    if trigram_backend is None:
+        return
+    try:
+        with connection.cursor() as cursor:
+            trigram_backend.create(cursor)
+    except DatabaseError:
+        # e.g. the pg_trgm extension is not available or the database user isn't allowed to create it
+        _ready = False
+        return
+    _ready = True
+
+
+# completions of the users in general are stored with an empty project
+def get_version_key(kind, project):
+    return 'autocomplete_version_' + kind + '_' + (project.name_short if project else '')
+
+
+def get_version(kind, project):
+    return str(cache_version.get_version(get_version_key(kind, project)))
+
+
+def bump_version(kind, project):
+    cache_version.bump_version(get_version_key(kind, project))
+
+
+# key of the completions for q
+def get_key(kind, project, q, limit):
+    key = 'autocomplete_' + kind + '_' + (project.name_short if project else '') + '_' + \
+        get_version(kind, project)
+    if kind == 'users':
+        # the names of all users can change, the members of a project as well
+        key += '_' + get_version(kind, None)
+    return key + '_q_' + hashlib.md5(q.encode('utf-8')).hexdigest() + '_' + str(limit)
+
+
+# exclude is the pk of an issue that shall not be completed (e.g. the one being edited); it is removed from the
+# completions of one more issue, so there are still up to limit of them
+def complete_issues(project, q, limit=AUTOCOMPLETE_LIMIT, exclude=None):
+    fetch = limit if exclude is None else limit + 1
+    key = get_key('issues', project, q, fetch)
+    result = cache.get(key)
+    if result is None:
+        result = get_backend().complete_issues(project, q, fetch)
+        cache.set(key, result, AUTOCOMPLETE_CACHE_TIMEOUT)
+    if exclude is not None:
+        result = [pk for pk in result if pk != exclude][:limit]
+    return result
+
+
+# project is None for the completion of all users
+def complete_users(project, q, limit=AUTOCOMPLETE_LIMIT):
+    key = get_key('users', project, q, limit)
+    result = cache.get(key)
+    if result is None:
+        users = project.get_members() if project else get_user_model().objects.all()
+        result = get_backend().complete_users(project, users, q, limit)
+        cache.set(key, result, AUTOCOMPLETE_CACHE_TIMEOUT)
+    return result
+
+
+# queryset of the given objects that keeps the order of the pks
+def ordered_by_pks(queryset, pks):
+    if not pks:
+        return queryset.none()
+    return queryset.filter(pk__in=pks).order_by(
+        Case(*[When(pk=pk, then=Value(i)) for i, pk in enumerate(pks)], output_field=IntegerField())
+    )
@@ -24,39 +24,10 @@ EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 from django.forms import ModelForm, CharField
 
 from .models import Project
-from landing_page.actstream_util import unfollow_project
-
-import json
+from project import teardown
 from common.widgets import CustomPagedownWidget, CustomAutoCompleteWidgetMultiple
 
 
-def remove_notification_settings(user, project):
-    try:
-        props = json.loads(user.get_preference('notify_mail'))
-
-        if project.name_short in props:
-            # project in settings, delete it and store
-            del props[project.name_short]
-            user.set_preference('notify_mail', json.dumps(props))
-    except (TypeError, json.JSONDecodeError):
-        # no props => nothing to delete => return
-        return
-
-
-def clear_assignee_follow_m2m_fields_for_users(users, project):
-        for user in users:
-            issues = user.issues.filter(project=project)
-            for iss in issues:
-                iss.assignee.remove(user)
-            issues = user.discussing.filter(project=project)
-            for iss in issues:
-                iss.participant.remove(user)
-            for noti in user.notifications.filter(issue__project=project):
-                noti.delete()
-            unfollow_project(user, project)
-            remove_notification_settings(user, project)
-
-
 class ProjectCreateForm(ModelForm):
     class Meta:
         model = Project
@@ -90,5 +61,5 @@ class ProjectEditForm(ModelForm):
         for user in before:
             if user not in after:
                 diff.append(user)
-        clear_assignee_follow_m2m_fields_for_users(diff, self.instance)
+        teardown.remove_members(diff, self.instance)
         return self.instance
@@ -0,0 +1,85 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+# Cached project memberships for the permission checks.
+#
+# For every user the roles in all of their projects ({project pk: role}) and for every project the roles of all of
+# its members ({user pk: role}) are cached, so Project.developer_allowed(), Project.is_manager() and the permission
+# functions built on them are a dict lookup instead of two queries. Managers who are developers as well have the
+# manager role.
+#
+# The cached maps are invalidated by the signal handlers in project.signals whenever the managers or developers of
+# a project change and when projects or users are deleted, right away and once more after the transaction has been
+# committed.
+
+MANAGER = 'manager'
+DEVELOPER = 'developer'
+MEMBERSHIP_CACHE_TIMEOUT = 60*60*24
+
+
+def get_user_key(user_pk):
+    return 'project_roles_'+str(user_pk)
+
+
+def get_project_key(project_pk):
+    return 'project_members_'+str(project_pk)
+
+
+# {project pk: role} of all projects of the user
+def get_roles(user):
+    if user is None or user.pk is None:
+        # anonymous users aren't member of any project
+        return {}
+    key = get_user_key(user.pk)
+    roles = cache.get(key)
+    if roles is None:
+        roles = dict.fromkeys(user.dev_projects.values_list('pk', flat=True), DEVELOPER)
+        roles.update(dict.fromkeys(user.manager.values_list('pk', flat=True), MANAGER))
+        cache.set(key, roles, MEMBERSHIP_CACHE_TIMEOUT)
+    return roles
+
+
+# {user pk: role} of all members of the project
+def get_member_roles(project):
+    key = get_project_key(project.pk)
+    roles = cache.get(key)
+    if roles is None:
+        roles = dict.fromkeys(project.developer.values_list('pk', flat=True), DEVELOPER)
+        roles.update(dict.fromkeys(project.manager.values_list('pk', flat=True), MANAGER))
+        cache.set(key, roles, MEMBERSHIP_CACHE_TIMEOUT)
+    return roles
+
+
+# the role of the user in the project, None if the user isn't a member
+def get_role(user, project):
+    return get_roles(user).get(project.pk)
+
+
+def invalidate(user_pks=(), project_pks=()):
+    keys = [get_user_key(pk) for pk in user_pks] + [get_project_key(pk) for pk in project_pks]
+    cache.delete_many(keys)
+    # concurrent requests still read the old memberships until the transaction commits and might cache them again
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,86 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+import django.utils.timezone
+import collections
+import dateutil.parser
+import json
+
+
+# the JSON list of timestamps of every project becomes the rows of ProjectActivity and ProjectActivityDay
+def split_activity(apps, schema_editor):
+    Project = apps.get_model('project', 'Project')
+    ProjectActivity = apps.get_model('project', 'ProjectActivity')
+    ProjectActivityDay = apps.get_model('project', 'ProjectActivityDay')
+
+    for project in Project.objects.only('activity').iterator():
+        data = json.loads(project.activity)
+        # very old projects stored a dict, which has been discarded on the next read
+        if not isinstance(data, list):
+            continue
+        dates = [dateutil.parser.parse(date) for date in data]
+        dates = [timezone.make_aware(date, timezone.utc) if timezone.is_naive(date) else date for date in dates]
+        ProjectActivity.objects.bulk_create((ProjectActivity(project=project, when=date) for date in dates),
+                                            batch_size=1000)
+        days = collections.Counter(timezone.localtime(date, timezone.get_default_timezone()).date()
+                                   for date in dates)
+        ProjectActivityDay.objects.bulk_create(ProjectActivityDay(project=project, day=day, count=count)
+                                               for day, count in days.items())
+
+
+def join_activity(apps, schema_editor):
+    Project = apps.get_model('project', 'Project')
+    for project in Project.objects.all():
+        dates = project.activity_events.order_by('when', 'pk').values_list('when', flat=True)
+        project.activity = json.dumps([date.isoformat() for date in dates])
+        project.save(update_fields=['activity'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('project', '0004_auto_20170731_1009'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('when', models.DateTimeField(default=django.utils.timezone.now, verbose_name='time')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_events', to='project.Project', verbose_name='project')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'project activity',
+                'verbose_name_plural': 'project activities',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectActivityDay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='count')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_days', to='project.Project', verbose_name='project')),
+            ],
+            options={
+                'verbose_name': 'project activity per day',
+                'verbose_name_plural': 'project activity per day',
+                'unique_together': {('project', 'day')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='projectactivity',
+            index=models.Index(fields=['project', 'when'], name='project_activity_when_idx'),
+        ),
+        migrations.RunPython(split_activity, join_activity),
+        migrations.RemoveField(
+            model_name='project',
+            name='activity',
+        ),
+    ]
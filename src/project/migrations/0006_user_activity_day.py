@@ -0,0 +1,80 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+import collections
+import datetime
+import dateutil.parser
+import json
+
+
+# the JSON dict {project: [(timestamp, issue), ...]} of every user becomes the rows of UserActivityDay
+def count_user_activity(apps, schema_editor):
+    CustomUser = apps.get_model('user_management', 'CustomUser')
+    Project = apps.get_model('project', 'Project')
+    UserActivityDay = apps.get_model('project', 'UserActivityDay')
+
+    projects = dict(Project.objects.values_list('name_short', 'pk'))
+    server_timezone = timezone.get_default_timezone()
+    for user in CustomUser.objects.exclude(activity='{}').only('activity').iterator():
+        data = json.loads(user.activity)
+        if not isinstance(data, dict):
+            continue
+        days = collections.Counter()
+        for name_short, actions in data.items():
+            # the activity of deleted projects is gone anyway
+            if name_short not in projects:
+                continue
+            for timestamp, issue in actions:
+                date = dateutil.parser.parse(timestamp)
+                if timezone.is_naive(date):
+                    date = timezone.make_aware(date, timezone.utc)
+                days[(projects[name_short], timezone.localtime(date, server_timezone).date())] += 1
+        UserActivityDay.objects.bulk_create((UserActivityDay(user=user, project_id=project, day=day, count=count)
+                                             for (project, day), count in days.items()), batch_size=1000)
+
+
+# the exact timestamps and issues are lost, every action is put at noon of its day
+def restore_user_activity(apps, schema_editor):
+    CustomUser = apps.get_model('user_management', 'CustomUser')
+    UserActivityDay = apps.get_model('project', 'UserActivityDay')
+
+    server_timezone = timezone.get_default_timezone()
+    for user in CustomUser.objects.filter(activity_days__isnull=False).distinct():
+        data = {}
+        for name_short, day, count in UserActivityDay.objects.filter(user=user).order_by('day') \
+                                                             .values_list('project__name_short', 'day', 'count'):
+            noon = timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)), server_timezone)
+            data.setdefault(name_short, []).extend([(noon.isoformat(), 'None')] * count)
+        user.activity = json.dumps(data)
+        user.save(update_fields=['activity'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('project', '0005_activity_table'),
+        ('user_management', '0009_auto_20230404_1749'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActivityDay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='count')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_activity_days', to='project.Project', verbose_name='project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_days', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'user activity per day',
+                'verbose_name_plural': 'user activity per day',
+                'unique_together': {('user', 'project', 'day')},
+            },
+        ),
+        migrations.RunPython(count_user_activity, restore_user_activity),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('project', '0006_user_activity_day'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='deletion_requested',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Deletion requested'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='deletion_requested_by',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='deletion requested by'),
+        ),
+    ]
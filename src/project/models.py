@@ -21,23 +21,25 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
-from django.db import models
+from django.db import connection, models, transaction, IntegrityError
+from django.db.models import F, Q, Sum
+from django.utils import timezone
 from django.core.validators import MinLengthValidator, RegexValidator
 from search.fieldcheckings import SearchableMixin
 from django.urls import reverse
 
 from common.settings import AUTH_USER_MODEL
 from lib.custom_model import CustomModel
+from lib.sequence import SequenceFieldsMixin
+from project import membership
 
 from django.utils.translation import ugettext_lazy as _
 from cuser.middleware import CuserMiddleware
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
 
 
-import json
-
-
 # no CustomModel required since object is used within models.py only
 class ProjectQuerySet(models.QuerySet):
     def latest_projects(self, user):
@@ -57,7 +59,7 @@ class ProjectManager(models.Manager):
         return self.get_queryset().latest_projects()
 
 
-class Project(SearchableMixin, CustomModel):
+class Project(SequenceFieldsMixin, SearchableMixin, CustomModel):
     name = models.CharField(
             _("Name"),
             max_length=30,
@@ -66,8 +68,6 @@ class Project(SearchableMixin, CustomModel):
             ],
            )
 
-    activity = models.TextField(default="[]")
-
     name_short = models.CharField(_("Short Name"),
                                   max_length=4,
                                   unique=True,
@@ -108,6 +108,16 @@ class Project(SearchableMixin, CustomModel):
 
     activity_only_for_managers = models.BooleanField(_("Only managers can see timelog statistics for all developers"),
                                                      default=True)
+    # set while the project is deleted in the background (see project.teardown)
+    deletion_requested = models.DateTimeField(_("Deletion requested"), null=True, blank=True, editable=False)
+    deletion_requested_by = models.ForeignKey(AUTH_USER_MODEL,
+                                              models.SET_NULL,
+                                              verbose_name=_("deletion requested by"),
+                                              related_name="+",
+                                              null=True,
+                                              blank=True,
+                                              editable=False
+                                              )
 
     objects = ProjectManager()
 
@@ -126,18 +136,13 @@ class Project(SearchableMixin, CustomModel):
             return False
 
     def developer_allowed(self, user):
-        if (len(self.manager.filter(pk=user.pk)) == 1 or
-           len(self.developer.filter(pk=user.pk)) == 1):
-            return 1
-        return 0
+        return self.pk in membership.get_roles(user)
 
     def is_manager(self, user):
-        if len(self.manager.filter(pk=user.pk)) == 1:
-            return 1
-        return 0
+        return membership.get_role(user, self) == membership.MANAGER
 
     def get_members(self):
-        return (self.developer.all() | self.manager.all()).distinct()
+        return get_user_model().objects.filter(pk__in=list(membership.get_member_roles(self)))
 
     def __str__(self):
         return self.name
@@ -146,6 +151,10 @@ class Project(SearchableMixin, CustomModel):
     def search_allowed_for_user(self, user):
         return self.developer_allowed(user)
 
+    @classmethod
+    def search_allowed_filter(cls, user):
+        return Q(pk__in=user.get_projects())
+
     def get_relative_project(self):
         return self.name
 
@@ -162,37 +171,135 @@ class Project(SearchableMixin, CustomModel):
 
     def increase_activity(self, date, issue=None, decrease=False):
         actor = CuserMiddleware.get_user()
-        # handle user activity, if there is a current user
-        if actor and not isinstance(actor, AnonymousUser):
-            user_activity = json.loads(actor.activity)
-            iss = 'None'
-            if issue:
-                iss = issue.get_ticket_identifier()
-            if decrease:
-                if self.name_short in user_activity:
-                    user_activity[self.name_short].pop()
-            else:
-                if self.name_short in user_activity:
-                    user_activity[self.name_short].append((date.isoformat(), iss))
-                else:
-                    user_activity[self.name_short] = []
-                    user_activity[self.name_short].append((date.isoformat(), iss))
-            actor.activity = json.dumps(user_activity)
-            actor.save()
+        if isinstance(actor, AnonymousUser):
+            actor = None
+        if actor:
             # delete cache
             cache.delete('action_data_'+actor.username)
             cache.delete('action_data_'+actor.username+'_'+self.name_short)
 
         # handle project activity
-        activity_dict = json.loads(self.activity)
-        if isinstance(activity_dict, dict):
-            activity_dict = []
         if decrease:
-            activity_dict.pop()
+            remove_latest_activity(self)
         else:
-            activity_dict.append(date.isoformat())
-        self.activity = json.dumps(activity_dict)
-        self.save()
+            add_activity(self, date, actor)
         return
 
     searchable_fields = ['creator', 'created_at', 'description', 'name', 'name_short', 'updated_at', 'issue']
+    search_project_lookup = 'name'
+    fulltext_indexed = True
+    sequence_fields = ('nextTicketId', 'nextSprintId')
+
+
+# every action in a project (issue and comment changes, commits, ...); the rows are only appended
+class ProjectActivity(models.Model):
+    project = models.ForeignKey(Project, models.CASCADE, verbose_name=_("project"), related_name="activity_events")
+    when = models.DateTimeField(_("time"), default=timezone.now)
+    user = models.ForeignKey(AUTH_USER_MODEL, models.SET_NULL, verbose_name=_("user"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("project activity")
+        verbose_name_plural = _("project activities")
+        indexes = [models.Index(fields=['project', 'when'], name='project_activity_when_idx')]
+
+
+# the number of actions per project and day, which is what the activity charts show
+class ProjectActivityDay(models.Model):
+    project = models.ForeignKey(Project, models.CASCADE, verbose_name=_("project"), related_name="activity_days")
+    day = models.DateField(_("day"))
+    count = models.PositiveIntegerField(_("count"), default=0)
+
+    class Meta:
+        verbose_name = _("project activity per day")
+        verbose_name_plural = _("project activity per day")
+        unique_together = ('project', 'day')
+
+
+# the number of actions per user, project and day for the activity heatmaps of the users
+class UserActivityDay(models.Model):
+    user = models.ForeignKey(AUTH_USER_MODEL, models.CASCADE, verbose_name=_("user"), related_name="activity_days")
+    project = models.ForeignKey(Project, models.CASCADE, verbose_name=_("project"),
+                                related_name="user_activity_days")
+    day = models.DateField(_("day"))
+    count = models.PositiveIntegerField(_("count"), default=0)
+
+    class Meta:
+        verbose_name = _("user activity per day")
+        verbose_name_plural = _("user activity per day")
+        unique_together = ('user', 'project', 'day')
+
+
+# the days are counted in the timezone of the server
+def get_activity_day(date):
+    return timezone.localtime(date, timezone.get_default_timezone()).date()
+
+
+def supports_upsert():
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 24, 0)
+    return False
+
+
+# add change to the count of the row of model identified by keys (attribute name -> value), create it if necessary
+def change_activity_count(model, change, **keys):
+    if supports_upsert():
+        fields = [model._meta.get_field(name) for name in keys]
+        columns = [connection.ops.quote_name(field.column) for field in fields]
+        table = connection.ops.quote_name(model._meta.db_table)
+        count = connection.ops.quote_name('count')
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO {table} ({columns}, {count}) VALUES ({values}, %s) "
+                           "ON CONFLICT ({columns}) DO UPDATE SET {count} = {table}.{count} + excluded.{count}"
+                           .format(table=table, count=count, columns=', '.join(columns),
+                                   values=', '.join(['%s'] * len(columns))),
+                           [field.get_db_prep_value(value, connection) for field, value in zip(fields, keys.values())] +
+                           [change])
+        return
+
+    rows = model.objects.filter(**keys)
+    if rows.update(count=F('count') + change):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=change, **keys)
+    except IntegrityError:
+        # the row has been created concurrently
+        rows.update(count=F('count') + change)
+
+
+def add_activity(project, date, user=None):
+    day = get_activity_day(date)
+    with transaction.atomic():
+        ProjectActivity.objects.create(project=project, when=date, user=user)
+        change_activity_count(ProjectActivityDay, 1, project_id=project.pk, day=day)
+        if user:
+            change_activity_count(UserActivityDay, 1, user_id=user.pk, project_id=project.pk, day=day)
+
+
+def remove_latest_activity(project):
+    with transaction.atomic():
+        activity = project.activity_events.order_by('-when', '-pk').select_for_update().first()
+        if activity is None:
+            return
+        activity.delete()
+        day = get_activity_day(activity.when)
+        # the counters are never negative, even if they got out of step with the events
+        ProjectActivityDay.objects.filter(project=project, day=day, count__gt=0).update(count=F('count') - 1)
+        if activity.user_id:
+            UserActivityDay.objects.filter(user_id=activity.user_id, project=project, day=day, count__gt=0) \
+                                   .update(count=F('count') - 1)
+
+
+# {day: number of actions} of the days in the range (inclusive), days without actions are missing
+def get_activity_per_day(project, first_day, last_day):
+    return dict(project.activity_days.filter(day__range=(first_day, last_day)).values_list('day', 'count'))
+
+
+# {day: number of actions} of a user in a project (or in all projects) like get_activity_per_day()
+def get_user_activity_per_day(user, project, first_day, last_day):
+    days = user.activity_days.filter(day__range=(first_day, last_day))
+    if project:
+        days = days.filter(project=project)
+    return dict(days.values('day').annotate(total=Sum('count')).values_list('day', 'total'))
@@ -0,0 +1,107 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+
+from issue.models import Issue
+from project import completion, membership
+from project.models import Project
+
+
+def invalidate_issue_completions(sender, instance, **kwargs):
+    if kwargs.get('created') is False and not instance.has_changed('title', 'number', 'archived'):
+        return
+    completion.bump_version('issues', instance.project)
+
+
+def invalidate_member_completions(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        if isinstance(instance, Project):
+            completion.bump_version('users', instance)
+        else:
+            # the projects of a user changed
+            for project in Project.objects.filter(pk__in=kwargs.get('pk_set') or []):
+                completion.bump_version('users', project)
+
+
+# only the usernames are completed, so e.g. the saves of the last login or of the profile don't change anything
+def invalidate_user_completions(sender, instance, **kwargs):
+    if kwargs.get('created') is False:
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'username' not in update_fields:
+            return
+        if not instance.has_changed('username'):
+            return
+    completion.bump_version('users', None)
+
+
+def invalidate_memberships(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # the removed members (or projects) aren't known anymore after the clear
+        field = Project._meta.get_field('developer' if sender is Project.developer.through else 'manager')
+        own, other = field.m2m_column_name(), field.m2m_reverse_name()
+        if reverse:
+            own, other = other, own
+        instance._cleared_memberships = list(sender.objects.filter(**{own: instance.pk})
+                                                           .values_list(other, flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_memberships', [])
+    # the instance is the project, unless the members have been changed from the side of the user
+    if reverse:
+        membership.invalidate([instance.pk], pk_set)
+    else:
+        membership.invalidate(pk_set, [instance.pk])
+
+
+# the memberships are deleted along with projects and users without an m2m_changed signal
+def invalidate_project_memberships(sender, instance, **kwargs):
+    membership.invalidate(membership.get_member_roles(instance), [instance.pk])
+
+
+def invalidate_user_memberships(sender, instance, **kwargs):
+    membership.invalidate([instance.pk], membership.get_roles(instance))
+
+
+def create_trigram_index(sender, **kwargs):
+    completion.create_index()
+
+
+post_save.connect(invalidate_issue_completions, sender=Issue, dispatch_uid="invalidate_issue_completions")
+post_delete.connect(invalidate_issue_completions, sender=Issue, dispatch_uid="invalidate_issue_completions_delete")
+m2m_changed.connect(invalidate_member_completions, sender=Project.developer.through,
+                    dispatch_uid="invalidate_member_completions_developer")
+m2m_changed.connect(invalidate_member_completions, sender=Project.manager.through,
+                    dispatch_uid="invalidate_member_completions_manager")
+post_save.connect(invalidate_user_completions, sender=get_user_model(), dispatch_uid="invalidate_user_completions")
+post_delete.connect(invalidate_user_completions, sender=get_user_model(),
+                    dispatch_uid="invalidate_user_completions_delete")
+m2m_changed.connect(invalidate_memberships, sender=Project.developer.through,
+                    dispatch_uid="invalidate_memberships_developer")
+m2m_changed.connect(invalidate_memberships, sender=Project.manager.through,
+                    dispatch_uid="invalidate_memberships_manager")
+pre_delete.connect(invalidate_project_memberships, sender=Project, dispatch_uid="invalidate_project_memberships")
+pre_delete.connect(invalidate_user_memberships, sender=get_user_model(), dispatch_uid="invalidate_user_memberships")
@@ -0,0 +1,162 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import json
+from datetime import timedelta
+
+from actstream.models import Follow
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from common.tasks import delete_project, update_activity_stream_for_user
+from discussion.models import Notification
+from issue.models import Issue
+from issue.signals import invalidate_issue_templates
+from landing_page.actstream_util import unfollow_issues
+from project.models import Project
+from search import resultcache
+
+# Teardown of project memberships and deletion of whole projects.
+#
+# Users who leave a project (or are removed from it) lose their assignments and participations in its issues,
+# their notifications about its issues and they stop following the project and its issues. All of this is done with
+# set-based deletes on the through tables, and the caches the signal handlers would have updated for every single
+# change are invalidated once for all changed issues.
+#
+# Deleting a project marks it as requested for deletion and removes all of its members first, so it disappears for
+# everybody right away. Its issues are deleted afterwards by the delete_project task in batches, which reports its
+# progress in the cache, and finally the project itself. Deletions that make no progress for DELETION_RETRY_DELAY
+# seconds (e.g. because the task got lost or failed) are started again by resume_deletions(), which runs
+# periodically and by the resume_project_deletions management command.
+
+DELETION_BATCH_SIZE = 100
+DELETION_CACHE_TIMEOUT = 60*60*24
+DELETION_RETRY_DELAY = 60*60
+
+
+def remove_notification_settings(user, project):
+    try:
+        props = json.loads(user.get_preference('notify_mail'))
+
+        if project.name_short in props:
+            # project in settings, delete it and store
+            del props[project.name_short]
+            user.set_preference('notify_mail', json.dumps(props))
+    except (TypeError, json.JSONDecodeError):
+        # no props => nothing to delete => return
+        return
+
+
+def remove_members(users, project):
+    users = list(users)
+    if not users:
+        return
+    user_pks = [user.pk for user in users]
+
+    with transaction.atomic():
+        numbers = set()
+        for through in (Issue.assignee.through, Issue.participant.through):
+            rows = through.objects.filter(issue__project=project, customuser_id__in=user_pks)
+            numbers.update(rows.values_list('issue__number', flat=True))
+            rows.delete()
+        Notification.objects.filter(issue__project=project, user_id__in=user_pks).delete()
+        Follow.objects.filter(user_id__in=user_pks, content_type=ContentType.objects.get_for_model(Project),
+                              object_id=str(project.pk)).delete()
+        unfollow_issues(user_pks, project.issue.not_archived().values_list('pk', flat=True))
+
+    if numbers:
+        invalidate_issue_templates(project, numbers)
+        resultcache.bump_version(Issue.get_search_name())
+    for user in users:
+        remove_notification_settings(user, project)
+        update_activity_stream_for_user.delay(user.username)
+        update_activity_stream_for_user.delay(user.username, actor=True)
+
+
+def get_deletion_key(project_pk):
+    return 'project_deletion_'+str(project_pk)
+
+
+# {'user': pk of the user who deletes the project, 'name', 'done': deleted issues, 'total', 'finished'}
+# of a project deletion, None if there is none
+def get_deletion_progress(project_pk):
+    progress = cache.get(get_deletion_key(project_pk))
+    if progress is None:
+        # the progress got lost, but the project is still waiting to be deleted
+        project = Project.objects.filter(pk=project_pk, deletion_requested__isnull=False).first()
+        if project is not None:
+            progress = {'user': project.deletion_requested_by_id, 'name': project.name, 'done': 0,
+                        'total': project.issue.count(), 'finished': False}
+    return progress
+
+
+def set_deletion_progress(project_pk, progress):
+    cache.set(get_deletion_key(project_pk), progress, DELETION_CACHE_TIMEOUT)
+
+
+def start_deletion(project, user):
+    with transaction.atomic():
+        Project.objects.filter(pk=project.pk).update(deletion_requested=timezone.now(), deletion_requested_by=user)
+        # the cached issue cards are found by the members, which are gone afterwards
+        invalidate_issue_templates(project, list(project.issue.values_list('number', flat=True)))
+        remove_members(project.get_members(), project)
+        project.manager.clear()
+        project.developer.clear()
+    set_deletion_progress(project.pk, {'user': user.pk, 'name': project.name, 'done': 0,
+                                       'total': project.issue.count(), 'finished': False})
+    # the requests aren't atomic, so the project is without members already
+    delete_project.delay(project.pk)
+
+
+# can be run again for projects whose deletion has been interrupted
+def delete_issues_and_project(project_pk):
+    project = Project.objects.filter(pk=project_pk).first()
+    if project is None:
+        return
+    progress = get_deletion_progress(project_pk) or {'user': None, 'name': project.name, 'done': 0,
+                                                     'total': project.issue.count(), 'finished': False}
+    while True:
+        pks = list(project.issue.values_list('pk', flat=True)[:DELETION_BATCH_SIZE])
+        if not pks:
+            break
+        with transaction.atomic():
+            Issue.objects.filter(pk__in=pks).delete()
+        # deletions that make progress aren't started again
+        Project.objects.filter(pk=project_pk).update(deletion_requested=timezone.now())
+        progress['done'] += len(pks)
+        set_deletion_progress(project_pk, progress)
+    project.delete()
+    progress['finished'] = True
+    set_deletion_progress(project_pk, progress)
+
+
+# start the deletions again that made no progress for the given number of seconds, returns their project pks
+def resume_deletions(delay=DELETION_RETRY_DELAY):
+    pks = list(Project.objects.filter(deletion_requested__lte=timezone.now() - timedelta(seconds=delay))
+                              .values_list('pk', flat=True))
+    for pk in pks:
+        Project.objects.filter(pk=pk).update(deletion_requested=timezone.now())
+        delete_project.delay(pk)
+    return pks
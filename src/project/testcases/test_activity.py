@@ -0,0 +1,151 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import datetime
+from unittest.mock import patch
+
+from cuser.middleware import CuserMiddleware
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from issue.models import Issue
+from project.models import Project, ProjectActivity, ProjectActivityDay, get_activity_per_day, \
+    get_user_activity_per_day
+
+
+class ProjectActivityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # NOTE: these elements get modified by some testcases, so they should NOT be created in setUpTestData()
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+        self.project.developer.add(self.user)
+        self.day = datetime.datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+
+    def counts(self):
+        return dict(self.project.activity_days.values_list('day', 'count'))
+
+    def add_activities(self):
+        for hours in [0, 1, 2, 24]:
+            self.project.increase_activity(self.day + datetime.timedelta(hours=hours))
+
+    def test_events_and_rollups(self):
+        self.add_activities()
+        self.assertEqual(self.project.activity_events.count(), 4)
+        self.assertEqual(self.counts(), {datetime.date(2024, 3, 1): 3, datetime.date(2024, 3, 2): 1})
+
+        self.project.increase_activity(None, decrease=True)
+        self.assertEqual(self.project.activity_events.count(), 3)
+        self.assertEqual(self.counts(), {datetime.date(2024, 3, 1): 3, datetime.date(2024, 3, 2): 0})
+
+        self.assertEqual(get_activity_per_day(self.project, datetime.date(2024, 2, 1), datetime.date(2024, 3, 1)),
+                         {datetime.date(2024, 3, 1): 3})
+
+        # counters that got out of step with the events don't become negative
+        self.project.activity_days.update(count=0)
+        self.project.increase_activity(None, decrease=True)
+        self.assertEqual(self.project.activity_events.count(), 2)
+        self.assertEqual(self.counts(), {datetime.date(2024, 3, 1): 0, datetime.date(2024, 3, 2): 0})
+
+    def test_without_upsert(self):
+        # databases without INSERT ... ON CONFLICT update the existing row or create it
+        with patch('project.models.supports_upsert', return_value=False):
+            self.add_activities()
+        self.assertEqual(self.counts(), {datetime.date(2024, 3, 1): 3, datetime.date(2024, 3, 2): 1})
+
+    def test_no_project_save(self):
+        # one insert of the event and one upsert of the day; the project itself isn't saved anymore
+        with CaptureQueriesContext(connection) as queries:
+            self.project.increase_activity(self.day)
+        statements = [query['sql'] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 2)
+        self.assertFalse([sql for sql in statements if '"project_project"' in sql])
+        self.assertIsNone(ProjectActivity.objects.get().user)
+
+        CuserMiddleware.set_user(self.user)
+        try:
+            self.project.increase_activity(self.day)
+        finally:
+            CuserMiddleware.del_user()
+        self.assertEqual(ProjectActivity.objects.latest('id').user, self.user)
+
+    def test_user_activity(self):
+        project2 = Project(creator=self.user, name_short='PRJ2')
+        project2.save()
+        CuserMiddleware.set_user(self.user)
+        try:
+            self.add_activities()
+            project2.increase_activity(self.day)
+            self.assertEqual(get_user_activity_per_day(self.user, None, self.day.date(), self.day.date()),
+                             {datetime.date(2024, 3, 1): 4})
+            self.assertEqual(get_user_activity_per_day(self.user, project2, self.day.date(), self.day.date()),
+                             {datetime.date(2024, 3, 1): 1})
+
+            self.project.increase_activity(None, decrease=True)
+        finally:
+            CuserMiddleware.del_user()
+        self.assertEqual(dict(self.user.activity_days.filter(project=self.project).values_list('day', 'count')),
+                         {datetime.date(2024, 3, 1): 3, datetime.date(2024, 3, 2): 0})
+
+        # the counters of the user don't become negative either
+        self.user.activity_days.update(count=0)
+        self.project.increase_activity(None, decrease=True)
+        self.assertEqual(set(self.user.activity_days.values_list('count', flat=True)), {0})
+
+    def test_activities_of_issues(self):
+        issue = Issue(title='issue', project=self.project)
+        issue.save()
+        issue.title = 'changed'
+        issue.save()
+        # saving an unchanged issue is no activity
+        issue.save()
+        Issue.objects.get(pk=issue.pk).save()
+        self.assertEqual(self.project.activity_events.count(), 2)
+        self.assertEqual(self.counts(), {timezone.localtime(timezone.now()).date(): 2})
+
+        # the activities are removed together with the project
+        self.project.delete()
+        self.assertFalse(ProjectActivity.objects.exists())
+        self.assertFalse(ProjectActivityDay.objects.exists())
+
+    def test_activity_chart(self):
+        self.user.set_preference('project_list_chart_type', 'actions')
+        today = timezone.now()
+        for hours in [0, 0, 24, 48]:
+            self.project.increase_activity(today - datetime.timedelta(hours=hours))
+        response = self.client.get(reverse('timelog:api_project_activity'), {'project': 'PRJ'})
+        data = response.json()
+        self.assertEqual(data[0], {'data': 'actions'})
+        self.assertEqual(len(data), 32)
+        self.assertEqual([day['val'] for day in data[-3:]], [1, 1, 2])
+        self.assertEqual(data[-1]['datum'], str(timezone.localtime(today).date()))
+        self.assertEqual(sum(day['val'] for day in data[1:]), 4)
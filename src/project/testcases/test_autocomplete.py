@@ -21,11 +21,13 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import cache
 from django.urls import reverse
 import re
 
 from project.models import Project
+from project import completion
 from issue.models import Issue
 from kanbancol.models import KanbanColumn
 from tag.models import Tag
@@ -190,6 +192,86 @@ class AutocompletetTest(TestCase):
                 num_elements += 1
         self.assertEqual(len(response_json['results']), num_elements)
 
+    # shall rank the issues by the kind of match, the not-archived ones first
+    def test_issue_ranking(self):
+        titles = ['sync the backend', 'backend for sync', 'asynchronous', 'syncronize', 'nothing']
+        issues = []
+        for title in titles:
+            issue = Issue(project=self.project, title=title, kanbancol=self.kanbancol)
+            issue.save()
+            issues.append(issue)
+        issues[1].archived = True
+        issues[1].save()
+
+        # prefix, word prefix and substring match, the archived one last
+        self.assertEqual(completion.complete_issues(self.project, 'sync'),
+                         [issues[3].pk, issues[0].pk, issues[2].pk, issues[1].pk])
+        self.assertEqual(completion.complete_issues(self.project, 'backend'), [issues[0].pk, issues[1].pk])
+        # 'syncronize' is only similar to 'synchronize'
+        if completion.get_backend().finds_similar:
+            self.assertEqual(sorted(completion.complete_issues(self.project, 'synchronize')),
+                             [issues[2].pk, issues[3].pk])
+        else:
+            self.assertEqual(completion.complete_issues(self.project, 'synchronize'), [])
+        self.assertEqual(completion.complete_issues(self.project, str(issues[4].number))[0], issues[4].pk)
+        self.assertEqual(len(completion.complete_issues(self.project, '', limit=3)), 3)
+        # the excluded issue doesn't count towards the limit
+        self.assertEqual(completion.complete_issues(self.project, 'sync', limit=2, exclude=issues[3].pk),
+                         [issues[0].pk, issues[2].pk])
+
+        response = self.client.get(reverse('project:issueac', kwargs={"project": proj_short}) + '/?q=sync')
+        self.assertEqual([result['id'] for result in response.json()['results']],
+                         [str(issues[i].pk) for i in [3, 0, 2, 1]])
+
+    # shall rank the users by the start of their name and by similarity
+    def test_user_ranking(self):
+        self.assertEqual(completion.complete_users(None, 'te'), [self.user.pk])
+        self.assertEqual(completion.complete_users(None, 'T'), [self.user2.pk, self.user.pk, self.user3.pk])
+        user4 = get_user_model().objects.create_user('testerhood', 'test@testing4.com', 'test1234')
+        # 'test' is similar enough to 'tester'
+        if completion.get_backend().finds_similar:
+            self.assertEqual(completion.complete_users(None, 'tester'), [user4.pk, self.user.pk])
+        else:
+            self.assertEqual(completion.complete_users(None, 'tester'), [user4.pk])
+        self.assertEqual(completion.complete_users(self.project, 't'), [self.user.pk])
+
+        # the database only returns the completions
+        with self.assertNumQueries(1):
+            self.assertEqual(completion.complete_users(None, 't', limit=2), [self.user2.pk, self.user.pk])
+
+    # the completions shall be cached until the issues or members of the project change
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_completion_cache(self):
+        cache.clear()
+        self.assertEqual(completion.complete_issues(self.project, 'gh'), [self.issue2.pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(completion.complete_issues(self.project, 'gh'), [self.issue2.pk])
+
+        # the completions with a smaller limit aren't handed out for a bigger one
+        self.assertEqual(len(completion.complete_issues(self.project, '', limit=1)), 1)
+        self.assertEqual(len(completion.complete_issues(self.project, '', limit=2)), 2)
+
+        self.issue.title = 'ghost'
+        self.issue.save()
+        self.assertEqual(sorted(completion.complete_issues(self.project, 'gh')), [self.issue.pk, self.issue2.pk])
+
+        self.assertEqual(completion.complete_users(self.project, 't'), [self.user.pk])
+        self.project.developer.add(self.user2)
+        self.assertEqual(completion.complete_users(self.project, 't'), [self.user2.pk, self.user.pk])
+        self.user2.username = 'other'
+        self.user2.save()
+        self.assertEqual(completion.complete_users(self.project, 't'), [self.user.pk])
+
+        # logins and other changes of users that don't touch their names keep the completions
+        self.assertEqual(completion.complete_users(None, 't'), [self.user.pk, self.user3.pk])
+        self.client.login(username='test', password='test1234')
+        self.user3.first_name = 'first'
+        self.user3.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(completion.complete_users(None, 't'), [self.user.pk, self.user3.pk])
+        user4 = get_user_model().objects.create_user('tom', 'test@testing4.com', 'test1234')
+        self.assertEqual(completion.complete_users(None, 't'), [self.user.pk, user4.pk, self.user3.pk])
+
     # there shall be no results if the user is logged out
     def test_logged_out(self):
         self.client.logout()
@@ -0,0 +1,121 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from project import membership
+from project.models import Project
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MembershipTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        cls.user2 = get_user_model().objects.create_user('b', 'b@b.com', 'b1234567')
+
+    def setUp(self):
+        cache.clear()
+        # NOTE: these elements get modified by some testcases, so they should NOT be created in setUpTestData()
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+        self.project.manager.add(self.user)
+        self.project.developer.add(self.user, self.user2)
+        self.project2 = Project(creator=self.user, name_short='PRJ2')
+        self.project2.save()
+        self.project2.developer.add(self.user)
+
+    def test_roles(self):
+        self.assertEqual(membership.get_roles(self.user), {self.project.pk: membership.MANAGER,
+                                                           self.project2.pk: membership.DEVELOPER})
+        self.assertEqual(membership.get_member_roles(self.project), {self.user.pk: membership.MANAGER,
+                                                                     self.user2.pk: membership.DEVELOPER})
+        self.assertEqual(membership.get_roles(get_user_model()()), {})
+
+        # the permission checks don't need any query once the roles are cached
+        membership.get_roles(self.user2)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.project.is_manager(self.user))
+            self.assertTrue(self.project.developer_allowed(self.user2))
+            self.assertFalse(self.project.is_manager(self.user2))
+            self.assertFalse(self.project2.developer_allowed(self.user2))
+            self.assertTrue(self.project.user_has_read_permissions(self.user2))
+            self.assertFalse(self.project.user_has_write_permissions(self.user2))
+
+        self.assertEqual(set(self.user.get_projects()), {self.project, self.project2})
+        self.assertEqual(set(self.project.get_members()), {self.user, self.user2})
+
+    def test_invalidation(self):
+        # fill the caches
+        membership.get_roles(self.user)
+        membership.get_roles(self.user2)
+        membership.get_member_roles(self.project2)
+
+        self.project2.manager.add(self.user2)
+        self.assertTrue(self.project2.is_manager(self.user2))
+        self.assertEqual(set(self.project2.get_members()), {self.user, self.user2})
+
+        # from the side of the user
+        self.user2.manager.remove(self.project2)
+        self.assertFalse(self.project2.developer_allowed(self.user2))
+        self.assertEqual(set(self.project2.get_members()), {self.user})
+
+        self.user.dev_projects.clear()
+        self.assertFalse(self.project2.developer_allowed(self.user))
+        self.assertTrue(self.project.is_manager(self.user))
+        self.assertEqual(list(self.project2.get_members()), [])
+
+        self.project.manager.clear()
+        self.assertFalse(self.project.developer_allowed(self.user))
+        self.assertEqual(list(self.project.get_members()), [self.user2])
+
+        project_pk = self.project.pk
+        self.project.delete()
+        self.assertNotIn(project_pk, membership.get_roles(self.user2))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MembershipTransactionTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        self.user2 = get_user_model().objects.create_user('b', 'b@b.com', 'b1234567')
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+        self.project.manager.add(self.user)
+        self.project.developer.add(self.user2)
+
+    def test_invalidated_after_commit(self):
+        self.assertTrue(self.project.developer_allowed(self.user2))
+        with transaction.atomic():
+            self.project.developer.remove(self.user2)
+            # a concurrent request still sees the committed memberships and caches them again
+            cache.set(membership.get_user_key(self.user2.pk), {self.project.pk: membership.DEVELOPER})
+            cache.set(membership.get_project_key(self.project.pk),
+                      {self.user.pk: membership.MANAGER, self.user2.pk: membership.DEVELOPER})
+        self.assertFalse(self.project.developer_allowed(self.user2))
+        self.assertEqual(set(self.project.get_members()), {self.user})
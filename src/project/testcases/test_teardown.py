@@ -0,0 +1,170 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from actstream.models import following
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from discussion.models import Notification
+from issue.models import Issue
+from landing_page.actstream_util import follow_project
+from project import teardown
+from project.models import Project
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TeardownTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        cls.user2 = get_user_model().objects.create_user('b', 'b@b.com', 'b1234567')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        # NOTE: these elements get modified by some testcases, so they should NOT be created in setUpTestData()
+        self.project = Project(creator=self.user, name_short='PRJ')
+        self.project.save()
+        self.project.manager.add(self.user)
+        self.project.developer.add(self.user2)
+        self.project2 = Project(creator=self.user, name_short='PRJ2')
+        self.project2.save()
+        self.project2.developer.add(self.user2)
+        for project in [self.project, self.project2]:
+            for i in range(3):
+                issue = Issue(title='issue', project=project, creator=self.user)
+                issue.save()
+                issue.assignee.add(self.user, self.user2)
+                issue.participant.add(self.user2)
+        for project in [self.project, self.project2]:
+            follow_project(self.user2, project)
+        self.user2.set_preference('notify_mail', json.dumps({'PRJ': ['NewIssue'], 'PRJ2': ['NewIssue']}))
+
+    def test_remove_members(self):
+        self.assertEqual(Notification.objects.filter(user=self.user2).count(), 6)
+        self.project.developer.remove(self.user2)
+        teardown.remove_members([self.user2], self.project)
+
+        # only the user and only in the project
+        self.assertFalse(Issue.objects.filter(project=self.project, assignee=self.user2).exists())
+        self.assertFalse(Issue.objects.filter(project=self.project, participant=self.user2).exists())
+        self.assertEqual(Issue.objects.filter(project=self.project, assignee=self.user).count(), 3)
+        self.assertEqual(Issue.objects.filter(project=self.project2, assignee=self.user2).count(), 3)
+        self.assertEqual(Issue.objects.filter(project=self.project2, participant=self.user2).count(), 3)
+        self.assertEqual(Notification.objects.filter(user=self.user2).count(), 3)
+        self.assertFalse(Notification.objects.filter(user=self.user2, issue__project=self.project).exists())
+        self.assertEqual(set(following(self.user2)), {self.project2} | set(self.project2.issue.all()))
+        self.assertEqual(json.loads(self.user2.get_preference('notify_mail')), {'PRJ2': ['NewIssue']})
+
+    def test_leave_project(self):
+        self.client.force_login(self.user2)
+        response = self.client.post(reverse('project:leave', kwargs={'project': 'PRJ'}), {'delete': ''})
+        self.assertRedirects(response, reverse('project:list'))
+        self.assertFalse(self.project.developer_allowed(self.user2))
+        self.assertFalse(Issue.objects.filter(project=self.project, assignee=self.user2).exists())
+        self.assertEqual(set(following(self.user2)), {self.project2} | set(self.project2.issue.all()))
+
+    @patch('project.teardown.DELETION_BATCH_SIZE', 2)
+    def test_delete_project(self):
+        project_pk = self.project.pk
+        response = self.client.post(reverse('project:delete', kwargs={'project': 'PRJ'}), {'delete': 'true'})
+        self.assertRedirects(response, reverse('project:list'))
+
+        # the tasks run eagerly in the tests
+        self.assertFalse(Project.objects.filter(pk=project_pk).exists())
+        self.assertEqual(Issue.objects.count(), 3)
+        self.assertEqual(set(following(self.user2)), {self.project2} | set(self.project2.issue.all()))
+        progress = {'user': self.user.pk, 'name': self.project.name, 'done': 3, 'total': 3, 'finished': True}
+        self.assertEqual(teardown.get_deletion_progress(project_pk), progress)
+
+        response = self.client.get(reverse('project:deletion_progress', kwargs={'pk': project_pk}))
+        self.assertEqual(response.json(), progress)
+        # finished deletions aren't shown anymore
+        response = self.client.get(reverse('project:list'))
+        self.assertEqual(response.context['deletions'], [])
+        self.assertEqual(self.client.session['project_deletions'], [])
+
+        # only the user who deletes the project sees the progress
+        self.client.force_login(self.user2)
+        response = self.client.get(reverse('project:deletion_progress', kwargs={'pk': project_pk}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_deletion_in_progress(self):
+        with patch('common.tasks.delete_project.delay') as delay:
+            teardown.start_deletion(self.project, self.user)
+        delay.assert_called_once_with(self.project.pk)
+
+        # the project is gone for its members right away
+        self.assertEqual(list(self.project.get_members()), [])
+        self.assertFalse(self.project.developer_allowed(self.user))
+        self.assertEqual(set(following(self.user2)), {self.project2} | set(self.project2.issue.all()))
+
+        session = self.client.session
+        session['project_deletions'] = [self.project.pk]
+        session.save()
+        response = self.client.get(reverse('project:list'))
+        self.assertEqual(response.context['deletions'], [{'pk': self.project.pk, 'user': self.user.pk,
+                                                          'name': self.project.name, 'done': 0, 'total': 3,
+                                                          'finished': False}])
+        self.assertContains(response, reverse('project:deletion_progress', kwargs={'pk': self.project.pk}))
+
+        teardown.delete_issues_and_project(self.project.pk)
+        self.assertFalse(Project.objects.filter(pk=self.project.pk).exists())
+        self.assertTrue(teardown.get_deletion_progress(self.project.pk)['finished'])
+
+    def test_resume_deletion(self):
+        with patch('common.tasks.delete_project.delay'):
+            teardown.start_deletion(self.project, self.user)
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertIsNotNone(project.deletion_requested)
+        self.assertEqual(project.deletion_requested_by, self.user)
+
+        # the progress is still shown if the cached one got lost
+        cache.clear()
+        self.assertEqual(teardown.get_deletion_progress(project.pk), {'user': self.user.pk, 'name': project.name,
+                                                                      'done': 0, 'total': 3, 'finished': False})
+        self.assertIsNone(teardown.get_deletion_progress(self.project2.pk))
+
+        # deletions are only started again if they made no progress for a while
+        with patch('common.tasks.delete_project.delay') as delay:
+            self.assertEqual(teardown.resume_deletions(), [])
+            Project.objects.filter(pk=project.pk).update(
+                deletion_requested=timezone.now() - timedelta(seconds=teardown.DELETION_RETRY_DELAY))
+            self.assertEqual(teardown.resume_deletions(), [project.pk])
+        delay.assert_called_once_with(project.pk)
+
+        out = StringIO()
+        call_command('resume_project_deletions', '--all', stdout=out)
+        self.assertIn('Resumed the deletion of 1 project(s).', out.getvalue())
+        self.assertFalse(Project.objects.filter(pk=project.pk).exists())
+        self.assertEqual(Issue.objects.count(), 3)
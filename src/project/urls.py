@@ -33,6 +33,7 @@ app_name = 'project'
 urlpatterns = [
     url(r'^$', views.ProjectListAllView.as_view(), name='list'),
     url(r'^create/?$', views.ProjectCreateView.as_view(), name='create'),
+    url(r'^deletion/(?P<pk>[0-9]+)/?$', views.ProjectDeletionProgressView.as_view(), name='deletion_progress'),
     url(r'^userac/?'+project_pattern_optional+r'/?$', UserAutocompleteView.as_view(), name='userac'),
     url(r'^issueac/'+project_pattern+issue_pattern_optional+r'?$', IssueAutocompleteView.as_view(), name='issueac'),
     url(r'^tagac/'+project_pattern_optional+r'/?$', TagAutocompleteView.as_view(), name='tagac'),
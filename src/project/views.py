@@ -21,16 +21,14 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
-from django.views.generic.base import TemplateView
+from django.views.generic.base import TemplateView, View
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.views.generic.list import ListView
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.core import serializers
-from django.db.models import Q
 from django.urls import reverse_lazy, reverse
-from django.http import Http404, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from landing_page.actstream_util import follow_project, unfollow_project
 
@@ -38,11 +36,13 @@ from datetime import timedelta
 import json
 
 from lib.custom_model import get_r_object_or_404, get_w_object_or_404
-from .forms import ProjectCreateForm, ProjectEditForm, clear_assignee_follow_m2m_fields_for_users
+from .forms import ProjectCreateForm, ProjectEditForm
+from project import teardown
 from .models import Project
 from integration.models import SlackIntegration
 from kanbancol.models import KanbanColumn
 from timelog.models import Timelog
+from timelog.summary import get_summary as get_timelog_summary
 from common.settings import HOST, SLACK_ID
 from landing_page.actstream_util import unfollow_project
 
@@ -63,12 +63,19 @@ class ProjectListAllView(LoginRequiredMixin, ListView):
             self.request.user.set_preference('project_list_chart_type', self.request.GET.get('data'))
         data = self.request.user.get_preference('project_list_chart_type', default="timelog")
         context['chart_type'] = data
+
+        # the deletions of projects started by the user, which are shown until they are finished
+        deletions = []
+        for pk in self.request.session.get('project_deletions', []):
+            progress = teardown.get_deletion_progress(pk)
+            if progress is not None and not progress['finished']:
+                deletions.append(dict(progress, pk=pk))
+        self.request.session['project_deletions'] = [deletion['pk'] for deletion in deletions]
+        context['deletions'] = deletions
         return context
 
     def get_queryset(self):
-        return Project.objects.filter(Q(manager=self.request.user) |
-                                      Q(developer=self.request.user)
-                                      ).distinct().order_by('-created_at')[:10]
+        return self.request.user.get_projects().order_by('-created_at')[:10]
 
 
 # shows timelog for all user of this project
@@ -89,23 +96,12 @@ class ProjectDetailTimelogView(LoginRequiredMixin, UserPassesTestMixin, Template
     def get_context_data(self, **kwargs):
         context = super(ProjectDetailTimelogView, self).get_context_data(**kwargs)
         context['project'] = get_r_object_or_404(self.request.user, Project, name_short=self.kwargs.get('project'))
-        devs = context['project'].get_members()
-        context['logs'] = []
-        devs = serializers.serialize("json", devs, fields=('username'))
-        devs = json.loads(devs)
-
-        for dev in devs:
-            logs = Timelog.objects.filter(user=dev['pk'], issue__project=context['project']).order_by('-created_at')
-            total_time = timedelta(0)
-            for l in logs:
-                total_time += l.time
-            dev['fields']['total'] = total_time
-            dev['fields']['logs'] = logs[:5]
-            dev['fields']['ava_url'] = context['project'].get_members().filter(
-                                                                           username=dev['fields']['username']
-                                                                           ).first().avatar.url
-
-        context['developer'] = sorted(devs, key=lambda dev: dev['fields']['total'], reverse=True)
+        summary = get_timelog_summary(context['project'])
+        devs = []
+        for user in context['project'].get_members():
+            total, logs = summary.get(user.pk, (timedelta(0), []))
+            devs.append({'user': user, 'total': total, 'logs': logs})
+        context['developer'] = sorted(devs, key=lambda dev: dev['total'], reverse=True)
         return context
 
     def test_func(self):
@@ -260,9 +256,10 @@ class ProjectDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 
     def delete(self, request, *args, **kwargs):
         if 'delete' in request.POST:
-            # clean up before delete
-            clear_assignee_follow_m2m_fields_for_users(self.get_object().get_members(), self.get_object())
-            self.get_object().delete()
+            # the project disappears right away, its issues are deleted in the background
+            project = self.get_object()
+            teardown.start_deletion(project, request.user)
+            request.session['project_deletions'] = request.session.get('project_deletions', []) + [project.pk]
             return HttpResponseRedirect(self.success_url)
 
         # in case of "keep_project" we redirect to the settings page and not to the list of projects
@@ -272,6 +269,14 @@ class ProjectDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return get_w_object_or_404(self.request.user, Project, name_short=self.kwargs.get('project'))
 
 
+class ProjectDeletionProgressView(LoginRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        progress = teardown.get_deletion_progress(self.kwargs.get('pk'))
+        if progress is None or progress['user'] != request.user.pk:
+            raise Http404
+        return HttpResponse(json.dumps(progress), content_type='application/json')
+
+
 class LeaveProjectView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     model = Project
     success_url = reverse_lazy('project:list')
@@ -282,10 +287,10 @@ class LeaveProjectView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 
     def delete(self, request, *args, **kwargs):
         if ('delete' in request.POST and
-                (self.get_object().manager.count() > 1 or self.request.user not in self.get_object().manager.all())):
+                (self.get_object().manager.count() > 1 or not self.get_object().is_manager(self.request.user))):
             self.get_object().manager.remove(self.request.user)
             self.get_object().developer.remove(self.request.user)
-            clear_assignee_follow_m2m_fields_for_users([self.request.user], self.get_object())
+            teardown.remove_members([self.request.user], self.get_object())
             return HttpResponseRedirect(self.success_url)
         elif 'keep' in request.POST:
             return HttpResponseRedirect(reverse('project:detail', kwargs={'project': self.kwargs['project']}))
@@ -22,7 +22,16 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class SearchConfig(AppConfig):
     name = 'search'
+
+    def ready(self):
+        from search.schema import schema
+        schema.build()
+
+        import search.signals
+        post_migrate.connect(search.signals.create_fulltext_index, sender=self,
+                             dispatch_uid="create_fulltext_index")
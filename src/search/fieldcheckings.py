@@ -22,6 +22,7 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
+from django.db.models import Q
 from django.utils.translation import ugettext_lazy as _
 
 NOT_PROJ_RELATED = "not related to any projects"
@@ -33,10 +34,26 @@ class SearchableMixin():
     # NOTE: This shall be overwritten in the classes that mix this mixin in, otherwise this mixin is not useful there
     searchable_fields = []
 
+    # related objects that are needed to build a search result entry (title, url and project)
+    search_select_related = []
+
+    # lookup of the name of the project returned by get_relative_project(), used to count and filter the results
+    # per project in the database; None for objects that are not related to any project
+    search_project_lookup = None
+
+    # whether the text-searchable fields are part of the full-text index (see search.fulltext)
+    fulltext_indexed = False
+
     # This shall be overwritten in most of the classes that mix this mixin in
     def search_allowed_for_user(self, user):
         return True
 
+    # Database-side counterpart of search_allowed_for_user(). The returned Q object has to select exactly the objects
+    # search_allowed_for_user() allows, so whenever one of them is overwritten the other one has to be adjusted too.
+    @classmethod
+    def search_allowed_filter(cls, user):
+        return Q()
+
     # when searching for a specific object type, this name is used by the parser to identify the class
     @classmethod
     def get_search_name(cls):
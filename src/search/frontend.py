@@ -21,124 +21,137 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
-from search import parser
+import copy
+from collections import Counter, defaultdict
 
-from django.apps import apps
-from django.db.models import Q
+from search import fulltext, parser
+
+from django.db.models import Count, Q
 from django.urls import reverse
+from django.utils.translation import ugettext as _
 
 from search.models import Search
-from search.fieldcheckings import SearchableMixin
+from search.fieldcheckings import NOT_PROJ_RELATED
+from search.schema import schema
+
 
+# all searchable models by their search name and their searchable fields (see search.schema)
+app_list = schema.models
+searchable_fields = schema.searchable_fields
 
-app_list = {}
-searchable_fields = {}
-# get all models that implement the SearchableMixin
-for app in apps.get_models():
-    if issubclass(app, SearchableMixin) and \
-            hasattr(app, "searchable_fields"):
-        app_name = app.get_search_name()
-        app_list[app_name] = app
-        searchable_fields[app_name] = app.searchable_fields
+# the number of full-text index hits whose permissions are checked with one query
+PERMISSION_BATCH_SIZE = 500
 
 
 class SearchFrontend():
-    # TODO getattr and hasattr is mixed, this didn't happen because of runtime issues
-    #      http://stackoverflow.com/questions/903130/hasattr-vs-try-except-block-to-deal-with-non-existent-attributes
     def check_field_searchability(instance, field):
-        if instance not in app_list.keys():
-            return False
-
-        attr = app_list[instance]
-        field_path = field.split('__')
-        lastSearchable = False
-
-        for elem in field_path:
-            attr_object = None
-
-            if str(attr).startswith("<django.db.models"):
-                # we have some kind of foreign key
-                if ".Reverse" in str(attr):
-                    # we have a reverse relation
-                    attr_object = attr.field.model
-                else:
-                    # we have a normal relationship
-                    attr_object = attr.field.remote_field.model
-            else:
-                # we have a normal field
-                attr_object = attr
-
-            lastSearchable = elem in attr_object.searchable_fields
-            if lastSearchable is False:
-                return False
-
-            try:
-                attr = getattr(attr_object, elem)
-            except AttributeError as e:
-                return False
-
-        try:
-            attr.field_name
-        except AttributeError:
-            return False
-
-        return lastSearchable
-
-    def search_all_fields_for(expression):
-        retval = []
-
-        # split expression at 'AND' and 'OR' and check results
-        expr_or = expression.split(' OR ')
-
-        for app in app_list.values():
+        return schema.resolve(instance, field) is not None
+
+    # restrict a queryset of a searchable model to the objects the user is allowed to see
+    # and fetch the related objects that are needed for the result entries along with them
+    def restrict_to_user(queryset, user):
+        model = queryset.model
+        queryset = queryset.filter(model.search_allowed_filter(user))
+        if model.search_select_related:
+            queryset = queryset.select_related(*model.search_select_related)
+        return queryset
+
+    # split a free-text expression at 'OR' and the resulting parts at 'AND'
+    def split_fulltext_expression(expression):
+        query = [part_or.split(' AND ') for part_or in expression.split(' OR ')]
+
+        # skip search if we have less than 3 characters in our expression part
+        for part_or in query:
+            for part in part_or:
+                if len(part) < 3:
+                    raise ValueError()
+
+        return query
+
+    def search_all_fields_for(expression, user):
+        query = SearchFrontend.split_fulltext_expression(expression)
+
+        if fulltext.is_ready():
+            return SearchFrontend.search_fulltext_index(query, user)
+
+        # there is no full-text index for this database, so scan all searchable fields
+        hits = []
+        for name, fields in schema.text_fields.items():
             q_expression = None
-            for field in app.searchable_fields:
-                if SearchFrontend.check_field_searchability(app.get_search_name(), field):
-
-                    q_or = None
-                    for part_or in expr_or:
-                        # ORs, split at ANDs
-                        expr_and = part_or.split(' AND ')
-                        q = None
-
-                        for part in expr_and:
-                            # skip search if we have less than 3 characters in our expression part
-                            if len(part) < 3:
-                                raise ValueError()
-
-                            if q is None:
-                                q = Q(**{field + "__icontains": part})
-                            else:
-                                q = q & Q(**{field + "__icontains": part})
-
-                        if q_or is None:
-                            q_or = q
+            for field in fields:
+                q_or = None
+                for part_or in query:
+                    q = None
+
+                    for part in part_or:
+                        if q is None:
+                            q = Q(**{field + "__icontains": part})
                         else:
-                            q_or = q_or | q
+                            q = q & Q(**{field + "__icontains": part})
 
-                    if q_expression is None:
-                        q_expression = q_or
+                    if q_or is None:
+                        q_or = q
                     else:
-                        q_expression = q_expression | q_or
+                        q_or = q_or | q
+
+                if q_expression is None:
+                    q_expression = q_or
+                else:
+                    q_expression = q_expression | q_or
 
             if q_expression is not None:
                 # order descending by pk by default
-                retval.extend(list(app.objects.filter(q_expression).order_by('-pk').distinct()))
-
-        return retval
-
-    def query(expression, user):
+                result = SearchFrontend.restrict_to_user(app_list[name].objects.filter(q_expression), user)
+                hits.extend(SearchFrontend.get_hits(result.order_by('-pk').distinct()))
+
+        return RankedResult(hits)
+
+    def search_fulltext_index(query, user):
+        index_hits = fulltext.search(query)
+
+        # check the permissions with a few queries per model but keep the ranking of the index;
+        # the pks are checked in batches, so the queries stay below the parameter limits of the databases
+        pks = defaultdict(list)
+        for model, pk in index_hits:
+            pks[model].append(pk)
+
+        allowed = {}
+        for model, model_pks in pks.items():
+            if model not in app_list:
+                continue
+            visible = SearchFrontend.restrict_to_user(app_list[model].objects.all(), user)
+            for i in range(0, len(model_pks), PERMISSION_BATCH_SIZE):
+                result = visible.filter(pk__in=model_pks[i:i + PERMISSION_BATCH_SIZE])
+                for hit in SearchFrontend.get_hits(result):
+                    allowed[hit[:2]] = hit
+
+        return RankedResult([allowed[hit] for hit in index_hits if hit in allowed])
+
+    # returns the (type, pk, project name) triples for all objects of a queryset
+    def get_hits(queryset):
+        model = queryset.model
+        name = model.get_search_name()
+        if model.search_project_lookup is None:
+            return [(name, pk, None) for pk in queryset.values_list('pk', flat=True)]
+        return [(name, pk, project) for pk, project in queryset.values_list('pk', model.search_project_lookup)]
+
+    # the entry shown on the result page: [title, link, type, project]
+    def get_entry(obj):
+        return [obj.get_search_title(), obj.get_absolute_url(), obj.__class__.get_search_name(),
+                obj.get_relative_project()]
+
+    # returns a SearchResult, which builds the result entries only for the requested slices
+    def search(expression, user):
         try:
-            expr = parser.compile(expression)
-            result = app_list[parser.obj_to_query].objects.filter(expr).distinct()
+            compiled = parser.compile(expression)
+            # permissions and ordering are applied by the database, the limit is handled by QuerySetResult
+            result = SearchFrontend.restrict_to_user(compiled.model.objects.filter(compiled.q), user).distinct()
 
             # order results
-            for s in parser.sort_by:
+            for s in compiled.sort_by:
                 result = result.order_by(s)
 
-            # save as non-persistent search object
-            if Search.objects.filter(searchexpression=expression).count() == 0:
-                Search(description="Autosave", searchexpression=expression, creator=user).save()
+            SearchFrontend.autosave(expression, user)
         except Exception as e:
             # parsing exception, search all fields for expression, case of full-text-search (can't be parsed)
             # full-text search aren't stored for reuse currently
@@ -149,23 +162,196 @@ class SearchFrontend():
             if len(expression) < 3:
                 raise ValueError()
 
-            result = SearchFrontend.search_all_fields_for(expression)
-
-        # check user permissions
-        valid_items = [r for r in result if r.search_allowed_for_user(user)]
+            return SearchFrontend.search_all_fields_for(expression, user)
 
-        # limit results
-        if parser.limit != -1:
-            valid_items = valid_items[:parser.limit]
+        lookups = [lookup for lookup, value in get_lookups(compiled.q)] + [s.lstrip('-') for s in compiled.sort_by]
+        return QuerySetResult(result, compiled.limit, lookups)
 
-        # prepare a list of lists containing information about discovered items
-        retval = []
-        for i in valid_items:
-            linktext = i.get_search_title()
-            link = i.get_absolute_url()
-            objname = i.__class__.get_search_name()
-            relative_project = i.get_relative_project()
+    # save as non-persistent search object
+    def autosave(expression, user):
+        if Search.objects.filter(searchexpression=expression).count() == 0:
+            Search(description="Autosave", searchexpression=expression, creator=user).save()
 
-            retval.append([linktext, link, objname, relative_project])
-
-        return retval
+    # returns a list of lists containing information about all discovered items
+    def query(expression, user):
+        return SearchFrontend.search(expression, user).get_entries(0, None)
+
+
+class SearchResult():
+    """
+    Lazy sequence of the entries of a search result, which can be handed to django's Paginator.
+
+    The facets are the number of hits per (type, project name) pair, where the project name is None for objects
+    that are not related to any project. They are all that is needed for the type and project filters and the
+    length of the (filtered) result, so the entries are only built for the slices that are actually shown.
+    """
+    def __init__(self):
+        self.filtertype = ''
+        self.filterproj = ''
+        self._facets = None
+
+    @property
+    def facets(self):
+        if self._facets is None:
+            self._facets = self.get_facets()
+        return self._facets
+
+    def get_facets(self):
+        raise NotImplementedError
+
+    # return the entries of the filtered result between start and stop
+    def get_entries(self, start, stop):
+        raise NotImplementedError
+
+    # return a copy of this result restricted to a type and/or project ('' means no restriction)
+    def narrow(self, filtertype='', filterproj=''):
+        result = copy.copy(self)
+        result.filtertype = filtertype
+        result.filterproj = filterproj
+        return result
+
+    def type_matches(self, type):
+        return not self.filtertype or type == self.filtertype
+
+    def project_matches(self, project):
+        return not self.filterproj or project_name(project) == self.filterproj
+
+    def __len__(self):
+        return sum(count for (type, project), count in self.facets.items()
+                   if self.type_matches(type) and self.project_matches(project))
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("SearchResult only supports slicing without step")
+        return self.get_entries(key.start or 0, key.stop)
+
+    def __iter__(self):
+        return iter(self.get_entries(0, None))
+
+    # [(type, [amount with active project filter, total amount])]
+    def type_counts(self):
+        types = defaultdict(lambda: [0, 0])
+        for (type, project), count in self.facets.items():
+            types[type][1] += count
+            if self.project_matches(project):
+                types[type][0] += count
+        return sorted(types.items())
+
+    # [(project name, [amount with active type filter, total amount])], not project related objects last
+    def project_counts(self):
+        projects = defaultdict(lambda: [0, 0])
+        not_proj_related = defaultdict(lambda: [0, 0])
+        for (type, project), count in self.facets.items():
+            counts = projects[project] if project is not None else not_proj_related[project_name(project)]
+            counts[1] += count
+            if self.type_matches(type):
+                counts[0] += count
+        return sorted(projects.items()) + list(not_proj_related.items())
+
+
+class QuerySetResult(SearchResult):
+    """
+    Result of a parsed expression. Facets are counted by the database and every slice costs a single query.
+    The lookups are the field paths used by the expression, which tell the models the result depends on.
+    """
+    def __init__(self, queryset, limit=-1, lookups=None):
+        super(QuerySetResult, self).__init__()
+        self.queryset = queryset
+        self.limit = limit
+        self.lookups = lookups or []
+        self._limited_pks = None
+
+    # the hits as unsliced queryset, so it can be filtered and aggregated
+    def get_hits_queryset(self):
+        if self.limit == -1:
+            return self.queryset
+        if self._limited_pks is None:
+            self._limited_pks = list(self.queryset[:self.limit].values_list('pk', flat=True))
+        return self.queryset.filter(pk__in=self._limited_pks)
+
+    def get_facets(self):
+        model = self.queryset.model
+        queryset = self.get_hits_queryset().order_by()
+        if model.search_project_lookup is None:
+            count = queryset.count()
+            return {(model.get_search_name(), None): count} if count else {}
+
+        return {(model.get_search_name(), row[model.search_project_lookup]): row['count']
+                for row in queryset.values(model.search_project_lookup).annotate(count=Count('pk', distinct=True))}
+
+    def get_entries(self, start, stop):
+        model = self.queryset.model
+        if not self.type_matches(model.get_search_name()):
+            return []
+
+        if self.filterproj:
+            queryset = self.get_hits_queryset()
+            if model.search_project_lookup is not None:
+                queryset = queryset.filter(**{model.search_project_lookup: self.filterproj})
+            elif not self.project_matches(None):
+                return []
+        elif self.limit != -1:
+            queryset = self.queryset[:self.limit]
+        else:
+            queryset = self.queryset
+
+        return [SearchFrontend.get_entry(obj) for obj in queryset[start:stop]]
+
+    # querysets would be evaluated when they get pickled, so only keep their query
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['queryset'] = (self.queryset.model, self.queryset.query)
+        return state
+
+    def __setstate__(self, state):
+        model, query = state['queryset']
+        state['queryset'] = model._default_manager.all()
+        state['queryset'].query = query
+        self.__dict__.update(state)
+
+
+class RankedResult(SearchResult):
+    """
+    Result of a free-text search, given as list of (type, pk, project name) triples in the order of relevance.
+    Every slice costs one query per type that is part of it.
+    """
+    def __init__(self, hits):
+        super(RankedResult, self).__init__()
+        self.hits = hits
+
+    def get_facets(self):
+        return dict(Counter((type, project) for type, pk, project in self.hits))
+
+    def get_entries(self, start, stop):
+        hits = [hit for hit in self.hits if self.type_matches(hit[0]) and self.project_matches(hit[2])][start:stop]
+
+        pks = defaultdict(list)
+        for type, pk, project in hits:
+            pks[type].append(pk)
+
+        objects = {}
+        for type, type_pks in pks.items():
+            model = app_list[type]
+            queryset = model.objects.filter(pk__in=type_pks)
+            if model.search_select_related:
+                queryset = queryset.select_related(*model.search_select_related)
+            for obj in queryset:
+                objects[(type, obj.pk)] = obj
+
+        return [SearchFrontend.get_entry(objects[(type, pk)]) for type, pk, project in hits
+                if (type, pk) in objects]
+
+
+# yields the (lookup, value) pairs of a Q object and all its children
+def get_lookups(q):
+    for child in q.children:
+        if isinstance(child, Q):
+            yield from get_lookups(child)
+        else:
+            yield child
+
+
+def project_name(project):
+    if project is None:
+        return _(NOT_PROJ_RELATED)
+    return project
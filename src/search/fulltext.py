@@ -0,0 +1,214 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.utils import DatabaseError
+
+from search.models import FulltextDocument
+from search.schema import schema
+
+# Full-text index for the free-text search (expressions the search parser can't handle).
+#
+# Every model with 'fulltext_indexed = True' gets one FulltextDocument per object, which is kept up to date by the
+# signal handlers in search.signals. The database-specific part (the actual index and the ranked lookup) is done
+# by a backend, which is chosen by the database vendor. If there is no backend for the vendor in use,
+# SearchFrontend falls back to scanning the searchable fields.
+#
+# A free-text query is given as list of OR-ed parts, where each part is a list of AND-ed terms.
+
+DOCUMENT_TABLE = FulltextDocument._meta.db_table
+# the number of best matches that are taken from the index; broad terms would match most of the documents otherwise
+MAX_HITS = 1000
+
+
+class FulltextBackend():
+    # create the index structures; returns True if they didn't exist before and the documents need to be indexed
+    def create(self, cursor):
+        raise NotImplementedError
+
+    # check whether the index structures exist
+    def exists(self, cursor):
+        raise NotImplementedError
+
+    # return the (model, object_id) pairs of the best limit matching documents, best matches first
+    def search(self, cursor, query, limit):
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(FulltextBackend):
+    """
+    FTS5 table using the document table as external content. Triggers keep both tables in sync.
+    The trigram tokenizer allows case-insensitive substring matches of terms with at least three characters,
+    which is what the free-text search offers anyway.
+    """
+    table = 'search_fulltextindex'
+
+    def create(self, cursor):
+        if self.exists(cursor):
+            return False
+
+        cursor.execute("CREATE VIRTUAL TABLE {index} USING fts5(body, content='{docs}', content_rowid='id', "
+                       "tokenize='trigram')".format(index=self.table, docs=DOCUMENT_TABLE))
+        cursor.execute("CREATE TRIGGER {index}_ai AFTER INSERT ON {docs} BEGIN "
+                       "INSERT INTO {index}(rowid, body) VALUES (new.id, new.body); "
+                       "END".format(index=self.table, docs=DOCUMENT_TABLE))
+        cursor.execute("CREATE TRIGGER {index}_ad AFTER DELETE ON {docs} BEGIN "
+                       "INSERT INTO {index}({index}, rowid, body) VALUES ('delete', old.id, old.body); "
+                       "END".format(index=self.table, docs=DOCUMENT_TABLE))
+        cursor.execute("CREATE TRIGGER {index}_au AFTER UPDATE ON {docs} BEGIN "
+                       "INSERT INTO {index}({index}, rowid, body) VALUES ('delete', old.id, old.body); "
+                       "INSERT INTO {index}(rowid, body) VALUES (new.id, new.body); "
+                       "END".format(index=self.table, docs=DOCUMENT_TABLE))
+        return True
+
+    def exists(self, cursor):
+        return self.table in connection.introspection.table_names(cursor)
+
+    def search(self, cursor, query, limit):
+        # every term is a quoted string, so FTS5 doesn't interpret anything the user typed;
+        # AND binds tighter than OR in FTS5 as well
+        match = ' OR '.join(' AND '.join('"{}"'.format(term.replace('"', '""')) for term in part)
+                            for part in query)
+        cursor.execute("SELECT d.model, d.object_id FROM {index} JOIN {docs} d ON d.id = {index}.rowid "
+                       "WHERE {index} MATCH %s ORDER BY {index}.rank LIMIT %s".format(index=self.table,
+                                                                                      docs=DOCUMENT_TABLE),
+                       [match, limit])
+        return cursor.fetchall()
+
+
+class PostgreSQLBackend(FulltextBackend):
+    """
+    GIN index on the tsvector of the document body. In contrast to the SQLite backend, terms match
+    word prefixes instead of arbitrary substrings.
+    """
+    index = 'search_fulltextdocument_body_gin'
+    config = 'simple'
+
+    def create(self, cursor):
+        if self.exists(cursor):
+            return False
+
+        cursor.execute("CREATE INDEX {} ON {} USING GIN (to_tsvector('{}', body))".format(
+                       self.index, DOCUMENT_TABLE, self.config))
+        return True
+
+    def exists(self, cursor):
+        return self.index in connection.introspection.get_constraints(cursor, DOCUMENT_TABLE)
+
+    def search(self, cursor, query, limit):
+        parts = []
+        for part in query:
+            # a term matches documents containing all of its words (or words starting with them)
+            words = [word + ':*' for term in part for word in re.findall(r'\w+', term)]
+            if words:
+                parts.append('(' + ' & '.join(words) + ')')
+        if not parts:
+            return []
+
+        cursor.execute("SELECT model, object_id FROM {docs}, to_tsquery(%s, %s) query "
+                       "WHERE to_tsvector(%s, body) @@ query "
+                       "ORDER BY ts_rank(to_tsvector(%s, body), query) DESC LIMIT %s".format(docs=DOCUMENT_TABLE),
+                       [self.config, ' | '.join(parts), self.config, self.config, limit])
+        return cursor.fetchall()
+
+
+# the available backends by database vendor
+backends = {
+    'sqlite': SQLiteFTS5Backend,
+    'postgresql': PostgreSQLBackend,
+}
+
+backend = None
+if connection.vendor in backends:
+    backend = backends[connection.vendor]()
+
+# whether the index structures are known to exist; checked on first use
+_ready = None
+
+
+def is_ready():
+    global _ready
+    if backend is None:
+        return False
+    if _ready is None:
+        with connection.cursor() as cursor:
+            _ready = FulltextDocument._meta.db_table in connection.introspection.table_names(cursor) and \
+                     backend.exists(cursor)
+    return _ready
+
+
+def get_indexed_models():
+    return [model for model in schema.models.values() if model.fulltext_indexed]
+
+
+def get_document_body(instance):
+    return '\n'.join(getattr(instance, name) or '' for name in schema.text_fields[instance.get_search_name()])
+
+
+def update_document(instance):
+    if not is_ready():
+        return
+    FulltextDocument.objects.update_or_create(model=instance.get_search_name(),
+                                              object_id=instance.pk,
+                                              defaults={'body': get_document_body(instance)})
+
+
+def remove_document(instance):
+    if not is_ready():
+        return
+    FulltextDocument.objects.filter(model=instance.get_search_name(), object_id=instance.pk).delete()
+
+
+@transaction.atomic
+def rebuild():
+    FulltextDocument.objects.all().delete()
+    for model in get_indexed_models():
+        FulltextDocument.objects.bulk_create(
+            FulltextDocument(model=model.get_search_name(), object_id=obj.pk, body=get_document_body(obj))
+            for obj in model.objects.iterator()
+        )
+
+
+# create the index if necessary; newly created indexes get filled with all existing objects
+def create_index():
+    global _ready
+    if backend is None:
+        return
+    try:
+        with connection.cursor() as cursor:
+            created = backend.create(cursor)
+    except DatabaseError:
+        # e.g. a SQLite version without FTS5 or without the trigram tokenizer
+        _ready = False
+        return
+    _ready = True
+    if created:
+        rebuild()
+
+
+# returns the (model, object_id) pairs of the MAX_HITS best objects matching the query, best matches first
+def search(query):
+    with connection.cursor() as cursor:
+        return backend.search(cursor, query, MAX_HITS)
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_auto_20170714_0744'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FulltextDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=40)),
+                ('object_id', models.PositiveIntegerField()),
+                ('body', models.TextField(blank=True)),
+            ],
+            options={
+                'unique_together': {('model', 'object_id')},
+            },
+        ),
+    ]
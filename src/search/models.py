@@ -75,3 +75,18 @@ def delete_nonpersistents(sender, instance, *args, **kwargs):
     qresult = Search.objects.filter(persistent=False).order_by('-pk')[10:]
     for toDelete in qresult:
         toDelete.delete()
+
+
+# One row per indexed object, holding the text of all its text-searchable fields.
+# The full-text index (search.fulltext) is built on top of this table.
+# no CustomModel required since object is used within search.fulltext only
+class FulltextDocument(models.Model):
+    model = models.CharField(max_length=40)
+    object_id = models.PositiveIntegerField()
+    body = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ('model', 'object_id')
+
+    def __str__(self):
+        return "{}:{}".format(self.model, self.object_id)
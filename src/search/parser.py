@@ -21,13 +21,16 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
+import copy
+from collections import namedtuple
+
 import ply.yacc as yacc
 import ply.lex as lex
 from django.db.models import Q
 
 from search.lexer import tokens
 import search.lexer
-import search.frontend
+from search.schema import schema
 
 comparatorToQExpression = {
     '==': '',
@@ -40,9 +43,8 @@ comparatorToQExpression = {
     '~~': 'contains',
 }
 
-obj_to_query = ''
-sort_by = []
-limit = -1
+# the result of a compilation; q is applied to model, ordering and limit are applied afterwards (-1 means no limit)
+CompiledQuery = namedtuple('CompiledQuery', ['q', 'model', 'sort_by', 'limit'])
 
 
 # allow limiting and sorting
@@ -56,19 +58,17 @@ def p_query_limit_sort(p):
 # allow limiting
 def p_limit(p):
     '''limit : LIMIT NUMBER'''
-    global limit
-    limit = p[2]
+    p.lexer.limit = p[2]
 
 
 # define a sort expression
 def p_result_sort(p):
     '''sortexpr : SORT_OPERATOR SORTORDER_OPERATOR target'''
-    global sort_by
     sort = p[3]
     if p[2] == 'DESC':
         sort = '-' + sort
 
-    sort_by.append(sort)
+    p.lexer.sort_by.append(sort)
 
 
 # allow parenthesized expressions
@@ -94,12 +94,11 @@ def p_target(p):
     obj = split[0]
     field = split[1]
 
-    global obj_to_query
-    if obj_to_query == '':
-        obj_to_query = obj
+    if p.lexer.obj_to_query == '':
+        p.lexer.obj_to_query = obj
 
     # check field searchability
-    if search.frontend.SearchFrontend.check_field_searchability(obj, field) is False:
+    if schema.resolve(obj, field) is None:
         raise Exception(u"Search on invalid field")
 
     p[0] = field
@@ -138,13 +137,34 @@ def p_error(p):
     raise Exception(u"Parsing error: unexpected end of expression")
 
 
+class SearchCompiler():
+    """
+    Compiles search expressions into CompiledQuery objects.
+
+    The lexer and the LALR tables are built only once, when the compiler is created. Every call to compile() works
+    on its own copies of the lexer and parser and keeps the per-query state on the lexer copy, so a single compiler
+    can be shared between threads.
+    """
+    def __init__(self):
+        self.lexer = lex.lex(module=search.lexer)
+        # neither parsetab.py nor parser.out get written, the tables are kept in memory
+        self.parser = yacc.yacc(debug=False, write_tables=False)
+
+    def compile(self, expression):
+        lexer = self.lexer.clone()
+        lexer.obj_to_query = ''
+        lexer.sort_by = []
+        lexer.limit = -1
+
+        q = copy.copy(self.parser).parse(expression, lexer=lexer)
+        return CompiledQuery(q=q,
+                             model=schema.models[lexer.obj_to_query],
+                             sort_by=tuple(lexer.sort_by),
+                             limit=lexer.limit)
+
+
+compiler = SearchCompiler()
+
+
 def compile(expression):
-    global obj_to_query
-    global sort_by
-    global limit
-    obj_to_query = ''
-    sort_by = []
-    limit = -1
-    lexer = lex.lex(module=search.lexer)
-    parser = yacc.yacc()
-    return parser.parse(expression, lexer=lexer)
+    return compiler.compile(expression)
@@ -0,0 +1,135 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import hashlib
+import re
+
+from django.core.cache import cache
+
+from lib import cache_version
+from search.frontend import SearchFrontend, QuerySetResult, app_list
+
+# Cache for search results that stays valid until data relevant to the result changes.
+#
+# Results are stored per normalized expression and permission scope (the projects the user can read), so all users
+# with the same projects - e.g. the members of a project opening a filter shared with it - share one entry.
+# Every searchable model has a version counter, which is increased by the signal handlers in search.signals whenever
+# an object of it is saved or deleted. An entry remembers the versions of the models its result depends on and is
+# only used as long as none of them has changed.
+
+RESULT_KEY = 'search_result_'
+VERSION_KEY = 'search_version_'
+HITS_KEY = 'search_result_cache_hits'
+MISSES_KEY = 'search_result_cache_misses'
+
+RESULT_CACHE_TIMEOUT = 60*60*24
+
+quoted_string = re.compile(r'("[^"]*")')
+
+
+# collapse whitespace outside of quoted strings, so equivalent expressions share their entry
+def normalize_expression(expression):
+    parts = quoted_string.split(expression)
+    for i in range(0, len(parts), 2):
+        parts[i] = ' '.join(parts[i].split())
+    return ' '.join(part for part in parts if part)
+
+
+def get_scope(user):
+    return ','.join(str(pk) for pk in user.get_projects().order_by('pk').values_list('pk', flat=True))
+
+
+def get_key(expression, user):
+    return RESULT_KEY + hashlib.md5((normalize_expression(expression) + '|' + get_scope(user)).encode('utf-8')) \
+        .hexdigest()
+
+
+# names of the searchable models whose changes may change the result
+def get_dependencies(result):
+    if not isinstance(result, QuerySetResult):
+        # any searchable object could be part of a free-text result
+        return sorted(app_list.keys())
+
+    model = result.queryset.model
+    paths = result.lookups + model.search_select_related
+    if model.search_project_lookup is not None:
+        paths.append(model.search_project_lookup)
+
+    models = {model}
+    for path in paths:
+        current = model
+        for name in path.split('__'):
+            field = next((f for f in current._meta.get_fields() if f.name == name), None)
+            if field is None or field.related_model is None:
+                break
+            current = field.related_model
+            models.add(current)
+
+    return sorted(name for name, app in app_list.items() if app in models)
+
+
+# returns the current versions of the given models as dict
+def get_versions(names):
+    keys = {VERSION_KEY + name: name for name in names}
+    versions = cache_version.get_versions(list(keys.keys()))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_version(name):
+    cache_version.bump_version(VERSION_KEY + name)
+
+
+def count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+# returns the SearchResult for the expression, either from the cache or by executing it
+def search(expression, user):
+    key = get_key(expression, user)
+    # the versions are taken before the search is executed, so changes made meanwhile invalidate the new entry
+    versions = get_versions(app_list.keys())
+
+    entry = cache.get(key)
+    if entry is not None:
+        entry_versions, result = entry
+        if all(versions.get(name) == version for name, version in entry_versions.items()):
+            count(HITS_KEY)
+            if isinstance(result, QuerySetResult):
+                SearchFrontend.autosave(expression, user)
+            return result
+    count(MISSES_KEY)
+
+    result = SearchFrontend.search(expression, user)
+    # the facets are computed before caching, so they get cached as well
+    result.facets
+    dependencies = get_dependencies(result)
+    cache.set(key, ({name: versions.get(name) for name in dependencies}, result), RESULT_CACHE_TIMEOUT)
+    return result
+
+
+def get_stats():
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {'hits': stats.get(HITS_KEY, 0), 'misses': stats.get(MISSES_KEY, 0)}
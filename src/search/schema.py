@@ -0,0 +1,120 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from collections import namedtuple
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import CharField, TextField
+
+from search.fieldcheckings import SearchableMixin
+
+# Registry of everything that can be searched for, built once from the model meta data when the app is ready.
+#
+# A path is a chain of searchable fields like 'issue__project__name', starting at a searchable model.
+# Every element but the last has to be a relation to another searchable model, the last one has to be a plain field.
+
+# model: the model the path starts at, field: the field at the end of the path,
+# lookup_type: internal type of that field, models: all models the path passes through (including the first one)
+SearchPath = namedtuple('SearchPath', ['model', 'field', 'lookup_type', 'models'])
+
+# paths up to this amount of fields are resolved in advance, longer ones (going back and forth between models)
+# are resolved on demand
+PRECOMPUTED_DEPTH = 3
+
+
+class SearchSchema():
+    def __init__(self):
+        # search name -> model
+        self.models = {}
+        # search name -> searchable field names, as shown on the help page
+        self.searchable_fields = {}
+        # model -> {searchable field name -> field}
+        self.fields = {}
+        # search name -> names of the searchable text fields, used by the full-text search
+        self.text_fields = {}
+        # (search name, path) -> SearchPath
+        self.paths = {}
+
+    def build(self):
+        # the dicts are filled in place, so references to them that were taken before stay valid
+        for model in apps.get_models():
+            if issubclass(model, SearchableMixin) and hasattr(model, "searchable_fields"):
+                self.models[model.get_search_name()] = model
+
+        searchable_models = set(self.models.values())
+        for name, model in self.models.items():
+            fields = {}
+            for field_name in model.searchable_fields:
+                try:
+                    field = model._meta.get_field(field_name)
+                except FieldDoesNotExist:
+                    continue
+                # relations to models that aren't searchable can't be followed
+                if field.is_relation and field.related_model not in searchable_models:
+                    continue
+                fields[field_name] = field
+            self.fields[model] = fields
+            self.searchable_fields[name] = list(fields.keys())
+            self.text_fields[name] = [field_name for field_name, field in fields.items()
+                                      if isinstance(field, (CharField, TextField))]
+
+        for name, model in self.models.items():
+            self.add_paths(name, model, [], (model, ), PRECOMPUTED_DEPTH)
+
+    def add_paths(self, name, model, prefix, models, depth):
+        for field_name, field in self.fields[model].items():
+            path = prefix + [field_name]
+            if not field.is_relation:
+                self.paths[(name, '__'.join(path))] = SearchPath(self.models[name], field, field.get_internal_type(),
+                                                                 models)
+            elif depth > 1:
+                self.add_paths(name, field.related_model, path, models + (field.related_model, ), depth - 1)
+
+    # returns the SearchPath for a path starting at the model with the given search name,
+    # None if the path doesn't exist or isn't searchable
+    def resolve(self, name, path):
+        if (name, path) in self.paths:
+            return self.paths[(name, path)]
+        if name not in self.models:
+            return None
+
+        model = self.models[name]
+        models = (model, )
+        field = None
+        for field_name in path.split('__'):
+            if field is not None:
+                if not field.is_relation:
+                    return None
+                model = field.related_model
+                models += (model, )
+            field = self.fields[model].get(field_name)
+            if field is None:
+                return None
+
+        if field.is_relation:
+            return None
+        return SearchPath(self.models[name], field, field.get_internal_type(), models)
+
+
+schema = SearchSchema()
@@ -0,0 +1,85 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from search import fulltext, resultcache
+from search.frontend import app_list
+from search.schema import schema
+
+
+# saves of fields that aren't searchable, e.g. the update of the last login of users
+def only_unsearchable_fields(instance, update_fields):
+    return update_fields is not None and \
+        set(update_fields).isdisjoint(schema.searchable_fields[instance.get_search_name()])
+
+
+def update_fulltext_document(sender, instance, created, **kwargs):
+    # objects that track their changes (see lib.change_tracking) only need an update if a text field changed
+    if not created and hasattr(instance, 'has_changed') and \
+            not instance.has_changed(*schema.text_fields[instance.get_search_name()]):
+        return
+    if not created and only_unsearchable_fields(instance, kwargs.get('update_fields')):
+        return
+    fulltext.update_document(instance)
+
+
+def remove_fulltext_document(sender, instance, **kwargs):
+    fulltext.remove_document(instance)
+
+
+def bump_result_cache_version(sender, instance, **kwargs):
+    # saves without any changes don't change search results
+    if kwargs.get('created') is False and hasattr(instance, 'get_dirty_fields') and not instance.get_dirty_fields():
+        return
+    if kwargs.get('created') is False and only_unsearchable_fields(instance, kwargs.get('update_fields')):
+        return
+    resultcache.bump_version(instance.__class__.get_search_name())
+
+
+# both sides of a many-to-many relation change, if the relation between them does
+def bump_result_cache_version_m2m(sender, instance, model, action, **kwargs):
+    if action.startswith('post_'):
+        for changed in (instance.__class__, model):
+            if changed in app_list.values():
+                resultcache.bump_version(changed.get_search_name())
+
+
+def create_fulltext_index(sender, **kwargs):
+    fulltext.create_index()
+
+
+for model in fulltext.get_indexed_models():
+    post_save.connect(update_fulltext_document, sender=model,
+                      dispatch_uid="update_fulltext_document_" + model.get_search_name())
+    post_delete.connect(remove_fulltext_document, sender=model,
+                        dispatch_uid="remove_fulltext_document_" + model.get_search_name())
+
+for model in app_list.values():
+    post_save.connect(bump_result_cache_version, sender=model,
+                      dispatch_uid="bump_result_cache_version_" + model.get_search_name())
+    post_delete.connect(bump_result_cache_version, sender=model,
+                        dispatch_uid="bump_result_cache_version_delete_" + model.get_search_name())
+    for field in model._meta.many_to_many:
+        m2m_changed.connect(bump_result_cache_version_m2m, sender=field.remote_field.through,
+                            dispatch_uid="bump_result_cache_version_" + model.get_search_name() + "_" + field.name)
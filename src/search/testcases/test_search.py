@@ -21,7 +21,11 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch
+from django.db import connection
+from django.core.cache import cache
 import datetime
 from django.utils import timezone
 from django.urls import reverse
@@ -29,12 +33,15 @@ from django.urls import reverse
 import ply.lex as lex
 
 from search.views import SearchView, ResultView, AdvancedSearchView, SearchEditView,\
-                         MakeSearchPersistentView, DelSearchPersistentView
+                         MakeSearchPersistentView, DelSearchPersistentView, RESULTS_PER_PAGE
+from project import membership
 from project.models import Project
 import search.lexer
 from search import parser
-from search.frontend import SearchFrontend
-from search.models import Search
+from search.frontend import SearchFrontend, app_list, project_name, PERMISSION_BATCH_SIZE
+from search import fulltext, resultcache
+from search.schema import schema
+from search.models import Search, FulltextDocument
 from tag.models import Tag
 from issue.models import Issue, Comment
 from django.contrib.auth import get_user_model
@@ -291,6 +298,193 @@ class SearchTest(TestCase):
         # assert that non-persistent searches are removed from model
         self.assertEqual(Search.objects.filter(creator=user, persistent=False).count(), 10)
 
+    def test_schema(self):
+        path = schema.resolve('Comment', 'issue__project__name')
+        self.assertEqual(path.model, Comment)
+        self.assertEqual(path.field, Project._meta.get_field('name'))
+        self.assertEqual(path.lookup_type, 'CharField')
+        self.assertEqual(path.models, (Comment, Issue, Project))
+        self.assertIn(('Comment', 'issue__project__name'), schema.paths)
+
+        # longer paths are resolved on demand
+        self.assertNotIn(('Comment', 'issue__project__issue__title'), schema.paths)
+        self.assertEqual(schema.resolve('Comment', 'issue__project__issue__title').models,
+                         (Comment, Issue, Project, Issue))
+
+        # relations can't be searched for directly, only their fields
+        self.assertIsNone(schema.resolve('Comment', 'issue'))
+        self.assertIsNone(schema.resolve('Comment', 'issue__invalidfield'))
+        self.assertIsNone(schema.resolve('Comment', 'text__invalidfield'))
+        self.assertIsNone(schema.resolve('Invalid', 'text'))
+
+        self.assertIn('title', schema.text_fields['Issue'])
+        self.assertNotIn('due_date', schema.text_fields['Issue'])
+
+    def test_compiled_query(self):
+        compiled = parser.compile('Issue.number >= 2 SORT DESC Issue.number LIMIT 1')
+        self.assertEqual(compiled.model, Issue)
+        self.assertEqual(compiled.sort_by, ('-number',))
+        self.assertEqual(compiled.limit, 1)
+        self.assertEqual(Issue.objects.filter(compiled.q).count(), 2)
+
+        # the state of a previous compilation must not leak into the next one
+        compiled = parser.compile('Project.name_short == "PRJ"')
+        self.assertEqual(compiled.model, Project)
+        self.assertEqual(compiled.sort_by, ())
+        self.assertEqual(compiled.limit, -1)
+
+        # a failed compilation doesn't influence the following ones either
+        self.assertRaises(Exception, parser.compile, 'Issue.number >= 2 LIMIT')
+        compiled = parser.compile('Issue.type == "Bug"')
+        self.assertEqual(compiled.limit, -1)
+
+        # compiled queries are immutable
+        self.assertRaises(AttributeError, setattr, compiled, 'limit', 5)
+
+    def test_search_allowed_filter(self):
+        comment = Comment(creator=self.user2, issue=self.issuep2, text="blub", when=timezone.now())
+        comment.save()
+        tag = Tag(tag_text='Test', project=self.project)
+        tag.save()
+
+        # the database-side permission filter has to match search_allowed_for_user() for every searchable model
+        for user in [self.user, self.user2]:
+            for model in app_list.values():
+                allowed = [obj for obj in model.objects.all() if obj.search_allowed_for_user(user)]
+                filtered = model.objects.filter(model.search_allowed_filter(user))
+                self.assertEqual(set(filtered), set(allowed))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_query_count_independent_of_result_size(self):
+        cache.clear()
+        # the memberships are cached (see project.membership)
+        membership.get_roles(self.user)
+        membership.get_roles(self.user2)
+        # the permission checks and the limit must not cost additional queries per result
+        Search(description="Autosave", searchexpression='Issue.title ~~ "Issue"', creator=self.user).save()
+        with self.assertNumQueries(2):
+            self.assertEqual(len(SearchFrontend.query('Issue.title ~~ "Issue"', self.user)), 4)
+        Search(description="Autosave", searchexpression='Issue.title ~~ "Issue" LIMIT 2', creator=self.user).save()
+        with self.assertNumQueries(2):
+            self.assertEqual(len(SearchFrontend.query('Issue.title ~~ "Issue" LIMIT 2', self.user2)), 1)
+
+    def test_search_project_lookup(self):
+        Comment(creator=self.user, issue=self.issue, text="blub", when=timezone.now()).save()
+        Tag(tag_text='Test', project=self.project).save()
+
+        # the project lookup has to match get_relative_project() for every searchable model
+        for model in app_list.values():
+            for obj in model.objects.all():
+                project = None
+                if model.search_project_lookup is not None:
+                    project = model.objects.filter(pk=obj.pk).values_list(model.search_project_lookup, flat=True)[0]
+                self.assertEqual(project_name(project), obj.get_relative_project())
+
+    def test_facets(self):
+        Comment(creator=self.user, issue=self.issue, text="some issue", when=timezone.now()).save()
+        Project.objects.filter(pk=self.project.pk).update(name='First project')
+        Project.objects.filter(pk=self.project2.pk).update(name='Second project')
+
+        result = SearchFrontend.search('Issue.title ~~ "Issue"', self.user)
+        self.assertEqual(result.facets, {('Issue', 'First project'): 3, ('Issue', 'Second project'): 1})
+        self.assertEqual(len(result), 4)
+        result = SearchFrontend.search('Issue.title ~~ "Issue" SORT ASC Issue.title LIMIT 2', self.user)
+        self.assertEqual(result.facets, {('Issue', 'First project'): 1, ('Issue', 'Second project'): 1})
+
+        result = SearchFrontend.search('issue', self.user)
+        self.assertEqual(result.facets, {('Issue', 'First project'): 3, ('Issue', 'Second project'): 1,
+                                         ('Comment', 'First project'): 1})
+        self.assertEqual(result.type_counts(), [('Comment', [1, 1]), ('Issue', [4, 4])])
+
+        result = result.narrow(filterproj='First project')
+        self.assertEqual(len(result), 4)
+        self.assertEqual(result.type_counts(), [('Comment', [1, 1]), ('Issue', [3, 4])])
+        self.assertEqual(result.project_counts(), [('First project', [4, 4]), ('Second project', [1, 1])])
+        result = result.narrow(filtertype='Issue', filterproj='First project')
+        self.assertEqual(result.project_counts(), [('First project', [3, 4]), ('Second project', [1, 1])])
+        self.assertEqual(len(result), 3)
+        entries = list(result)
+        with self.assertNumQueries(1):
+            self.assertEqual(result[1:3], entries[1:3])
+        self.assertEqual(sorted(entry[1] for entry in entries),
+                         sorted(i.get_absolute_url() for i in Issue.objects.filter(project=self.project)))
+
+        result = SearchFrontend.search('User.username ~ "[ad]"', self.user)
+        self.assertEqual(result.project_counts(), [(project_name(None), [2, 2])])
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_result_view(self):
+        self.client.force_login(self.user)
+        for i in range(30):
+            Issue(title="Paged", project=self.project2, kanbancol=self.project2.kanbancol.first()).save()
+        Project.objects.filter(pk=self.project.pk).update(name='First project')
+
+        expression = 'Issue.title ~~ "e"'
+        response = self.client.post(reverse('search:resultpage'), {'expression': expression})
+        self.assertEqual(response.context['qresult'].paginator.count, 34)
+        self.assertEqual(len(response.context['qresult']), RESULTS_PER_PAGE)
+        self.assertEqual(response.context['typeset'], [('Issue', [34, 34])])
+
+        # narrowing down uses the cached facets, only the shown page is queried
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('search:resultpage'),
+                                        {'expression': expression, 'filterproj': 'First project', 'page': 1})
+        self.assertEqual(len([query for query in queries.captured_queries if 'issue_issue' in query['sql']]), 1)
+        self.assertEqual(response.context['qresult'].paginator.count, 3)
+        self.assertEqual(response.context['typeset'], [('Issue', [3, 34])])
+
+        response = self.client.post(reverse('search:resultpage'), {'expression': expression, 'page': 2})
+        self.assertEqual(len(response.context['qresult']), 34 - RESULTS_PER_PAGE)
+
+        response = self.client.post(reverse('search:resultpage'), {'expression': 'aa'})
+        self.assertEqual(response.context['qresult'], [])
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_result_cache(self):
+        cache.clear()
+        expression = 'Issue.title ~~ "Issue"'
+        self.assertEqual(resultcache.normalize_expression(' Issue.title  ~~ "a  b" AND\tIssue.type == "Bug" '),
+                         'Issue.title ~~ "a  b" AND Issue.type == "Bug"')
+
+        self.assertEqual(len(resultcache.search(expression, self.user)), 4)
+        with CaptureQueriesContext(connection) as queries:
+            result = resultcache.search('Issue.title   ~~ "Issue"', self.user)
+        self.assertEqual(len(result), 4)
+        self.assertEqual(len([query for query in queries.captured_queries if 'issue_issue' in query['sql']]), 0)
+        self.assertEqual(resultcache.get_stats(), {'hits': 1, 'misses': 1})
+
+        # user2 can only see project2, so there is a separate entry
+        self.assertEqual(len(resultcache.search(expression, self.user2)), 1)
+        self.assertEqual(resultcache.get_stats(), {'hits': 1, 'misses': 2})
+
+        # changes of models the result doesn't depend on keep the entry
+        self.assertEqual(resultcache.get_dependencies(result), ['Issue', 'Project'])
+        Tag(project=self.project, tag_text='cached').save()
+        resultcache.search(expression, self.user)
+        self.assertEqual(resultcache.get_stats(), {'hits': 2, 'misses': 2})
+
+        issue = Issue(title="Another Issue", project=self.project, kanbancol=self.project.kanbancol.first())
+        issue.save()
+        self.assertEqual(len(resultcache.search(expression, self.user)), 5)
+        self.assertEqual(resultcache.get_stats(), {'hits': 2, 'misses': 3})
+        issue.delete()
+        self.assertEqual(len(resultcache.search(expression, self.user)), 4)
+        self.assertEqual(resultcache.get_stats(), {'hits': 2, 'misses': 4})
+
+        # many-to-many relations are followed as well
+        expression = 'Issue.assignee.username ~~ "a"'
+        self.assertEqual(len(resultcache.search(expression, self.user)), 0)
+        self.issue.assignee.add(self.user)
+        self.assertEqual(len(resultcache.search(expression, self.user)), 1)
+
+        # the counters are available for monitoring
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('search:cachestats'))
+        self.assertEqual(response.status_code, 302)
+        get_user_model().objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.client.get(reverse('search:cachestats'))
+        self.assertEqual(response.json(), {'hits': 2, 'misses': 6})
+
     def test_fulltext_search(self):
         q = SearchFrontend.query('Issue', self.user)
         self.assertEqual(len(q), 4)
@@ -301,6 +495,78 @@ class SearchTest(TestCase):
         q = SearchFrontend.query('pRo', self.user)
         self.assertEqual(len(q), 1)
 
+    def test_fulltext_index(self):
+        self.assertTrue(fulltext.is_ready())
+        self.assertEqual(FulltextDocument.objects.filter(model='Issue').count(), 4)
+
+        # the index follows changes of the indexed objects
+        issue = Issue(title="Zebra-Issue", project=self.project, kanbancol=self.project.kanbancol.first())
+        issue.save()
+        self.assertEqual(SearchFrontend.query('zebra', self.user), [[issue.get_search_title(),
+                                                                     issue.get_absolute_url(),
+                                                                     'Issue',
+                                                                     self.project.name]])
+        issue.title = "Giraffe-Issue"
+        issue.save()
+        self.assertEqual(len(SearchFrontend.query('zebra', self.user)), 0)
+        self.assertEqual(len(SearchFrontend.query('giraffe', self.user)), 1)
+        issue.delete()
+        self.assertEqual(len(SearchFrontend.query('giraffe', self.user)), 0)
+
+        comment = Comment(creator=self.user, issue=self.issue, text="the giraffe giraffe", when=timezone.now())
+        comment.save()
+        self.assertEqual(len(SearchFrontend.query('giraffe', self.user)), 1)
+        self.assertEqual(len(SearchFrontend.query('giraffe', self.user2)), 0)
+
+        # the better match comes first
+        self.issuep2.description = "giraffe"
+        self.issuep2.save()
+        result = SearchFrontend.query('giraffe', self.user)
+        self.assertEqual([r[2] for r in result], ['Comment', 'Issue'])
+
+        # a rebuild leads to the same index
+        documents = set(FulltextDocument.objects.values_list('model', 'object_id', 'body'))
+        fulltext.rebuild()
+        self.assertEqual(set(FulltextDocument.objects.values_list('model', 'object_id', 'body')), documents)
+
+    def test_fulltext_large_hit_set(self):
+        # documents of objects the user can't see (the pks don't exist), all matching a broad term
+        FulltextDocument.objects.bulk_create(FulltextDocument(model='Issue', object_id=100000 + i,
+                                                              body='a needle in a haystack ' + 'hay ' * 20)
+                                             for i in range(3 * fulltext.MAX_HITS))
+        issue = Issue(title="needle", description="needle needle needle", project=self.project,
+                      kanbancol=self.project.kanbancol.first())
+        issue.save()
+
+        # only the best matches are taken from the index
+        self.assertEqual(len(fulltext.search([['needle']])), fulltext.MAX_HITS)
+        # their permissions are checked in batches: the index lookup, the projects of the user, two batches and the
+        # objects of the result entries
+        self.assertEqual(fulltext.MAX_HITS // PERMISSION_BATCH_SIZE, 2)
+        with self.assertNumQueries(6):
+            result = SearchFrontend.query('needle', self.user)
+        self.assertEqual([entry[0] for entry in result], [issue.get_search_title()])
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_user_saves(self):
+        version = resultcache.get_versions(['User'])['User']
+        body = FulltextDocument.objects.get(model='User', object_id=self.user.pk).body
+
+        # logging in only updates the last login
+        with patch('search.fulltext.update_document') as update_document:
+            self.client.force_login(self.user)
+            # saves without changes
+            user = get_user_model().objects.get(pk=self.user.pk)
+            user.save()
+        update_document.assert_not_called()
+        self.assertEqual(resultcache.get_versions(['User'])['User'], version)
+
+        user.first_name = 'Zebra'
+        user.save()
+        self.assertEqual(resultcache.get_versions(['User'])['User'], version + 1)
+        self.assertNotEqual(FulltextDocument.objects.get(model='User', object_id=user.pk).body, body)
+        self.assertEqual(len(SearchFrontend.query('zebra', self.user)), 1)
+
     def test_constraints(self):
         comment = Comment(creator=self.user2,
                           issue=self.issuep2,
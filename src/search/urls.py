@@ -36,4 +36,5 @@ urlpatterns = [
     url(r'^projectac/?$', ProjectAutocompleteView.as_view(), name='projectac'),
     url(r'^makepersistent/?$', views.MakeSearchPersistentView.as_view(), name='makepersistent'),
     url(r'^delpersistent/?$', views.DelSearchPersistentView.as_view(), name='delpersistent'),
+    url(r'^cachestats/?$', views.ResultCacheStatsView.as_view(), name='cachestats'),
 ]
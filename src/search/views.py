@@ -21,7 +21,7 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.views import View
 from django.urls import reverse, reverse_lazy
 from django.views.generic.list import ListView
@@ -33,22 +33,26 @@ from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 
-from collections import defaultdict
+import json
+
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
 from lib.custom_model import get_r_object_or_404, get_w_object_or_404
-from search.frontend import SearchFrontend
+from search import resultcache
 from search.models import Search
 from search.forms import SearchEditForm
 from project.models import Project
 # elements to show for help
-from search.fieldcheckings import NOT_PROJ_RELATED
-from search.frontend import app_list, searchable_fields
+from search.schema import schema
 from search.parser import comparatorToQExpression as comp_expressions
 
 from django.utils.translation import ugettext as _, ugettext_lazy as _l
 
 FILTER_PROJ = 'filterproj'
 FILTER_TYPE = 'filtertype'
+PAGE = 'page'
+
+RESULTS_PER_PAGE = 25
 
 
 class SearchView(LoginRequiredMixin, TemplateView):
@@ -109,63 +113,49 @@ class ResultView(LoginRequiredMixin, View):
     hide_breadcrumbs = True
 
     def get(self, request):
-        return TemplateResponse(request, self.template_name, {'qresult': [], 'searchable_fields': searchable_fields,
+        return TemplateResponse(request, self.template_name, {'qresult': [],
+                                                              'searchable_fields': schema.searchable_fields,
                                                               'compare': comp_expressions})
 
     def post(self, request, *args, **kwargs):
-        # result consists of a list of information about discovered objects:
-        # [title, link]
+        expression = request.POST['expression']
+        filtertype = request.POST.get(FILTER_TYPE, '')
+        filterproj = request.POST.get(FILTER_PROJ, '')
+
         try:
-            result = SearchFrontend.query(request.POST['expression'], self.request.user)
+            # the result stays cached until data it depends on changes, so filtering and paging it is cheap
+            result = resultcache.search(expression, self.request.user)
         except ValueError:
             # this can happen when less than three chars were given to full text search
+            result = None
             messages.add_message(request, messages.ERROR, _('Please search for at least three characters'))
-            result = []
-
-        # prepare set of types contained in search result
-        # with/-out project filter
-        typeset = defaultdict(lambda: [0, 0])
-        # with/-out type filter
-        projects = defaultdict(lambda: [0, 0])
-        # with/-out type filter
-        not_proj_related = defaultdict(lambda: [0, 0])
-        for title, url, model, rel_project in result:
-            typeset[model][1] += 1
-            if FILTER_PROJ not in request.POST or rel_project == request.POST[FILTER_PROJ]:
-                typeset[model][0] += 1
-            # amount for this project with active type filter
-            if _(NOT_PROJ_RELATED) == rel_project:
-                not_proj_related[rel_project][1] += 1
-                # amount for this project with active type filter
-                if FILTER_TYPE not in request.POST or model == request.POST[FILTER_TYPE]:
-                    not_proj_related[rel_project][0] += 1
-            else:
-                projects[rel_project][1] += 1
-                # amount for this project with active type filter
-                if FILTER_TYPE not in request.POST or model == request.POST[FILTER_TYPE]:
-                    projects[rel_project][0] += 1
-
-        # filter result list by object if necessary
-        filtertype = ""
-        if FILTER_TYPE in request.POST:
-            filtertype = request.POST[FILTER_TYPE]
-            result = [x for x in result if x[2] == filtertype]
-
-        filterproj = ""
-        if FILTER_PROJ in request.POST:
-            filterproj = request.POST[FILTER_PROJ]
-            result = [x for x in result if x[3] == filterproj]
+
+        typeset = []
+        projects = []
+        qresult = []
+        if result is not None:
+            result = result.narrow(filtertype, filterproj)
+            typeset = result.type_counts()
+            projects = result.project_counts()
+
+            paginator = Paginator(result, RESULTS_PER_PAGE)
+            try:
+                qresult = paginator.page(request.POST.get(PAGE))
+            except PageNotAnInteger:
+                qresult = paginator.page(1)
+            except EmptyPage:
+                qresult = paginator.page(paginator.num_pages)
 
         return TemplateResponse(request,
                                 self.template_name,
-                                {'qresult': result,
-                                 'typeset': sorted(typeset.items()),
-                                 # append the NOT_PROJ_RELATED entry always to the end
-                                 'projects': sorted(projects.items())+list(not_proj_related.items()),
-                                 'qstring': request.POST['expression'],
+                                {'qresult': qresult,
+                                 'typeset': typeset,
+                                 # the NOT_PROJ_RELATED entry is always appended to the end
+                                 'projects': projects,
+                                 'qstring': expression,
                                  FILTER_TYPE: filtertype,
                                  FILTER_PROJ: filterproj,
-                                 'searchable_fields': searchable_fields,
+                                 'searchable_fields': schema.searchable_fields,
                                  'compare': comp_expressions
                                  })
 
@@ -202,3 +192,12 @@ class DelSearchPersistentView(LoginRequiredMixin, UserPassesTestMixin, View):
 @register.filter
 def get_searchable_items_for_app(apps, app):
     return apps.get(app)
+
+
+# hit and miss counters of the search result cache for monitoring
+class ResultCacheStatsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(json.dumps(resultcache.get_stats()), content_type='application/json')
+
+    def test_func(self):
+        return self.request.user.is_staff
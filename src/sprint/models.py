@@ -23,7 +23,6 @@ EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 from django.db import models
 from django.db.models.signals import pre_save
-from django.db import transaction
 from django.dispatch import receiver
 from django.urls import reverse
 
@@ -34,14 +33,12 @@ from project.models import Project
 
 from django.utils.translation import ugettext_lazy as _
 from lib.custom_model import CustomModel
+from lib import sequence
 
 
-@transaction.atomic
+# the number is allocated by an atomic update of the counter, without saving the project
 def get_number_for_sprint(project):
-    retval = project.nextSprintId
-    project.nextSprintId += 1
-    project.save()
-    return retval
+    return sequence.allocate(project, 'nextSprintId')
 
 
 # no CustomModel required since object is used within models.py only
@@ -108,20 +105,15 @@ class Sprint(CustomModel):
     def is_inactive(self):
         return (self.startdate is not None) and (self.enddate is not None)
 
-    def set_inactive(self):
-        issues_left = False
-        issues = self.issue.all()
+    def set_inactive(self, user=None):
+        # issue.models imports this module
+        from issue import bulk
+
         issues_left = list(self.issue.exclude(kanbancol__type='Done'))
-        for issue in issues:
-            issue.was_in_sprint = True
-
-            # if issue is not done put it back to backlog
-            if issue.kanbancol.type != 'Done':
-                issue.sprint = None
-            # if issue is done archive it. flag is for message
-            if issue.kanbancol.type == 'Done':
-                issue.archived = True
-            issue.save()
+        self.issue.update(was_in_sprint=True)
+        # if issue is done archive it, otherwise put it back to backlog
+        bulk.archive(self.project, self.issue.filter(kanbancol__type='Done'), user)
+        bulk.set_sprint(self.project, self.issue.exclude(kanbancol__type='Done'), None, user)
         if not self.startdate:
             self.startdate = datetime.datetime.now()
         self.enddate = datetime.datetime.now()
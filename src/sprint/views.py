@@ -32,6 +32,7 @@ from django.urls import reverse
 from django.shortcuts import redirect, render
 from django.http import HttpResponseRedirect
 
+from issue import bulk, dependencies
 from issue.models import Issue
 from lib.custom_model import get_r_object_or_404
 from sprint.forms import SprintForm
@@ -119,9 +120,8 @@ class StopSprintView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
         else:
             sprint = get_r_object_or_404(self.request.user, Sprint, project=proj, seqnum=new_sprint)
 
-        for issue in proj.issue.filter(number__in=selection):
-            issue.sprint = sprint
-            issue.save()
+        if selection:
+            bulk.set_sprint(proj, proj.issue.filter(number__in=selection), sprint, self.request.user)
 
         if selection:
             return redirect(reverse('backlog:backlog', kwargs={'project': self.kwargs.get('project'),
@@ -193,6 +193,7 @@ class SprintboardView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
 
         issues = process_order_by(self.request, issuelist)
         context['issuelist'] = issues
+        context['blocked_issues'] = dependencies.get_blocked(proj)
 
         return context
 
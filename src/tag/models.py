@@ -24,6 +24,7 @@ EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import random
 
 from django.db import models
+from django.db.models import Q
 from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 
@@ -94,6 +95,10 @@ class Tag(SearchableMixin, CustomModel):
     def search_allowed_for_user(self, user):
         return self.project.developer_allowed(user)
 
+    @classmethod
+    def search_allowed_filter(cls, user):
+        return Q(project__in=user.get_projects())
+
     def get_relative_project(self):
         return self.project.name
 
@@ -104,3 +109,6 @@ class Tag(SearchableMixin, CustomModel):
         return self.project.user_has_read_permissions(user)
 
     searchable_fields = ['tag_text']
+    search_select_related = ['project']
+    search_project_lookup = 'project__name'
+    fulltext_indexed = True
@@ -0,0 +1,105 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from lib import cache_version
+from timelog.models import Timelog
+
+# Analytics of the logged time of a project: the sums per day, per user and per issue within a window of days.
+#
+# Every sum is a single grouped query. The days are the ones in the current timezone, which the timezone middleware
+# sets to the timezone of the user, so the window and the day a log belongs to match what the user sees.
+# The sums are cached per (project, window, timezone, user). The cached entries depend on a version per project,
+# which the signal handlers in timelog.models increase whenever a timelog of the project is saved or deleted.
+
+ANALYTICS_CACHE_TIMEOUT = 60*60*24
+
+
+def get_version(project_pk):
+    return str(cache_version.get_version('timelog_analytics_version_'+str(project_pk)))
+
+
+def bump_version(project_pk):
+    cache_version.bump_version('timelog_analytics_version_'+str(project_pk))
+
+
+# the same for all timelogs of a user, e.g. for the heatmap of the logged time of all projects
+def get_user_version(user_pk):
+    return str(cache_version.get_version('timelog_user_version_'+str(user_pk)))
+
+
+def bump_user_version(user_pk):
+    cache_version.bump_version('timelog_user_version_'+str(user_pk))
+
+
+def get_key(kind, project, first_day, last_day, user):
+    return 'timelog_analytics_'+kind+'_'+str(project.pk)+'_'+get_version(project.pk)+'_'+str(first_day)+'_' + \
+        str(last_day)+'_'+timezone.get_current_timezone_name()+'_'+(str(user.pk) if user else '')
+
+
+# the timelogs of the project from the start of first_day until the end of last_day in the current timezone
+def get_logs(project, first_day, last_day, user=None):
+    current_timezone = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.datetime.combine(first_day, datetime.time.min), current_timezone)
+    end = timezone.make_aware(datetime.datetime.combine(last_day + datetime.timedelta(days=1), datetime.time.min),
+                              current_timezone)
+    logs = Timelog.objects.filter(issue__project=project, created_at__gte=start, created_at__lt=end)
+    if user:
+        logs = logs.filter(user=user)
+    return logs.order_by()
+
+
+def get_sums(kind, project, first_day, last_day, user, group_by):
+    key = get_key(kind, project, first_day, last_day, user)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    logs = get_logs(project, first_day, last_day, user)
+    if kind == 'day':
+        # TruncDate uses the current timezone
+        logs = logs.annotate(day=TruncDate('created_at'))
+    result = dict(logs.values(group_by).annotate(total=Sum('time')).values_list(group_by, 'total'))
+    cache.set(key, result, ANALYTICS_CACHE_TIMEOUT)
+    return result
+
+
+# {day: logged time} of the days with logged time
+def get_time_per_day(project, first_day, last_day, user=None):
+    return get_sums('day', project, first_day, last_day, user, 'day')
+
+
+# {username: logged time} of the users who logged time
+def get_time_per_user(project, first_day, last_day, user=None):
+    return get_sums('user', project, first_day, last_day, user, 'user__username')
+
+
+# {issue number: logged time} of the issues with logged time
+def get_time_per_issue(project, first_day, last_day, user=None):
+    return get_sums('issue', project, first_day, last_day, user, 'issue__number')
@@ -28,17 +28,21 @@ from django.core.cache import cache
 
 from datetime import *
 from .forms import *
+import hashlib
 import json
-from django.core import serializers
 from issue.models import *
 from project.models import *
-from django.http import HttpResponse
-import pytz
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.duration import duration_string
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-import dateutil.parser
 
 from lib.custom_model import get_r_object_or_404
+from timelog import analytics
 
 
 def get_action_data(project, user):
@@ -51,39 +55,20 @@ def get_action_data(project, user):
         if result:
             return result
 
+    # the heatmap shows the last year, which are at most 365 rows of the daily counters
+    last_day = get_activity_day(timezone.now())
+    days = get_user_activity_per_day(user, project, last_day - timedelta(days=364), last_day)
+
+    # the heatmap sums up the values per day in the timezone of the browser,
+    # so every day is put at noon to keep it on the same day there
+    server_timezone = timezone.get_default_timezone()
     result = {}
-    act_count = 0
-    maximum = 0
-    if project:
-        data = json.loads(user.activity)[project.name_short]
-    else:
-        data2 = json.loads(user.activity)
-        data = []
-        for key, values in data2.items():
-            data += values
-        data.sort(key=lambda x: x[0])
-
-    if(len(data) > 0):
-        new_day = dateutil.parser.parse(data[0][0]).replace(hour=1, minute=1, second=1, microsecond=1).date()
-    for timestamp, issue in data:
-        date_object = dateutil.parser.parse(timestamp)
-        act_day = date_object.date()
-        date = date_object.timestamp()
-        if date in result:
-            result[date] += 1
-        else:
-            result[date] = 1
-        if(act_day == new_day):
-            act_count += 1
-        else:
-            if (act_count > maximum):
-                maximum = act_count
-            new_day = act_day
-            act_count = 0
-            act_count += 1
-
-    if (act_count > maximum):
-        maximum = act_count
+    for day, count in days.items():
+        if count:
+            noon = timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)), server_timezone)
+            result[noon.timestamp()] = count
+    maximum = max(days.values(), default=0)
+
     result['START_MONTH'] = str((timezone.now()-timedelta(days=335)).date())
     result['USERNAME'] = user.username
     result['MAXIMUM'] = maximum
@@ -96,53 +81,43 @@ def get_action_data(project, user):
 
 
 def get_timelog_data(project, user):
+    # the cached heatmaps depend on the timelog version of the project or of the user (see timelog.analytics)
+    last_day = get_activity_day(timezone.now())
     if project:
-        result = cache.get('timelog_data_'+user.username+'_'+project.name_short)
-        if result:
-            return result
+        key = 'timelog_data_'+user.username+'_'+project.name_short+'_'+analytics.get_version(project.pk)
     else:
-        result = cache.get('timelog_data_'+user.username)
-        if result:
-            return result
-
+        key = 'timelog_data_'+user.username+'_'+analytics.get_user_version(user.pk)
+    key += '_'+str(last_day)
+    result = cache.get(key)
+    if result:
+        return result
+
+    # the logged time per day of the last year, summed up by the database; the days are the ones of the server
+    # like the ones of the action counters
+    server_timezone = timezone.get_default_timezone()
+    start = timezone.make_aware(datetime.datetime.combine(last_day - timedelta(days=364), datetime.time.min),
+                                server_timezone)
+    logs = Timelog.objects.filter(user=user, created_at__gte=start)
     if project:
-        data = Timelog.objects.filter(issue__project__name_short=project.name_short,
-                                      user=user).order_by('created_at')
-    else:
-        data = Timelog.objects.filter(user=user).order_by('created_at')
-
+        logs = logs.filter(issue__project=project)
+    with timezone.override(server_timezone):
+        # TruncDate uses the current timezone
+        days = dict(logs.order_by().annotate(day=TruncDate('created_at')).values('day')
+                    .annotate(total=Sum('time')).values_list('day', 'total'))
+
+    # the heatmap sums up the values per day in the timezone of the browser,
+    # so every day is put at noon to keep it on the same day there
     result = {}
-    if(len(data) > 0):
-        timestamp = data[0].created_at.replace(hour=1, minute=1, second=1, microsecond=1).timestamp()
-    maximum = 0
-    act_count = 0
-    for d in data:
-        act_day = d.created_at.replace(hour=1, minute=1, second=1, microsecond=1).timestamp()
-        if (d.created_at.timestamp() in result):
-            result[d.created_at.timestamp()] += d.time.total_seconds()/60
-        else:
-            result[d.created_at.timestamp()] = d.time.total_seconds()/60
-        if(act_day == timestamp):
-            act_count += d.time.total_seconds()/60
-        else:
-            if (act_count > maximum):
-                maximum = act_count
-            timestamp = act_day
-            act_count = 0
-            act_count += d.time.total_seconds()/60
-
-    if (act_count > maximum):
-        maximum = act_count
+    for day, total in days.items():
+        noon = timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)), server_timezone)
+        result[noon.timestamp()] = total.total_seconds()/60
+    maximum = max((total.total_seconds()/60 for total in days.values()), default=0)
 
     result['START_MONTH'] = str((timezone.now()-timedelta(days=335)).date())
     result['USERNAME'] = user.username
     result['MAXIMUM'] = maximum
 
-    if project:
-        cache.set('timelog_data_'+user.username+'_'+project.name_short, result, 60*60*24*3)
-    else:
-        cache.set('timelog_data_'+user.username, result, 60*60*24*3)
-
+    cache.set(key, result, 60*60*24*3)
     return result
 
 
@@ -173,44 +148,74 @@ def d3_json_activity(request):
     return HttpResponse(resp, content_type='application/json')
 
 
+# the json of a timelog in the format the d3 graphs expect, that is the one of the django serializer
+def timelog_entry(log, urls):
+    issue = log.issue
+    if issue.pk not in urls:
+        urls[issue.pk] = (reverse('issue:detail', kwargs={"project": issue.project.name_short, "sqn_i": issue.number}),
+                          reverse('project:detail', kwargs={"project": issue.project.name_short}))
+    issue_url, project_url = urls[issue.pk]
+    return json.dumps({'fields': {
+        'created_at': log.created_at,
+        'time': duration_string(log.time),
+        'issue': issue.pk,
+        'issue_short': issue.get_ticket_identifier(),
+        'issue_project_name': issue.project.name,
+        'issue_url': issue_url,
+        'issue_proj_url': project_url,
+    }}, cls=DjangoJSONEncoder)
+
+
+def stream_timelogs(logs):
+    urls = {}
+    yield '['
+    for i, log in enumerate(logs.iterator()):
+        yield (',' if i else '') + timelog_entry(log, urls)
+    yield ']'
+
+
+# the logs of the user in the window, restricted to the project of the request if the user is member of it
+def get_timelogs(request, **window):
+    logs = Timelog.objects.filter(user=request.user, **window)
+    proj = request.GET.get('project', None)
+    if proj:
+        project = Project.objects.filter(name_short=proj).first()
+        if project and project.developer_allowed(request.user):
+            logs = logs.filter(issue__project=project)
+    return logs
+
+
+# polling graphs get a 304 unless the logs changed: the etag depends on the logs (updated_at covers edits and new
+# logs, the count deletions) and the projects (renamed projects change updated_at) of the user within the window
+def timelogs_response(request, logs, *window):
+    state = logs.aggregate(count=Count('pk'), updated=Max('updated_at'),
+                           project_updated=Max('issue__project__updated_at'))
+    key = '_'.join([str(part) for part in (request.user.pk,) + window] +
+                   [str(state['count']), str(state['updated']), str(state['project_updated'])])
+    etag = '"' + hashlib.md5(key.encode()).hexdigest() + '"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        logs = logs.select_related('issue__project').only(
+            'created_at', 'time', 'issue__number', 'issue__project__name', 'issue__project__name_short'
+        ).order_by('created_at')
+        response = StreamingHttpResponse(stream_timelogs(logs), content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 def d3_json_last_7_days(request):
 
     if not request.user.is_authenticated:
         resp = json.dumps("login!")
         return HttpResponse(resp, content_type='application/json')
 
-    now = timezone.now()
-    delta = timedelta(6)
-    start_date = now - delta
-    start_date = start_date.replace(hour=0, minute=0, second=0)
+    # the window starts at the beginning of the day six days ago in the timezone of the user
+    start_date = timezone.localtime(timezone.now()) - timedelta(6)
+    start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
 
-    proj = request.GET.get('project', None)
-    project = Project.objects.filter(name_short=proj)
-
-    test = project.exists() and project.first().developer_allowed(request.user)
-
-    if test:
-        data = Timelog.objects.filter(issue__project__name_short=proj,
-                                      user=request.user,
-                                      created_at__gt=start_date).order_by('created_at')
-    else:
-        data = Timelog.objects.filter(user=request.user, created_at__gt=start_date).order_by('created_at')
-
-    jsonString = serializers.serialize("json", data)
-    jsonObject = json.loads(jsonString)
-    for entry in jsonObject:
-        issue_id = entry['fields']['issue']
-        iss = Issue.objects.get(id=issue_id)
-        entry['fields']['issue_title'] = iss.title
-        entry['fields']['issue_short'] = iss.get_ticket_identifier()
-        proj = Project.objects.get(id=iss.project.id)
-        entry['fields']['issue_project_name'] = proj.name
-        entry['fields']['issue_url'] = reverse('issue:detail',
-                                               kwargs={"project": proj.name_short, "sqn_i": iss.number}
-                                               )
-
-    resp = json.dumps(jsonObject)
-    return HttpResponse(resp, content_type='application/json')
+    logs = get_timelogs(request, created_at__gte=start_date)
+    return timelogs_response(request, logs, start_date, request.GET.get('project', ''))
 
 
 def d3_json_logs_specific_day(request, date):
@@ -218,93 +223,36 @@ def d3_json_logs_specific_day(request, date):
         resp = json.dumps("login!")
         return HttpResponse(resp, content_type='application/json')
 
-    if date is None or len(date) < 8 or len(date) > 8:
-        resp = json.dumps("incorrect Date format: YYYYMMDD")
-    else:
-        year = int(date[:4])
-        month = int(date[4:-2])
-        day = int(date[6:])
-        if (month < 1 or month > 12 or day < 1 or day > 31):
-            resp = json.dumps("incorrect Date format: YYYYMMDD")
-        else:
-            user_date = datetime.datetime(year=year, month=month, day=day, hour=1, minute=1,
-                                          second=1, tzinfo=pytz.timezone(request.user.timezone)
-                                          )
-
-            proj = request.GET.get('project', None)
-            project = Project.objects.filter(name_short=proj)
-            test = project.exists() and project.first().developer_allowed(request.user)
-
-            if test:
-                data = Timelog.objects.filter(user=request.user,
-                                              issue__project__name_short=proj,
-                                              created_at__date=user_date.date(),
-                                              ).order_by('created_at')
-
-            else:
-                data = Timelog.objects.filter(user=request.user,
-                                              created_at__date=user_date.date(),
-                                              ).order_by('created_at')
-            resp = serializers.serialize("json", data)
-            resp = json.loads(resp)
-
-            for entry in resp:
-                issue_id = entry['fields']['issue']
-                iss = Issue.objects.get(id=issue_id)
-                entry['fields']['issue_title'] = iss.title
-                entry['fields']['issue_short'] = iss.get_ticket_identifier()
-                proj = Project.objects.get(id=iss.project.id)
-                entry['fields']['issue_project_name'] = proj.name
-                entry['fields']['issue_url'] = reverse('issue:detail',
-                                                       kwargs={"project": proj.name_short, "sqn_i": iss.number}
-                                                       )
-                entry['fields']['issue_proj_url'] = reverse('project:detail', kwargs={"project": proj.name_short})
-
-            resp = json.dumps(resp)
-    return HttpResponse(resp, content_type='application/json')
+    if date is None or len(date) != 8:
+        return HttpResponse(json.dumps("incorrect Date format: YYYYMMDD"), content_type='application/json')
+    try:
+        day = datetime.date(year=int(date[:4]), month=int(date[4:-2]), day=int(date[6:]))
+    except ValueError:
+        return HttpResponse(json.dumps("incorrect Date format: YYYYMMDD"), content_type='application/json')
 
+    # __date uses the timezone of the user
+    logs = get_timelogs(request, created_at__date=day)
+    return timelogs_response(request, logs, day, timezone.get_current_timezone_name(),
+                             request.GET.get('project', ''))
 
-def create_activity_data_actions(date_from, date_to, project, result):
-    data = json.loads(project.activity)
-    if isinstance(data, dict):
-        data = []
-        project.activity = json.dumps(data)
-        project.save()
 
+def create_activity_data_actions(date_from, date_to, project, result):
+    counts = get_activity_per_day(project, date_from.date(), date_to.date())
     while date_to.date() >= date_from.date():
-        count = 0
-        while(True):
-            if not data:
-                break
-            save = data.pop()
-            el = dateutil.parser.parse(save)
-            el = timezone.localtime(el)
-            if el.date() == date_to.date():
-                count += 1
-            elif el.date() > date_to.date():
-                continue
-            else:
-                data.append(save)
-                break
         temp2 = {}
         temp2["datum"] = str(date_to.date())
-        temp2["val"] = count
+        temp2["val"] = counts.get(date_to.date(), 0)
         result.insert(0, temp2)
         date_to -= timedelta(days=1)
     return result
 
 
 def create_activity_data_timelogs(date_from, date_to, project, result):
-    data = Timelog.objects.filter(issue__project=project, created_at__gt=date_from)
-    resp = serializers.serialize("json", data)
+    times = analytics.get_time_per_day(project, date_from.date(), date_to.date())
     while date_from.date() <= date_to.date():
-        temp = 0
-        date_data = data.filter(created_at__date=date_from.date())
-        for d in date_data:
-            temp += d.time.total_seconds()
         temp2 = {}
         temp2["datum"] = str(date_from.date())
-        temp2["val"] = temp
+        temp2["val"] = times.get(date_from.date(), timedelta(0)).total_seconds()
         result.append(temp2)
         date_from += timedelta(days=1)
     return result
@@ -23,7 +23,7 @@ EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 from django.db import models
 from django.utils import timezone
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.db import IntegrityError, transaction
 from django.core.cache import cache
@@ -103,14 +103,20 @@ def my_callback(sender, instance, *args, **kwargs):
 def set_timelog_number(sender, instance, *args, **kwargs):
     if instance.number == -1:
         instance.number = get_number_for_timelog(instance.issue)
-
-        # because we have two issue.save() calls after timelog creation
-        instance.issue.project.increase_activity(timezone.now(), decrease=True)
     cache.delete('action_data_'+instance.user.username+'_'+instance.issue.project.name_short)
     cache.delete('action_data_'+instance.user.username)
     return
 
 
+@receiver(post_save, sender=Timelog)
+@receiver(post_delete, sender=Timelog)
+def invalidate_timelog_summary(sender, instance, *args, **kwargs):
+    from timelog import analytics, summary
+    summary.invalidate(instance.issue.project_id)
+    analytics.bump_version(instance.issue.project_id)
+    analytics.bump_user_version(instance.user_id)
+
+
 class Punch(CustomModel):
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE,
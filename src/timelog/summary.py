@@ -0,0 +1,96 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Sum, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+from timelog.models import Timelog
+
+# Timelog summary of a project for the project timelog page: the total logged time and the most recent logs of every
+# user who logged time in the project.
+#
+# The totals are one grouped query, the recent logs of all users one query ranking the logs per user with a window
+# function (databases without window functions need one query per user). The summary is cached per project and
+# invalidated by the signal handlers in timelog.models whenever a timelog of the project is saved or deleted.
+
+RECENT_LOGS = 5
+SUMMARY_CACHE_TIMEOUT = 60*60*24
+
+
+def get_key(project_pk):
+    return 'timelog_summary_'+str(project_pk)
+
+
+def invalidate(project_pk):
+    cache.delete(get_key(project_pk))
+
+
+# Django's SQLite backend doesn't report the window functions SQLite supports since 3.25
+def supports_window_functions():
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 25, 0)
+    return connection.features.supports_over_clause
+
+
+# RawSQL puts its SQL in parentheses; together with the ones of the IN lookup it would become a scalar subquery
+class RawSubquery(RawSQL):
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def get_recent_logs(logs, user_pks):
+    fields = ('user', 'time', 'created_at', 'issue__number')
+    ordering = [F('created_at').desc(), F('pk').desc()]
+    if not supports_window_functions():
+        return [log for user_pk in user_pks
+                for log in logs.filter(user=user_pk).order_by(*ordering).values(*fields)[:RECENT_LOGS]]
+
+    # the logs of the project numbered per user, the most recent one first
+    ranked = logs.annotate(recent_rank=Window(RowNumber(), partition_by=[F('user')], order_by=ordering)) \
+        .order_by().values('pk', 'recent_rank')
+    # Django can't filter on window functions (before 4.2), so only the filter on the numbers is written by hand
+    ranked_sql, ranked_params = ranked.query.sql_with_params()
+    qn = connection.ops.quote_name
+    recent = RawSubquery('SELECT {pk} FROM ({ranked}) ranked WHERE {rank} <= %s'.format(
+                         pk=qn(Timelog._meta.pk.column), ranked=ranked_sql, rank=qn('recent_rank')),
+                         ranked_params + (RECENT_LOGS,))
+    return logs.filter(pk__in=recent).order_by(*ordering).values(*fields)
+
+
+# {user pk: (total time, [most recent logs])} of all users who logged time in the project
+def get_summary(project):
+    key = get_key(project.pk)
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    logs = Timelog.objects.filter(issue__project=project)
+    totals = logs.order_by().values_list('user').annotate(total=Sum('time'))
+    summary = {user_pk: (total, []) for user_pk, total in totals}
+    for log in get_recent_logs(logs, summary.keys()):
+        summary[log['user']][1].append(log)
+    cache.set(key, summary, SUMMARY_CACHE_TIMEOUT)
+    return summary
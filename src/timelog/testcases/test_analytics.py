@@ -0,0 +1,134 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+import datetime
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from issue.models import Issue
+from project.models import Project
+from timelog import analytics
+from timelog.models import Timelog
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TimelogAnalyticsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        cls.user2 = get_user_model().objects.create_user('b', 'b@b.com', 'b1234567')
+        cls.project = Project(creator=cls.user, name_short='PRJ')
+        cls.project.save()
+        cls.project.manager.add(cls.user)
+        cls.project.developer.add(cls.user2)
+        cls.project2 = Project(creator=cls.user, name_short='PRJ2')
+        cls.project2.save()
+        cls.project2.manager.add(cls.user)
+        cls.first_day = datetime.date(2020, 3, 1)
+        cls.last_day = datetime.date(2020, 3, 3)
+
+    def setUp(self):
+        cache.clear()
+        # NOTE: these elements get modified by some testcases, so they should NOT be created in setUpTestData()
+        self.issue = Issue(title='issue', project=self.project)
+        self.issue.save()
+        self.issue2 = Issue(title='issue', project=self.project)
+        self.issue2.save()
+        self.issue3 = Issue(title='issue', project=self.project2)
+        self.issue3.save()
+        # late in the evening of the 1st in UTC, which is already the 2nd in Berlin
+        self.log(self.user, self.issue, datetime.datetime(2020, 3, 1, 23, 30), 10)
+        self.log(self.user, self.issue2, datetime.datetime(2020, 3, 2, 12), 20)
+        self.log(self.user2, self.issue, datetime.datetime(2020, 3, 3, 8), 30)
+        # outside of the window or the project
+        self.log(self.user, self.issue, datetime.datetime(2020, 2, 29, 12), 40)
+        self.log(self.user, self.issue, datetime.datetime(2020, 3, 4, 12), 50)
+        self.log(self.user, self.issue3, datetime.datetime(2020, 3, 2, 12), 60)
+
+    def log(self, user, issue, created_at, minutes):
+        log = Timelog(user=user, issue=issue, time=datetime.timedelta(minutes=minutes),
+                      created_at=timezone.make_aware(created_at, pytz.utc))
+        log.save()
+        return log
+
+    def minutes(self, sums):
+        return {key: value.total_seconds() / 60 for key, value in sums.items()}
+
+    def test_time_per_day(self):
+        with timezone.override(pytz.utc):
+            per_day = analytics.get_time_per_day(self.project, self.first_day, self.last_day)
+        self.assertEqual(self.minutes(per_day), {datetime.date(2020, 3, 1): 10,
+                                                 datetime.date(2020, 3, 2): 20,
+                                                 datetime.date(2020, 3, 3): 30})
+
+        # the days and the window are the ones of the current timezone
+        with timezone.override(pytz.timezone('Europe/Berlin')):
+            per_day = analytics.get_time_per_day(self.project, self.first_day, self.last_day)
+        self.assertEqual(self.minutes(per_day), {datetime.date(2020, 3, 2): 30,
+                                                 datetime.date(2020, 3, 3): 30})
+
+        with timezone.override(pytz.timezone('America/New_York')):
+            per_day = analytics.get_time_per_day(self.project, self.first_day, self.last_day)
+        self.assertEqual(self.minutes(per_day), {datetime.date(2020, 3, 1): 10,
+                                                 datetime.date(2020, 3, 2): 20,
+                                                 datetime.date(2020, 3, 3): 30})
+
+    def test_time_per_user_and_issue(self):
+        per_user = analytics.get_time_per_user(self.project, self.first_day, self.last_day)
+        self.assertEqual(self.minutes(per_user), {'a': 30, 'b': 30})
+        per_issue = analytics.get_time_per_issue(self.project, self.first_day, self.last_day)
+        self.assertEqual(self.minutes(per_issue), {self.issue.number: 40, self.issue2.number: 20})
+
+        per_issue = analytics.get_time_per_issue(self.project, self.first_day, self.last_day, self.user2)
+        self.assertEqual(self.minutes(per_issue), {self.issue.number: 30})
+
+    def test_cached_until_timelogs_change(self):
+        with self.assertNumQueries(1):
+            analytics.get_time_per_day(self.project, self.first_day, self.last_day)
+        with self.assertNumQueries(0):
+            per_day = analytics.get_time_per_day(self.project, self.first_day, self.last_day)
+        self.assertEqual(self.minutes(per_day)[datetime.date(2020, 3, 2)], 20)
+
+        # logs of other projects keep the cached sums
+        self.log(self.user, self.issue3, datetime.datetime(2020, 3, 2, 13), 5)
+        with self.assertNumQueries(0):
+            analytics.get_time_per_day(self.project, self.first_day, self.last_day)
+
+        log = self.log(self.user, self.issue, datetime.datetime(2020, 3, 2, 13), 5)
+        per_day = analytics.get_time_per_day(self.project, self.first_day, self.last_day)
+        self.assertEqual(self.minutes(per_day)[datetime.date(2020, 3, 2)], 25)
+
+        log.delete()
+        per_day = analytics.get_time_per_day(self.project, self.first_day, self.last_day)
+        self.assertEqual(self.minutes(per_day)[datetime.date(2020, 3, 2)], 20)
+
+        # other windows and timezones are cached separately
+        with self.assertNumQueries(1):
+            analytics.get_time_per_day(self.project, self.first_day, self.first_day)
+        with self.assertNumQueries(1), timezone.override(pytz.timezone('Europe/Berlin')):
+            analytics.get_time_per_day(self.project, self.first_day, self.last_day)
@@ -0,0 +1,120 @@
+"""
+Iguana (c) by Marc Ammon, Moritz Fickenscher, Lukas Fridolin, Michael Gunselmann, Katrin Raab, Christian Strate
+
+Iguana is licensed under BSD-2-Clause License.
+
+Redistribution and use in source and binary forms, with or without modification,
+are permitted provided that the following conditions are met:
+
+   1. Redistributions of source code must retain the above copyright notice,
+      this list of conditions and the following disclaimer.
+   2. Redistributions in binary form must reproduce the above copyright notice,
+      this list of conditions and the following disclaimer
+      in the documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS
+BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS;
+OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
+EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from issue.models import Issue
+from project.models import Project
+from timelog.models import Timelog
+from timelog.summary import get_summary
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TimelogSummaryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # NOTE: if you modify these elements they need to be created in setUp(), instead of here
+        cls.user = get_user_model().objects.create_user('a', 'a@a.com', 'a1234567')
+        cls.user2 = get_user_model().objects.create_user('b', 'b@b.com', 'b1234567')
+        cls.user3 = get_user_model().objects.create_user('c', 'c@c.com', 'c1234567')
+        cls.project = Project(creator=cls.user, name_short='PRJ')
+        cls.project.save()
+        cls.project.manager.add(cls.user)
+        cls.project.developer.add(cls.user2, cls.user3)
+        cls.project2 = Project(creator=cls.user, name_short='PRJ2')
+        cls.project2.save()
+        cls.project2.manager.add(cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        # NOTE: these elements get modified by some testcases, so they should NOT be created in setUpTestData()
+        self.issue = Issue(title='issue', project=self.project)
+        self.issue.save()
+        self.issue2 = Issue(title='issue', project=self.project2)
+        self.issue2.save()
+        self.start = timezone.now() - timedelta(days=10)
+        for i in range(7):
+            self.log(self.user, self.issue, i, 1)
+        self.log(self.user2, self.issue, 1, 30)
+        self.log(self.user, self.issue2, 8, 60)
+
+    def log(self, user, issue, days, minutes):
+        log = Timelog(user=user, issue=issue, time=timedelta(minutes=minutes),
+                      created_at=self.start + timedelta(days=days))
+        log.save()
+        return log
+
+    def check_summary(self):
+        summary = get_summary(self.project)
+        self.assertEqual(set(summary), {self.user.pk, self.user2.pk})
+        total, logs = summary[self.user.pk]
+        self.assertEqual(total, timedelta(minutes=7))
+        # the most recent logs first
+        self.assertEqual([log['created_at'] for log in logs],
+                         [self.start.replace(microsecond=100000) + timedelta(days=days) for days in range(6, 1, -1)])
+        self.assertEqual(summary[self.user2.pk][0], timedelta(minutes=30))
+        self.assertEqual([log['issue__number'] for log in summary[self.user2.pk][1]], [self.issue.number])
+
+    def test_summary(self):
+        with self.assertNumQueries(2):
+            self.check_summary()
+        with self.assertNumQueries(0):
+            get_summary(self.project)
+
+    def test_without_window_functions(self):
+        with patch('timelog.summary.supports_window_functions', return_value=False):
+            self.check_summary()
+
+    def test_invalidation(self):
+        get_summary(self.project)
+        log = self.log(self.user3, self.issue, 9, 5)
+        self.assertEqual(get_summary(self.project)[self.user3.pk][0], timedelta(minutes=5))
+        log.delete()
+        self.assertNotIn(self.user3.pk, get_summary(self.project))
+
+    def test_view(self):
+        response = self.client.get(reverse('project:timelog', kwargs={'project': self.project.name_short}))
+        self.assertEqual([(dev['user'], dev['total']) for dev in response.context['developer']],
+                         [(self.user2, timedelta(minutes=30)), (self.user, timedelta(minutes=7)),
+                          (self.user3, timedelta(0))])
+        self.assertContains(response, 'PRJ-1')
+
+        # the number of queries doesn't depend on the number of members and their logs
+        with self.assertNumQueries(9):
+            self.client.get(reverse('project:timelog', kwargs={'project': self.project.name_short}))
+        for i in range(3):
+            user = get_user_model().objects.create_user('d' + str(i), 'd' + str(i) + '@d.com', 'd1234567')
+            self.project.developer.add(user)
+            self.log(user, self.issue, i, 10)
+        self.client.get(reverse('project:timelog', kwargs={'project': self.project.name_short}))
+        with self.assertNumQueries(9):
+            response = self.client.get(reverse('project:timelog', kwargs={'project': self.project.name_short}))
+        self.assertEqual(len(response.context['developer']), 6)
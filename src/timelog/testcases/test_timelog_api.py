@@ -21,14 +21,18 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
-from django.test import TestCase
+from django.core import serializers
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 import json
 
-from project.models import Project
+from cuser.middleware import CuserMiddleware
+from project.models import Project, get_activity_day
 from issue.models import Issue
+from timelog.models import Timelog
 from kanbancol.models import KanbanColumn
 from django.contrib.auth import get_user_model
 
@@ -58,6 +62,12 @@ class TimelogApiTest(TestCase):
         self.issue2 = Issue(project=self.project2, due_date='2016-12-16', kanbancol=self.kanbancol, storypoints='3')
         self.issue2.save()
 
+    # the timelogs of the last days and of a specific day are streamed
+    def get_json(self, response):
+        if response.streaming:
+            return json.loads(b''.join(response.streaming_content).decode())
+        return response.json()
+
     def test_view_and_template(self):
         # TODO TESTCASE see invite_users
         #      use view_and_template()
@@ -87,42 +97,79 @@ class TimelogApiTest(TestCase):
         # TODO timelog:lastweek
         pass
 
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
     def test_api_activity_data(self):
-        response = self.client.get(reverse('timelog:api_activity'))
-        response = self.client.post(reverse('issue:log', kwargs={"project": self.issue.project.name_short,
-                                                                 "sqn_i": self.issue.number}),
-                                    {'time': '1h30m', 'created_at': self.timestring})
-        response = self.client.get(reverse('timelog:api_activity'))
-        response_json = response.json()
-        self.assertEqual(response_json[str((self.time-timedelta(minutes=90)).timestamp())], 90.0)
-        response = self.client.post(reverse('issue:log', kwargs={"project": self.issue.project.name_short,
-                                                                 "sqn_i": self.issue.number}),
-                                    {'time': '1h30m', 'created_at': self.timestring})
-        response = self.client.get(reverse('timelog:api_activity'))
-        response_json = response.json()
-        self.assertEqual(response_json[str((self.time-timedelta(minutes=90)).timestamp())], 180.0)
+        cache.clear()
+        now = timezone.now()
+        noon = timezone.make_aware(datetime.combine(get_activity_day(now), time(12)),
+                                   timezone.get_default_timezone()).timestamp()
+        for issue, date, minutes in [(self.issue, now, 90), (self.issue, now, 30), (self.issue2, now, 15),
+                                     (self.issue, now - timedelta(days=1), 60),
+                                     (self.issue, now - timedelta(days=400), 600)]:
+            Timelog(user=self.user, issue=issue, time=timedelta(minutes=minutes), created_at=date).save()
+
+        # one value per day of the last year, summed up with a single query (besides the ones of the session, the
+        # user and the project parameter)
+        with self.assertNumQueries(5):
+            response_json = self.client.get(reverse('timelog:api_activity')).json()
+        self.assertEqual(response_json[str(noon)], 135.0)
+        self.assertEqual(response_json[str(noon - 60*60*24)], 60.0)
+        self.assertEqual(response_json['MAXIMUM'], 135.0)
+        self.assertEqual(len(response_json), 5)
+
+        response_json = self.client.get(reverse('timelog:api_activity')+'?project=' +
+                                        self.project2.name_short).json()
+        self.assertEqual(response_json[str(noon)], 15.0)
+        self.assertEqual(response_json['MAXIMUM'], 15.0)
         self.assertEqual(len(response_json), 4)
-        newdate = self.time - timedelta(days=1)
-        newdate_timestring = newdate.strftime("%Y-%m-%d %H:%M:%S")
-        newdate_timestamp = newdate.timestamp()
-        response = self.client.post(reverse('issue:log', kwargs={"project": self.issue.project.name_short,
-                                                                 "sqn_i": self.issue.number}),
-                                    {'time': '1h30m', 'created_at': newdate_timestring})
-        response = self.client.get(reverse('timelog:api_activity'))
-        response_json = response.json()
-        self.assertEqual(response_json[str(newdate_timestamp)], 90.0)
+
+        # the cached heatmaps are replaced once a timelog changes
+        self.client.post(reverse('issue:log', kwargs={"project": self.issue.project.name_short,
+                                                      "sqn_i": self.issue.number}),
+                         {'time': '1h30m', 'created_at': self.timestring})
+        response_json = self.client.get(reverse('timelog:api_activity')).json()
+        self.assertEqual(response_json[str(noon)], 225.0)
+        log = Timelog.objects.get(issue=self.issue2)
+        log.delete()
+        response_json = self.client.get(reverse('timelog:api_activity')+'?project=' +
+                                        self.project2.name_short).json()
+        self.assertEqual(len(response_json), 3)
+
+    def test_api_action_data(self):
+        now = timezone.now()
+        noon = timezone.make_aware(datetime.combine(get_activity_day(now), time(12)),
+                                   timezone.get_default_timezone()).timestamp()
+        CuserMiddleware.set_user(self.user)
+        try:
+            for project, date in [(self.project, now), (self.project, now), (self.project2, now),
+                                  (self.project, now - timedelta(days=1)), (self.project, now - timedelta(days=400))]:
+                project.increase_activity(date)
+        finally:
+            CuserMiddleware.del_user()
+
+        # one value per day of the last year
+        response_json = self.client.get(reverse('timelog:api_activity')+'?data=actions').json()
+        self.assertEqual(response_json[str(noon)], 3)
+        self.assertEqual(response_json[str(noon - 60*60*24)], 1)
+        self.assertEqual(response_json['MAXIMUM'], 3)
         self.assertEqual(len(response_json), 5)
 
+        response_json = self.client.get(reverse('timelog:api_activity')+'?data=actions&project=' +
+                                        self.project2.name_short).json()
+        self.assertEqual(response_json[str(noon)], 1)
+        self.assertEqual(response_json['MAXIMUM'], 1)
+        self.assertEqual(len(response_json), 4)
+
     def test_api_last_seven_days(self):
         response = self.client.get(reverse('timelog:api_last_7_days'))
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(len(response_json), 0)
 
         response = self.client.post(reverse('issue:log', kwargs={"project": self.issue.project.name_short,
                                                                  "sqn_i": self.issue.number}),
                                     {'time': '1h30m', 'created_at': self.timestring})
         response = self.client.get(reverse('timelog:api_last_7_days'))
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(len(response_json), 1)
         self.assertEqual(response_json[0]['fields']['time'], '01:30:00')
 
@@ -133,7 +180,7 @@ class TimelogApiTest(TestCase):
                                                                  "sqn_i": self.issue.number}),
                                     {'time': '1h30m', 'created_at': newdate_timestring})
         response = self.client.get(reverse('timelog:api_last_7_days'))
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(len(response_json), 1)
 
     def test_api_specific_date(self):
@@ -143,20 +190,20 @@ class TimelogApiTest(TestCase):
                                     {'time': '1m', 'created_at': self.timestring})
         string_date = str(self.time.date()).replace("-", "")
         response = self.client.get(reverse('timelog:api_logs_on_date', kwargs={"date": string_date}))
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(len(response_json), 1)
         newdate = self.time - timedelta(days=1)
         string_date = str(newdate.date()).replace("-", "")
         response = self.client.get(reverse('timelog:api_logs_on_date', kwargs={"date": string_date}))
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(len(response_json), 0)
 
         response = self.client.get(reverse('timelog:api_logs_on_date', kwargs={"date": "200170418"}))
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(response_json, "incorrect Date format: YYYYMMDD")
 
         response = self.client.get(reverse('timelog:api_logs_on_date', kwargs={"date": "20171318"}))
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(response_json, "incorrect Date format: YYYYMMDD")
 
     def test_api_project_activity(self):
@@ -202,30 +249,115 @@ class TimelogApiTest(TestCase):
                                                                  "sqn_i": self.issue.number}),
                                     {'time': '1m', 'created_at': self.timestring})
         response = self.client.get(reverse('timelog:api_activity')+'?project='+self.project.name_short)
-        response_json = response.json()
-        self.assertEqual(response_json[str((self.time-timedelta(minutes=1)).timestamp())], 1.0)
+        response_json = self.get_json(response)
+        noon = timezone.make_aware(datetime.combine(get_activity_day(self.time-timedelta(minutes=1)), time(12)),
+                                   timezone.get_default_timezone()).timestamp()
+        self.assertEqual(response_json[str(noon)], 1.0)
 
         response = self.client.get(reverse('timelog:api_activity')+'?project='+self.project2.name_short)
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(len(response_json), 3)
 
         response = self.client.get(reverse('timelog:api_last_7_days')+'?project='+self.project.name_short)
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(len(response_json), 1)
 
         response = self.client.get(reverse('timelog:api_last_7_days')+'?project='+self.project2.name_short)
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(len(response_json), 0)
 
         string_date = str(self.time.date()).replace("-", "")
         response = self.client.get(reverse('timelog:api_logs_on_date',
                                            kwargs={"date": string_date}
                                            )+'?project='+self.project.name_short)
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(len(response_json), 1)
 
         response = self.client.get(reverse('timelog:api_logs_on_date',
                                            kwargs={"date": string_date}
                                            )+'?project='+self.project2.name_short)
-        response_json = response.json()
+        response_json = self.get_json(response)
         self.assertEqual(len(response_json), 0)
+
+    def test_timelog_fields(self):
+        log = Timelog(user=self.user, issue=self.issue, time=timedelta(days=1, hours=2, minutes=3),
+                      created_at=self.time)
+        log.save()
+        response = self.client.get(reverse('timelog:api_last_7_days'))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        fields = self.get_json(response)[0]['fields']
+        # the format of the django serializer, which the graphs parse
+        serialized = json.loads(serializers.serialize('json', [log]))[0]['fields']
+        self.assertEqual(fields['time'], '1 02:03:00')
+        self.assertEqual(fields['time'], serialized['time'])
+        self.assertEqual(fields['created_at'], serialized['created_at'])
+        self.assertEqual(fields['issue'], self.issue.pk)
+        self.assertEqual(fields['issue_short'], self.issue.get_ticket_identifier())
+        self.assertEqual(fields['issue_project_name'], self.project.name)
+        issue_url = reverse('issue:detail', kwargs={'project': self.project.name_short, 'sqn_i': self.issue.number})
+        self.assertEqual(fields['issue_url'], issue_url)
+        self.assertEqual(fields['issue_proj_url'], reverse('project:detail',
+                                                           kwargs={'project': self.project.name_short}))
+
+    def test_query_count_independent_of_logs(self):
+        string_date = str(timezone.localtime(self.time).date()).replace("-", "")
+        for i in range(2):
+            Timelog(user=self.user, issue=self.issue, time=timedelta(minutes=1), created_at=self.time).save()
+            issue = Issue(project=self.project2, kanbancol=self.kanbancol)
+            issue.save()
+            Timelog(user=self.user, issue=issue, time=timedelta(minutes=1), created_at=self.time).save()
+
+            # session, user, etag, logs
+            with self.assertNumQueries(4):
+                self.assertEqual(len(self.get_json(self.client.get(reverse('timelog:api_last_7_days')))), 2*(i+1))
+            with self.assertNumQueries(4):
+                response = self.client.get(reverse('timelog:api_logs_on_date', kwargs={"date": string_date}))
+                self.assertEqual(len(self.get_json(response)), 2*(i+1))
+
+    def test_etag(self):
+        log = Timelog(user=self.user, issue=self.issue, time=timedelta(minutes=1), created_at=self.time)
+        log.save()
+        url = reverse('timelog:api_last_7_days')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # unchanged logs need no further queries for the logs
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # the project filter has its own etag
+        response = self.client.get(url + '?project=' + self.project2.name_short, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # edited, new and deleted logs and renamed projects change the etag
+        log.time = timedelta(minutes=2)
+        log.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_json(response)[0]['fields']['time'], '00:02:00')
+        etag = response['ETag']
+
+        log2 = Timelog(user=self.user, issue=self.issue, time=timedelta(minutes=1), created_at=self.time)
+        log2.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        log2.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        project = Project.objects.get(pk=self.project.pk)
+        project.name = 'renamed'
+        project.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_json(response)[0]['fields']['issue_project_name'], 'renamed')
+
+    def test_invalid_date(self):
+        response = self.client.get(reverse('timelog:api_logs_on_date', kwargs={"date": "20170230"}))
+        self.assertEqual(response.json(), "incorrect Date format: YYYYMMDD")
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:25
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management', '0009_auto_20230404_1749'),
+        # the activity has been moved to project.UserActivityDay there
+        ('project', '0006_user_activity_day'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='customuser',
+            name='activity',
+        ),
+    ]
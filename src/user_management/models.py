@@ -25,14 +25,15 @@ import pytz
 import os
 
 from django.db import models
-from django.db.models import TextField
 from django.contrib.auth.models import AbstractUser
 from django.urls.base import reverse
 from django.utils.translation import ugettext_lazy as _
 
+from lib.change_tracking import ChangeTrackingMixin
 from lib.custom_model import CustomModel
 
 from issue.models import Issue
+from project import membership
 from project.models import Project
 from search.fieldcheckings import SearchableMixin
 
@@ -46,7 +47,7 @@ def avatarDir(instance, filename):
     return 'avatars/{}/{}'.format(instance.username, filename)
 
 
-class CustomUser(SearchableMixin, AbstractUser, CustomModel):
+class CustomUser(ChangeTrackingMixin, SearchableMixin, AbstractUser, CustomModel):
     # NOTE: if we need some additional fields we might add those fields into the settings/common.py
     # NOTE: into the UserAttributeSimilarityValidator
     # NOTE: plus if one field name is changed, we also need to adjust ^this
@@ -75,10 +76,8 @@ class CustomUser(SearchableMixin, AbstractUser, CustomModel):
                                                        default=True)
     # TODO: any other fields wanted?
 
-    activity = TextField(default='{}')
-
     def get_projects(self):
-        return (self.manager.all() | self.dev_projects.all()).distinct()
+        return Project.objects.filter(pk__in=list(membership.get_roles(self)))
 
     def get_absolute_url(self):
         return reverse('user_profile:user_profile_page', kwargs={"username": self.username})
@@ -120,6 +119,7 @@ class CustomUser(SearchableMixin, AbstractUser, CustomModel):
         return "User"
 
     searchable_fields = ['first_name', 'last_name', 'username']
+    fulltext_indexed = True
 
     # every user profile is public
     def user_has_read_permissions(self, user):
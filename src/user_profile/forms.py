@@ -21,11 +21,13 @@ OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
 OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE,
 EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import CharField, PasswordInput, ValidationError
 from django.forms.models import ModelForm
 from django.forms.fields import ImageField
 from django.contrib.auth import password_validation, get_user_model
 from django.contrib.auth.forms import PasswordChangeForm, UsernameField
+from django.db import transaction
 
 import os
 
@@ -36,6 +38,8 @@ from django.utils.translation import ugettext_lazy as _
 from django.utils.translation import ugettext as _nl
 
 from image_strip.image_strip import strip_img_metadata
+from image_strip.thumbnails import delete_thumbnails
+from common.tasks import create_avatar_thumbnails
 from user_profile.widgets import CustomClearableFileInput
 
 
@@ -91,7 +95,8 @@ class CustomUserChangeForm(ModelForm):
         Override save() method to catch the changes for the avatar field
         """
         # get the old avatar file path and name
-        old_avatar_filepath = os.path.join(MEDIA_ROOT, kwargs.pop('old_avatar_name'))
+        old_avatar = kwargs.pop('old_avatar_name')
+        old_avatar_filepath = os.path.join(MEDIA_ROOT, old_avatar)
         old_avatar_name = os.path.basename(old_avatar_filepath)
         # get the new avatar file name
         new_avatar_name = os.path.basename(self.cleaned_data['avatar'].name)
@@ -100,9 +105,21 @@ class CustomUserChangeForm(ModelForm):
         if old_avatar_name != new_avatar_name and \
                 old_avatar_name != os.path.basename(defaultAvatar):
             os.path.exists(old_avatar_filepath) and os.remove(old_avatar_filepath)
+            delete_thumbnails(old_avatar)
 
         # instance.save()
-        return super(CustomUserChangeForm, self).save(*args, **kwargs)
+        try:
+            user = super(CustomUserChangeForm, self).save(*args, **kwargs)
+        finally:
+            # the re-encoded avatar is a temporary file (see create_img()), which the storage moves to its place;
+            # closing it here removes it if it hasn't been moved and doesn't complain about it otherwise
+            if isinstance(self.cleaned_data['avatar'], UploadedFile):
+                self.cleaned_data['avatar'].close()
+
+        # the thumbnails of the new avatar are created in the background
+        if user.avatar.name != old_avatar and user.avatar.name != defaultAvatar:
+            transaction.on_commit(lambda: create_avatar_thumbnails.delay(user.username))
+        return user
 
 
 class CustomPasswordChangeForm(PasswordChangeForm):
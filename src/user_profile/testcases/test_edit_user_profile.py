@@ -29,7 +29,9 @@ import os
 from PIL import Image
 import shutil
 
-from common.settings import BASE_DIR, MEDIA_ROOT
+from common.settings import BASE_DIR, MEDIA_ROOT, MEDIA_URL
+from common.tasks import create_avatar_thumbnails
+from image_strip.thumbnails import get_thumbnail_name
 from user_profile.apps import defaultAvatar
 from django.contrib.auth import get_user_model
 
@@ -195,6 +197,28 @@ class EditUserProfileTest(TestCase):
                                     new_dict, follow=True)
         self.assertContains(response, file_basename+".jpg")
 
+    def test_avatar_thumbnails(self):
+        new_dict = default_dict2.copy()
+        with open(image_path, "rb") as avatar:
+            new_dict['avatar'] = avatar
+            self.client.post(reverse('user_profile:edit_profile', kwargs={"username": user_name}), new_dict)
+        avatar_name = get_user_model().objects.get(username=user_name).avatar.name
+        thumbnail_path = os.path.join(MEDIA_ROOT, get_thumbnail_name(avatar_name, 'medium'))
+
+        # until the thumbnails exist the original is used
+        response = self.client.get(reverse('user_profile:user_profile_page', kwargs={"username": user_name}))
+        self.assertContains(response, 'src="' + MEDIA_URL + avatar_name + '"')
+
+        # the task is run after the transaction has been committed
+        create_avatar_thumbnails(user_name)
+        self.assertTrue(os.path.isfile(thumbnail_path))
+        response = self.client.get(reverse('user_profile:user_profile_page', kwargs={"username": user_name}))
+        self.assertContains(response, 'src="' + MEDIA_URL + get_thumbnail_name(avatar_name, 'medium') + '"')
+
+        # the thumbnails are removed together with the avatar
+        self.delete_avatar(new_dict)
+        self.assertFalse(os.path.exists(thumbnail_path))
+
     def test_image_transformation(self):
         # TODO TESTCASE that verifies the content of an uploaded image
         #      The images are transformed into a jpg on the server-side